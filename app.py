@@ -1,6 +1,10 @@
 from flask import Flask
 from config import Config  # 导入配置
 from extensions import db, migrate, jwt  # 导入扩展
+from commands import register_commands  # 导入命令行命令
+import utils.user_cache  # 注册JWT当前用户加载回调（current_user）
+import utils.token_blocklist  # 注册JWT令牌吊销检查回调
+from utils.order_no import order_no_generator
 # 导入蓝图
 from views.users import users_bp
 from views.services import services_bp
@@ -10,6 +14,7 @@ from views.notifications import notifications_bp
 from views.admin import admin_bp, admin, admin_index_view  # 修改，导入 admin_index_view
 from views.support import support_bp
 from views.marketing import marketing_bp
+from views.uploads import uploads_bp
 
 def create_app(config_class=Config):
     app = Flask(__name__)
@@ -21,6 +26,9 @@ def create_app(config_class=Config):
     jwt.init_app(app)
     admin.init_app(app)  # 初始化 flask-admin 实例，**注意这里不再注册 admin 实例为蓝图**
 
+    # 订单号 worker ID 在首次生成订单号时确定，生产环境要求显式设置
+    order_no_generator.require_worker_id = app.config['ORDER_WORKER_ID_REQUIRED']
+
     # 注册蓝图
     app.register_blueprint(users_bp)
     app.register_blueprint(services_bp)
@@ -30,9 +38,13 @@ def create_app(config_class=Config):
     app.register_blueprint(admin_bp, name='admin_module')  # 注册我们自定义的 admin_bp 蓝图, 并指定 name='admin_module'
     app.register_blueprint(marketing_bp)
     app.register_blueprint(support_bp)
+    app.register_blueprint(uploads_bp)
     # 添加这行代码
     app.add_url_rule('/', view_func=admin_index_view, methods=['GET'])
 
+    # 注册命令行命令
+    register_commands(app)
+
     return app
 
 if __name__ == '__main__':
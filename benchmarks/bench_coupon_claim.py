@@ -0,0 +1,121 @@
+"""限量优惠券并发领取压测
+
+在临时SQLite数据库中创建一张限量优惠券和一批用户，多个线程通过 POST /marketing/coupons/claim
+并发领取（每个用户请求两次，模拟重复点击），统计：
+- 领取吞吐量（次/秒）与各类结果的数量；
+- 领取成功数、coupon.claimed_count 与 user_coupon 行数是否都等于发放总量（超发数必须为0），
+  以及是否有用户领取了多张。
+
+用法：
+    python benchmarks/bench_coupon_claim.py --users 5000 --stock 1000 --threads 16
+
+数据库连接可用 --database-url 指定（如PostgreSQL），此时会在其中创建表并写入测试数据。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Coupon claim concurrency benchmark')
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--stock', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite database')
+    args = parser.parse_args()
+
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import func
+
+    from app import create_app
+    from config import Config
+    from extensions import db
+    from models.marketing import Coupon, UserCoupon
+    from models.user import User
+
+    directory = tempfile.mkdtemp()
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = args.database_url or f'sqlite:///{os.path.join(directory, "bench.db")}'
+        # SQLite同一时间只允许一个写事务，等待写锁而不是立即报错
+        SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}} if not args.database_url else {}
+        PASSWORD_HASH_WORKERS = 0
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        users = [{'username': f'bench{i}', 'email': f'bench{i}@example.com', 'phone': f'139{i:08d}',
+                  'password': 'x'} for i in range(args.users)]
+        db.session.execute(db.insert(User), users)
+        now = datetime.utcnow()
+        coupon = Coupon(code=f'FLASH{int(time.time())}', discount_type='fixed', discount_value=10,
+                        start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+                        total_quantity=args.stock)
+        db.session.add(coupon)
+        db.session.commit()
+        coupon_id, code = coupon.id, coupon.code
+        user_ids = db.session.scalars(db.select(User.id).where(User.username.like('bench%'))).all()
+        tokens = [create_access_token(identity=str(user_id)) for user_id in user_ids]
+
+    # 每个用户请求两次，两次请求分配到不同线程
+    requests = tokens + tokens[::-1]
+    statuses = Counter()
+    lock = threading.Lock()
+    cursor = iter(range(len(requests)))
+
+    def worker():
+        client = app.test_client()
+        local = Counter()
+        while True:
+            with lock:
+                index = next(cursor, None)
+            if index is None:
+                break
+            response = client.post('/marketing/coupons/claim', json={'code': code},
+                                   headers={'Authorization': f'Bearer {requests[index]}'})
+            local[response.status_code] += 1
+        with lock:
+            statuses.update(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        claimed_count = db.session.get(Coupon, coupon_id).claimed_count
+        rows = db.session.scalar(db.select(func.count(UserCoupon.id)).where(UserCoupon.coupon_id == coupon_id))
+        duplicated = db.session.scalar(
+            db.select(func.count()).select_from(
+                db.select(UserCoupon.user_id).where(UserCoupon.coupon_id == coupon_id)
+                .group_by(UserCoupon.user_id).having(func.count() > 1).subquery()
+            )
+        )
+
+    print(f'users: {args.users}, stock: {args.stock}, threads: {args.threads}, requests: {len(requests)}')
+    print(f'throughput:     {len(requests) / elapsed:.0f} claims/s ({elapsed:.2f}s)')
+    print(f'201 claimed:    {statuses[201]}')
+    print(f'400 duplicate:  {statuses[400]}')
+    print(f'409 sold out:   {statuses[409]}')
+    print(f'other:          {sum(statuses.values()) - statuses[201] - statuses[400] - statuses[409]}')
+    print(f'claimed_count:  {claimed_count}')
+    print(f'user_coupon:    {rows}')
+    print(f'oversold:       {max(0, rows - args.stock)}')
+    print(f'duplicate users: {duplicated}')
+    ok = statuses[201] == rows == claimed_count <= args.stock and not duplicated
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""附近服务人员查询压测
+
+在网格索引中放入指定数量的服务人员（大部分集中在几个城市，其余分散在全国范围），
+在城市内随机位置查询最近的 k 个服务人员，统计单次查询耗时。
+
+用法：
+    python benchmarks/bench_geo_index.py --providers 100000 --queries 10000 --k 10 --radius 5
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (纬度, 经度)：上海、北京、广州、深圳、成都
+CITIES = [(31.23, 121.47), (39.90, 116.40), (23.13, 113.26), (22.54, 114.06), (30.57, 104.07)]
+
+
+def random_point(rng):
+    if rng.random() < 0.9:
+        lat, lng = rng.choice(CITIES)
+        return lat + rng.gauss(0, 0.15), lng + rng.gauss(0, 0.15)
+    return rng.uniform(20, 45), rng.uniform(100, 125)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Nearest provider lookup benchmark')
+    parser.add_argument('--providers', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=10000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--radius', type=float, default=5)
+    parser.add_argument('--cell', type=float, default=0.01)
+    args = parser.parse_args()
+
+    from utils.geo_index import GridIndex
+
+    rng = random.Random(0)
+    grid = GridIndex(args.cell)
+    started = time.perf_counter()
+    for provider_id in range(args.providers):
+        grid.put(provider_id, *random_point(rng))
+    build = time.perf_counter() - started
+
+    timings = []
+    found = 0
+    for _ in range(args.queries):
+        lat, lng = random_point(rng)
+        started = time.perf_counter()
+        found += len(grid.nearest(lat, lng, args.k, args.radius))
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+
+    print(f'providers:      {args.providers}')
+    print(f'build:          {build:.3f}s')
+    print(f'queries:        {args.queries} (k={args.k}, radius={args.radius}km)')
+    print(f'avg results:    {found / args.queries:.1f}')
+    print(f'mean latency:   {sum(timings) / len(timings) * 1e6:.0f}us')
+    print(f'p50 latency:    {timings[len(timings) // 2] * 1e6:.0f}us')
+    print(f'p99 latency:    {timings[int(len(timings) * 0.99)] * 1e6:.0f}us')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
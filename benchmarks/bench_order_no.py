@@ -0,0 +1,56 @@
+"""订单号生成器压测
+
+启动多个进程（模拟多个 gunicorn worker），每个进程使用不同的 worker ID 并发生成订单号，
+统计总吞吐量并检查所有订单号是否存在冲突。
+
+用法：
+    python benchmarks/bench_order_no.py --processes 4 --per-process 250000
+"""
+
+import argparse
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def worker(args):
+    worker_id, count = args
+    os.environ['ORDER_WORKER_ID'] = str(worker_id)
+    from utils.order_no import order_no_generator, generate_order_nos
+
+    order_no_generator.reset()
+    start = time.perf_counter()
+    order_nos = generate_order_nos(count)
+    return order_nos, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Order number generator benchmark')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--per-process', type=int, default=250000)
+    args = parser.parse_args()
+
+    with Pool(args.processes) as pool:
+        started = time.perf_counter()
+        results = pool.map(worker, [(i, args.per_process) for i in range(args.processes)])
+        wall = time.perf_counter() - started
+
+    order_nos = [order_no for chunk, _ in results for order_no in chunk]
+    slowest = max(elapsed for _, elapsed in results)
+    collisions = len(order_nos) - len(set(order_nos))
+    monotonic = all(chunk == sorted(chunk) for chunk, _ in results)
+
+    print(f'processes:      {args.processes}')
+    print(f'order numbers:  {len(order_nos)}')
+    print(f'generation:     {slowest:.3f}s ({len(order_nos) / slowest:,.0f}/s aggregate)')
+    print(f'wall clock:     {wall:.3f}s (including process start-up and result transfer)')
+    print(f'collisions:     {collisions}')
+    print(f'monotonic:      {monotonic}')
+    return 0 if collisions == 0 and monotonic else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""登录吞吐量压测
+
+模拟一个应用进程中的多个请求线程同时登录（校验密码哈希），分别在请求线程中直接计算（--workers 0）
+和使用不同大小的哈希进程池计算，统计：
+- 登录吞吐量（次/秒）与登录延迟；
+- 因等待任务过多被快速拒绝的次数；
+- 同一进程中其他接口的响应延迟（用一段纯Python计算模拟），反映哈希计算对其他请求的影响。
+
+用法：
+    python benchmarks/bench_password_hash.py --threads 16 --workers 0 1 2 4 --seconds 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+
+from utils.passwords import PasswordHasher, PasswordHasherBusy
+
+
+def other_request():
+    # 约1毫秒的纯Python计算，模拟不涉及密码的普通接口
+    total = 0
+    for i in range(20000):
+        total += i * i
+    return total
+
+
+def percentile(values, p):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(workers, threads, seconds, max_pending, pwhash):
+    hasher = PasswordHasher(workers, max_pending)
+    # 预先启动哈希进程，不把进程启动时间计入结果
+    if workers:
+        hasher.verify(pwhash, 'password')
+
+    stop = threading.Event()
+    login_latencies = []
+    rejected = [0]
+    other_latencies = []
+
+    def login_client():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                assert hasher.verify(pwhash, 'password')
+            except PasswordHasherBusy:
+                rejected[0] += 1
+                time.sleep(0.01)
+                continue
+            login_latencies.append(time.perf_counter() - started)
+
+    def other_client():
+        while not stop.is_set():
+            started = time.perf_counter()
+            other_request()
+            other_latencies.append(time.perf_counter() - started)
+            time.sleep(0.005)
+
+    clients = [threading.Thread(target=login_client) for _ in range(threads)]
+    clients.append(threading.Thread(target=other_client))
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    time.sleep(seconds)
+    stop.set()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+
+    return {
+        'workers': workers,
+        'logins': len(login_latencies) / elapsed,
+        'login_p50': statistics.median(login_latencies) * 1000 if login_latencies else float('nan'),
+        'login_p99': percentile(login_latencies, 0.99) * 1000,
+        'rejected': rejected[0],
+        'other_p50': statistics.median(other_latencies) * 1000 if other_latencies else float('nan'),
+        'other_p99': percentile(other_latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Password hashing login throughput benchmark')
+    parser.add_argument('--threads', type=int, default=16, help='concurrent login threads')
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4],
+                        help='hashing process counts to compare, 0 hashes in the request thread')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--max-pending', type=int, default=32)
+    parser.add_argument('--method', default='scrypt')
+    args = parser.parse_args()
+
+    pwhash = generate_password_hash('password', method=args.method)
+    print(f'method: {pwhash.split("$", 1)[0]}, login threads: {args.threads}, cpus: {os.cpu_count()}')
+    print(f'{"workers":>8} {"logins/s":>10} {"login p50":>10} {"login p99":>10} {"rejected":>9} '
+          f'{"other p50":>10} {"other p99":>10}')
+    for workers in args.workers:
+        result = run(workers, args.threads, args.seconds, args.max_pending, pwhash)
+        print(f'{result["workers"]:>8} {result["logins"]:>10.1f} {result["login_p50"]:>8.1f}ms '
+              f'{result["login_p99"]:>8.1f}ms {result["rejected"]:>9} '
+              f'{result["other_p50"]:>8.2f}ms {result["other_p99"]:>8.2f}ms')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
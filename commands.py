@@ -0,0 +1,151 @@
+"""命令行工具
+
+通过 flask 命令调用的运维命令，例如：
+    flask orders archive --days 90
+    flask orders dispatch --loop
+    flask providers rebuild-ratings
+    flask services reindex-search
+    flask images process
+"""
+
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+# 订单相关命令
+orders_cli = AppGroup('orders', help='订单相关的运维命令')
+
+@orders_cli.command('archive')
+@click.option('--days', type=int, default=None, help='归档最后更新时间早于多少天前的已完成/已取消订单')
+@click.option('--batch-size', type=int, default=None, help='每个事务移动的订单数')
+def archive_orders_command(days, batch_size):
+    """将旧的已完成/已取消订单移动到order_archive表"""
+    from utils.order_archive import archive_orders
+
+    total = archive_orders(days=days, batch_size=batch_size)
+    click.echo(f'Archived {total} orders')
+
+@orders_cli.command('dispatch')
+@click.option('--batch-size', type=int, default=None, help='每批派单处理的订单数')
+@click.option('--loop', is_flag=True, help='持续运行，处理完全部待派单订单后每隔DISPATCH_INTERVAL秒开始下一轮')
+def dispatch_orders_command(batch_size, loop):
+    """为待派单的订单分配服务人员"""
+    from utils.dispatch import dispatch_pending
+
+    batch_size = batch_size or current_app.config['DISPATCH_BATCH_SIZE']
+    after = None
+    while True:
+        result = dispatch_pending(batch_size=batch_size, after=after)
+        click.echo(f"Dispatched {result['assigned']}/{result['pending']} orders")
+        if result['pending'] == batch_size:
+            # 本批已满：从本批最后一个订单之后继续，暂时无法派单的订单留到下一轮
+            after = result['last']
+            continue
+        if not loop:
+            break
+        # 已处理完全部待派单订单，等待新订单后从头开始下一轮
+        after = None
+        time.sleep(current_app.config['DISPATCH_INTERVAL'])
+
+# 服务人员相关命令
+providers_cli = AppGroup('providers', help='服务人员相关的运维命令')
+
+@providers_cli.command('rebuild-ratings')
+def rebuild_ratings_command():
+    """根据全部订单评价重建服务人员的评分统计"""
+    from utils.provider_rating import rebuild_provider_ratings
+
+    total = rebuild_provider_ratings()
+    click.echo(f'Rebuilt rating stats for {total} providers')
+
+# 服务项目相关命令
+services_cli = AppGroup('services', help='服务项目相关的运维命令')
+
+@services_cli.command('reindex-search')
+@click.option('--batch-size', type=int, default=1000, help='每批写入索引的服务项目数')
+def reindex_search_command(batch_size):
+    """重建服务项目的全文检索索引"""
+    from utils.search import rebuild_index
+
+    total = rebuild_index(batch_size=batch_size)
+    click.echo(f'Indexed {total} service items')
+
+@services_cli.command('import-items')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--provider-id', type=int, required=True, help='导入的服务项目所属的服务人员ID')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=None, help='每批校验并写入的行数')
+def import_items_command(path, provider_id, chunk_size):
+    """从CSV或XLSX文件批量导入服务项目"""
+    from utils.item_import import import_items
+
+    started = time.monotonic()
+    with open(path, 'rb') as f:
+        result = import_items(f, path, provider_id, chunk_size=chunk_size)
+    for error in result['errors']:
+        click.echo(f"Row {error['row']}: {error['errors']}", err=True)
+    click.echo(f"Imported {result['imported']} service items, {result['failed']} rows failed "
+               f"in {time.monotonic() - started:.1f}s")
+
+# 图片相关命令
+images_cli = AppGroup('images', help='上传图片相关的运维命令')
+
+@images_cli.command('process')
+def process_images_command():
+    """为缺少衍生图的已上传图片生成缩略图等衍生图"""
+    from utils.images import process_missing
+
+    originals, generated = process_missing()
+    click.echo(f'Checked {originals} images, generated {generated} derivatives')
+
+# 地址相关命令
+addresses_cli = AppGroup('addresses', help='地址相关的运维命令')
+
+@addresses_cli.command('backfill-divisions')
+@click.option('--batch-size', type=int, default=1000, help='每个事务更新的行数')
+def backfill_divisions_command(batch_size):
+    """为尚未规范化的地址和订单补充行政区划代码"""
+    from utils.divisions import backfill_division_codes
+
+    addresses, orders = backfill_division_codes(batch_size=batch_size)
+    click.echo(f'Normalized {addresses} addresses and {orders} orders')
+
+# 优惠券相关命令
+coupons_cli = AppGroup('coupons', help='优惠券相关的运维命令')
+
+@coupons_cli.command('generate-codes')
+@click.argument('coupon_id', type=int)
+@click.option('--count', type=click.IntRange(min=1), required=True, help='生成的券码数量')
+@click.option('--chunk-size', type=int, default=None, help='每个事务插入的券码数，默认使用配置 COUPON_CODE_CHUNK_SIZE')
+def generate_codes_command(coupon_id, count, chunk_size):
+    """为优惠券批量生成一次性券码"""
+    from utils.coupon_codes import generate_codes
+
+    started = time.monotonic()
+    try:
+        start = generate_codes(coupon_id, count, chunk_size=chunk_size)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Generated {count} codes (sequence {start}-{start + count - 1}) in {time.monotonic() - started:.1f}s')
+
+# 令牌相关命令
+tokens_cli = AppGroup('tokens', help='登录令牌相关的运维命令')
+
+@tokens_cli.command('purge')
+def purge_tokens_command():
+    """删除已过期令牌的吊销记录"""
+    from utils.token_blocklist import token_blocklist
+
+    deleted = token_blocklist.purge_expired()
+    click.echo(f'Purged {deleted} expired revoked tokens')
+
+def register_commands(app):
+    """注册所有命令行命令"""
+    app.cli.add_command(orders_cli)
+    app.cli.add_command(providers_cli)
+    app.cli.add_command(services_cli)
+    app.cli.add_command(images_cli)
+    app.cli.add_command(addresses_cli)
+    app.cli.add_command(coupons_cli)
+    app.cli.add_command(tokens_cli)
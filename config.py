@@ -20,10 +20,84 @@ class Config:
     
     # JWT（JSON Web Token）密钥，用于用户认证
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-string'
+    # 令牌有效期与吊销配置，访问令牌默认15分钟有效，刷新令牌默认30天有效
+    TOKEN_BLOCKLIST_SYNC = 2  # 同步其他进程吊销的令牌的间隔（秒），吊销最迟在该间隔后对所有进程生效
+    TOKEN_BLOCKLIST_SYNC_MARGIN = 60  # 增量同步时向前多取的时间（秒），容忍服务器时钟偏差和事务提交延迟
 
     # Flask-Admin配置
     FLASK_ADMIN_SWATCH = 'cerulean'  # 设置Flask-Admin的界面主题为cerulean
 
+    # 订单预约配置
+    ORDER_SLOT_MINUTES = 120  # 单个预约时段的长度（分钟），同一服务人员的预约时段不能重叠
+    ORDER_SCHEDULE_TTL = 30  # 进程内档期索引的缓存时间（秒）
+    ORDER_BATCH_MAX = 500  # 批量下单接口单次最多提交的订单数
+    ORDER_ARCHIVE_DAYS = 90  # 已完成/已取消的订单超过多少天后归档到order_archive表
+    ORDER_ARCHIVE_BATCH_SIZE = 1000  # 归档时每个事务移动的订单数
+    ORDER_WORKER_ID_REQUIRED = False  # 是否必须设置环境变量ORDER_WORKER_ID，未设置时订单号worker ID退化为进程PID低位
+
+    # 服务类别树缓存时间（秒），本进程内修改类别会立即失效
+    CATEGORY_CACHE_TTL = 60
+    # 图片上传配置
+    UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')  # 上传文件保存目录
+    UPLOAD_URL_PREFIX = '/static/uploads'  # 上传文件的URL前缀
+    IMAGE_MAX_BYTES = 10 * 1024 * 1024  # 单张图片的最大字节数
+    IMAGE_VARIANTS = {'thumbnail': 240, 'medium': 960}  # 衍生图尺寸名 -> 最长边像素数，均为WebP格式
+    IMAGE_WEBP_QUALITY = 80  # 衍生图的WebP质量
+    IMAGE_WORKERS = 2  # 每个进程生成衍生图的后台线程数
+
+    # 常见问题缓存时间（秒），本进程内修改常见问题会立即失效
+    FAQ_CACHE_TTL = 300
+    # 只读接口的Cache-Control策略，max-age内客户端直接使用本地缓存，过期后带ETag重新校验
+    HTTP_CACHE_CONTROL = {
+        'categories': 'public, max-age=300',
+        'items': 'public, max-age=60',
+        'faq': 'public, max-age=3600',
+    }
+    # 当前登录用户缓存配置，本进程内修改用户会立即失效
+    USER_CACHE_TTL = 60  # 用户数据缓存时间（秒）
+    USER_CACHE_SIZE = 10000  # 每个进程最多缓存的用户数
+
+    # 行政区划配置
+    DIVISIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'divisions.csv')  # 行政区划数据（code,name,pinyin）
+    DIVISIONS_STRICT = False  # 是否拒绝省市区无法全部匹配行政区划的地址（使用完整的区划数据时可开启）
+
+    # 注册信息占用检查的布隆过滤器配置
+    USER_BLOOM_ERROR_RATE = 0.001  # 误判率，误判时多一次数据库查询
+    USER_BLOOM_MIN_CAPACITY = 100000  # 最小容量，实际容量为当前用户数的2倍与该值中的较大者
+    USER_BLOOM_REFRESH = 5  # 增量加入其他进程新注册用户的间隔（秒）
+    USER_BLOOM_TTL = 3600  # 全量重建的间隔（秒）
+
+    # 优惠券定义缓存时间（秒），同时是已领完记录的保留时间，本进程内修改优惠券会立即失效
+    COUPON_CACHE_TTL = 30
+    # 批量生成一次性券码的配置
+    COUPON_CODE_KEY = os.environ.get('COUPON_CODE_KEY') or SECRET_KEY  # 券码置换的密钥，已生成券码后不能修改，否则新旧券码可能重复
+    COUPON_CODE_CHUNK_SIZE = 10000  # 每个事务插入的券码数
+    COUPON_CODE_MAX_PER_REQUEST = 100000  # 接口单次最多生成的券码数，更多的券码使用命令 flask coupons generate-codes 生成
+
+    # 密码哈希配置
+    PASSWORD_HASH_METHOD = 'scrypt'  # 哈希算法及参数，修改后用户下次登录时按新参数重新计算哈希
+    PASSWORD_HASH_WORKERS = 2  # 每个进程用于计算密码哈希的子进程数，为0时在请求线程中计算
+    PASSWORD_HASH_MAX_PENDING = 32  # 每个进程最多同时等待的哈希任务数，超出时接口立即返回503
+    PASSWORD_HASH_TIMEOUT = 10  # 等待单个哈希任务的最长时间（秒）
+
+    # 服务项目批量导入配置
+    IMPORT_CHUNK_SIZE = 1000  # 每批校验并写入的行数
+    IMPORT_MAX_ERRORS = 1000  # 导入结果中最多返回的错误行数，超出后只计数
+    # PostgreSQL全文检索使用的文本检索配置（中文已在应用内切分为二元组，使用simple即可）
+    SEARCH_PG_CONFIG = 'simple'
+
+    # 附近服务人员查询配置
+    GEO_CELL_DEGREES = 0.01  # 地理位置索引的网格大小（度），约1.1公里
+    GEO_INDEX_TTL = 300  # 进程内地理位置索引的全量重建间隔（秒）
+    GEO_MAX_RADIUS_KM = 20  # 附近服务人员查询的最大搜索半径（公里）
+
+    # 自动派单配置
+    DISPATCH_BATCH_SIZE = 500  # 每批派单处理的订单数
+    DISPATCH_INTERVAL = 5  # 派单任务循环运行时两批之间的间隔（秒）
+    DISPATCH_RADIUS_KM = 10  # 候选服务人员的搜索半径（公里）
+    DISPATCH_CANDIDATES = 20  # 每个订单最多考虑的候选服务人员数
+    DISPATCH_WEIGHTS = {'distance': 0.4, 'rating': 0.3, 'load': 0.3}  # 距离、评分、当前负载的得分权重
+
 class DevelopmentConfig(Config):
     # 开发环境配置类，继承基础配置
     DEBUG = True  # 启用调试模式，显示详细的错误信息
@@ -32,10 +106,13 @@ class TestingConfig(Config):
     # 测试环境配置类，用于单元测试等场景
     TESTING = True  # 启用测试模式
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'  # 使用SQLite内存数据库进行测试
+    PASSWORD_HASH_WORKERS = 0  # 测试时在当前线程中计算密码哈希，不启动子进程
 
 class ProductionConfig(Config):
     # 生产环境配置类，用于实际部署
     # 必须从环境变量获取数据库连接信息，确保安全性
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    # 每个进程必须通过环境变量 ORDER_WORKER_ID 设置不同的订单号 worker ID（见utils.order_no），未设置时下单报错
+    ORDER_WORKER_ID_REQUIRED = True
     # 在此处添加其他生产环境特定的配置项
 
@@ -45,6 +45,16 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+# 全文检索索引表由迁移脚本手工创建（FTS5虚拟表及其影子表、tsvector表），不参与autogenerate比较
+SEARCH_INDEX_TABLES = ('service_item_fts', 'service_item_search')
+
+
+def include_name(name, type_, parent_names):
+    if type_ == 'table':
+        return not name.startswith(SEARCH_INDEX_TABLES)
+    return True
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -93,6 +103,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault('include_name', include_name)
 
     connectable = get_engine()
 
@@ -0,0 +1,42 @@
+"""Add service item full-text search index
+
+Revision ID: f5b8d2c6a9e4
+Revises: d4a1c9e7b5f3
+Create Date: 2025-04-02 15:12:08.318442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5b8d2c6a9e4'
+down_revision = 'd4a1c9e7b5f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 只创建索引表，已有的服务项目需执行 flask services reindex-search 写入索引
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE service_item_fts "
+            "USING fts5(title, description, tokenize='unicode61 remove_diacritics 2')"
+        )
+    else:
+        op.create_table('service_item_search',
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('document', postgresql.TSVECTOR(), nullable=False),
+        sa.PrimaryKeyConstraint('item_id')
+        )
+        op.create_index('ix_service_item_search_document', 'service_item_search', ['document'],
+                        unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('DROP TABLE service_item_fts')
+    else:
+        op.drop_index('ix_service_item_search_document', table_name='service_item_search')
+        op.drop_table('service_item_search')
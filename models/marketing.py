@@ -25,6 +25,12 @@ class Coupon(db.Model):
     max_discount = db.Column(db.Numeric(10, 2))
     # 每个用户的使用次数限制
     usage_limit = db.Column(db.Integer)
+    # 发放总量，为空时不限量
+    total_quantity = db.Column(db.Integer)
+    # 已领取数量（仅限量优惠券统计），领取时用条件UPDATE原子递增，不超过发放总量
+    claimed_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # 已批量生成的一次性券码数量，也是下一批券码的起始序号（见utils.coupon_codes）
+    code_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def is_valid(self):
         """检查优惠券是否有效
@@ -39,6 +45,13 @@ class UserCoupon(db.Model):
     """用户优惠券关联模型类
     用于记录用户领取和使用优惠券的情况
     """
+    __table_args__ = (
+        # 每个用户每种优惠券只能领取一张，由唯一约束保证（并发领取时不依赖先查询后插入）
+        db.UniqueConstraint('user_id', 'coupon_id', name='uq_user_coupon_user_coupon'),
+        # 查询用户未使用的优惠券（下单计价）
+        db.Index('ix_user_coupon_user_used', 'user_id', 'used_at'),
+    )
+
     # 记录ID，主键
     id = db.Column(db.Integer, primary_key=True)
     # 关联的用户ID，外键
@@ -51,3 +64,23 @@ class UserCoupon(db.Model):
     # 建立与用户和优惠券的关系
     user = db.relationship('User', backref=db.backref('coupons', lazy=True))
     coupon = db.relationship('Coupon')
+
+class CouponCode(db.Model):
+    """一次性券码模型类
+    批量生成的券码，每个券码只能被一个用户使用一次，使用后获得对应的优惠券
+    """
+    __tablename__ = 'coupon_code'
+
+    # 记录ID，主键
+    id = db.Column(db.Integer, primary_key=True)
+    # 所属的优惠券ID，外键
+    coupon_id = db.Column(db.Integer, db.ForeignKey('coupon.id'), nullable=False, index=True)
+    # 券码，唯一且不能为空
+    code = db.Column(db.String(16), unique=True, nullable=False)
+    # 使用券码的用户ID，外键，未使用时为空
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    # 券码使用时间，未使用时为空
+    redeemed_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<CouponCode {self.code}>'
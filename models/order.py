@@ -1,11 +1,19 @@
 from extensions import db
 from datetime import datetime
-import random
+from utils.order_no import generate_order_no, generate_order_nos
 
 class Order(db.Model):
     """订单模型类
     用于存储和管理用户的服务订单信息
     """
+    __table_args__ = (
+        # 服务人员档期查询索引，用于预约冲突检测
+        db.Index('ix_order_provider_appointment', 'service_provider_id', 'appointment_time'),
+        # "我的订单"游标分页索引
+        db.Index('ix_order_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_order_user_status_created', 'user_id', 'status', 'created_at', 'id'),
+    )
+
     # 订单ID，主键
     id = db.Column(db.Integer, primary_key=True)
     # 订单号，唯一且不能为空
@@ -14,10 +22,14 @@ class Order(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     # 关联的服务项目ID，外键
     service_item_id = db.Column(db.Integer, db.ForeignKey('service_item.id'), nullable=False)
-    # 关联的服务提供者ID，外键
-    service_provider_id = db.Column(db.Integer, db.ForeignKey('service_provider.id'), nullable=False)
-    # 订单总金额
+    # 关联的服务提供者ID，外键（自动派单的订单在派单前为空）
+    service_provider_id = db.Column(db.Integer, db.ForeignKey('service_provider.id'))
+    # 订单总金额（已扣除优惠券优惠）
     total_amount = db.Column(db.Numeric(10, 2), nullable=False)
+    # 优惠券优惠金额
+    discount_amount = db.Column(db.Numeric(10, 2))
+    # 使用的用户优惠券ID，外键
+    user_coupon_id = db.Column(db.Integer, db.ForeignKey('user_coupon.id'))
     # 实际支付金额
     paid_amount = db.Column(db.Numeric(10, 2))
     # 订单状态
@@ -26,6 +38,12 @@ class Order(db.Model):
     appointment_time = db.Column(db.DateTime, nullable=False)
     # 服务地址
     address = db.Column(db.String(255), nullable=False)
+    # 服务地址的纬度
+    latitude = db.Column(db.Float)
+    # 服务地址的经度
+    longitude = db.Column(db.Float)
+    # 服务地址所在的行政区划代码（从地址解析，见utils.divisions）
+    division_code = db.Column(db.Integer, index=True)
     # 订单备注
     remark = db.Column(db.Text)
     # 订单创建时间
@@ -44,21 +62,86 @@ class Order(db.Model):
 
     def generate_order_no(self):
         """生成订单号
-        使用时间戳+用户ID+随机数的方式生成唯一订单号
+        使用毫秒时间戳+worker ID+进程内序号的方式生成唯一且单调递增的订单号，见utils.order_no
         """
-        self.order_no = f'{datetime.utcnow().strftime("%Y%m%d%H%M%S")}{self.user_id:04d}{str(random.randint(1000, 9999))}'
+        self.order_no = generate_order_no()
+
+    @staticmethod
+    def generate_order_nos(count):
+        """批量生成订单号"""
+        return generate_order_nos(count)
 
     def __repr__(self):
         return f'<Order {self.order_no}>'
 
+class OrderArchive(db.Model):
+    """归档订单模型类
+    已完成或已取消且超过一定时间的订单从order表移动到这里（冷数据），字段与Order一致，
+    订单ID和订单号保持不变，使order表及其索引只包含近期的活跃订单
+    """
+    __tablename__ = 'order_archive'
+    __table_args__ = (
+        db.Index('ix_order_archive_user_created', 'user_id', 'created_at', 'id'),
+    )
+
+    # 订单ID，主键，沿用原订单ID
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # 订单号，唯一且不能为空
+    order_no = db.Column(db.String(255), unique=True, nullable=False)
+    # 关联的用户ID
+    user_id = db.Column(db.Integer, nullable=False)
+    # 关联的服务项目ID
+    service_item_id = db.Column(db.Integer, nullable=False)
+    # 关联的服务提供者ID
+    service_provider_id = db.Column(db.Integer)
+    # 订单总金额（已扣除优惠券优惠）
+    total_amount = db.Column(db.Numeric(10, 2), nullable=False)
+    # 优惠券优惠金额
+    discount_amount = db.Column(db.Numeric(10, 2))
+    # 使用的用户优惠券ID
+    user_coupon_id = db.Column(db.Integer)
+    # 实际支付金额
+    paid_amount = db.Column(db.Numeric(10, 2))
+    # 订单状态
+    status = db.Column(db.String(50), nullable=False)
+    # 预约服务时间
+    appointment_time = db.Column(db.DateTime, nullable=False)
+    # 服务地址
+    address = db.Column(db.String(255), nullable=False)
+    # 服务地址的纬度
+    latitude = db.Column(db.Float)
+    # 服务地址的经度
+    longitude = db.Column(db.Float)
+    # 服务地址所在的行政区划代码（从地址解析，见utils.divisions）
+    division_code = db.Column(db.Integer, index=True)
+    # 订单备注
+    remark = db.Column(db.Text)
+    # 订单创建时间
+    created_at = db.Column(db.DateTime)
+    # 订单更新时间
+    updated_at = db.Column(db.DateTime)
+    # 支付方式
+    pay_method = db.Column(db.String(50))
+    # 支付时间
+    paid_at = db.Column(db.DateTime)
+    # 归档时间
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # 建立与用户、服务项目的只读关系（归档表不设外键约束）
+    user = db.relationship('User', primaryjoin='foreign(OrderArchive.user_id) == User.id', viewonly=True)
+    service_item = db.relationship('ServiceItem', primaryjoin='foreign(OrderArchive.service_item_id) == ServiceItem.id', viewonly=True)
+
+    def __repr__(self):
+        return f'<OrderArchive {self.order_no}>'
+
 class OrderReview(db.Model):
     """订单评价模型类
     用于存储用户对服务的评价信息
     """
     # 评价ID，主键
     id = db.Column(db.Integer, primary_key=True)
-    # 关联的订单ID，外键
-    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    # 关联的订单ID（订单可能已被归档到order_archive表，因此不设外键约束）
+    order_id = db.Column(db.Integer, nullable=False, index=True)
     # 评价用户ID，外键
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     # 被评价的服务提供者ID，外键
@@ -73,7 +156,8 @@ class OrderReview(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # 建立与订单、用户、服务提供者的关系
-    order = db.relationship('Order', backref=db.backref('review', uselist=False))
+    order = db.relationship('Order', primaryjoin='foreign(OrderReview.order_id) == Order.id',
+                            backref=db.backref('review', uselist=False))
     user = db.relationship('User')
     service_provider = db.relationship('ServiceProvider')
 
@@ -1,5 +1,6 @@
 from extensions import db
 from datetime import datetime
+from sqlalchemy.orm.attributes import set_committed_value
 
 class ServiceCategory(db.Model):
     """服务类别模型
@@ -13,16 +14,61 @@ class ServiceCategory(db.Model):
     parent_id = db.Column(db.Integer, db.ForeignKey('service_category.id'), nullable=True)
     # 类别图标URL
     icon = db.Column(db.String(255))
+    # 物化路径，由根到本类别的ID组成，如'/1/4/9/'，用于一次查询获取整棵子树
+    path = db.Column(db.String(255), index=True)
     # 与子类别建立自引用关系
     children = db.relationship("ServiceCategory", backref=db.backref('parent', remote_side=[id]))
 
     def __repr__(self):
         return f'<ServiceCategory {self.name}>'
 
+def _category_parent_path(connection, parent_id):
+    """获取父类别的物化路径，顶级类别返回'/'"""
+    if not parent_id:
+        return '/'
+    table = ServiceCategory.__table__
+    return connection.scalar(db.select(table.c.path).where(table.c.id == parent_id)) or f'/{parent_id}/'
+
+@db.event.listens_for(ServiceCategory, 'after_insert')
+def _set_category_path(mapper, connection, target):
+    """新建类别后根据父类别生成物化路径"""
+    table = ServiceCategory.__table__
+    path = f'{_category_parent_path(connection, target.parent_id)}{target.id}/'
+    connection.execute(table.update().where(table.c.id == target.id).values(path=path))
+    set_committed_value(target, 'path', path)
+
+@db.event.listens_for(ServiceCategory, 'before_update')
+def _check_category_parent(mapper, connection, target):
+    """禁止把类别移动到自己或自己的子类别下"""
+    if not db.inspect(target).attrs.parent_id.history.has_changes() or not target.parent_id:
+        return
+    if target.path and _category_parent_path(connection, target.parent_id).startswith(target.path):
+        raise ValueError('A category cannot be moved under itself or its descendants')
+
+@db.event.listens_for(ServiceCategory, 'after_update')
+def _move_category_path(mapper, connection, target):
+    """类别更换父类别后，更新自身及所有子孙类别的物化路径"""
+    if not db.inspect(target).attrs.parent_id.history.has_changes():
+        return
+    table = ServiceCategory.__table__
+    old_path = target.path or f'/{target.id}/'
+    new_path = f'{_category_parent_path(connection, target.parent_id)}{target.id}/'
+    connection.execute(
+        table.update()
+        .where(table.c.path.startswith(old_path, autoescape=True))
+        .values(path=db.literal(new_path) + db.func.substr(table.c.path, len(old_path) + 1))
+    )
+    set_committed_value(target, 'path', new_path)
+
 class ServiceItem(db.Model):
     """服务项目模型
     用于存储具体服务项目的详细信息
     """
+    __table_args__ = (
+        # 服务项目列表（按类别、在售状态筛选并按ID游标分页）索引
+        db.Index('ix_service_item_category_sale', 'category_id', 'is_on_sale', 'id'),
+    )
+
     # 服务项目ID，主键
     id = db.Column(db.Integer, primary_key=True)
     # 所属类别ID，外键
@@ -58,6 +104,11 @@ class ServiceProvider(db.Model):
     """服务提供者模型
     用于存储家政服务人员的详细信息
     """
+    __table_args__ = (
+        # 按评分排名的索引
+        db.Index('ix_service_provider_rating', 'rating_avg', 'review_count'),
+    )
+
     # 服务提供者ID，主键
     id = db.Column(db.Integer, primary_key=True)
     # 关联的用户ID，外键
@@ -70,6 +121,10 @@ class ServiceProvider(db.Model):
     phone = db.Column(db.String(20), nullable=False)
     # 居住地址
     address = db.Column(db.String(255))
+    # 居住地址的纬度
+    latitude = db.Column(db.Float)
+    # 居住地址的经度
+    longitude = db.Column(db.Float)
     # 工作经验描述
     experience = db.Column(db.Text)
     # 资质证书，多个URL用逗号分隔
@@ -82,6 +137,19 @@ class ServiceProvider(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     # 更新时间
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # 评价统计（由创建评价时增量维护，可通过 flask providers rebuild-ratings 重建）
+    # 评价数量
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # 评分总和
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # 平均评分
+    rating_avg = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    # 各分值（1-5分）的评价数量
+    rating_1 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_2 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_3 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_4 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_5 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     # 与用户建立一对一关系
     user = db.relationship('User', backref=db.backref('provider_info', uselist=False))
 
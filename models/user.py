@@ -48,3 +48,31 @@ class Address(db.Model):
     phone = db.Column(db.String(20), nullable=False)
     # 收货人姓名
     name = db.Column(db.String(100))
+    # 纬度
+    latitude = db.Column(db.Float)
+    # 经度
+    longitude = db.Column(db.Float)
+    # 规范化后的行政区划代码（匹配到的最下级区划，见utils.divisions）
+    division_code = db.Column(db.Integer, index=True)
+
+class RevokedToken(db.Model):
+    """已吊销令牌模型类
+    用于记录登出或刷新后作废的JWT，各进程定期同步到进程内的吊销列表，见utils.token_blocklist
+    """
+    __tablename__ = 'revoked_token'
+
+    # 记录ID，主键
+    id = db.Column(db.Integer, primary_key=True)
+    # 令牌的唯一标识（JWT的jti声明）
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    # 令牌类型：access 或 refresh
+    token_type = db.Column(db.String(10), nullable=False)
+    # 令牌所属的用户ID
+    user_id = db.Column(db.Integer, nullable=False)
+    # 令牌的过期时间，过期后记录可以删除
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    # 吊销时间，用于各进程增量同步
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
@@ -25,6 +25,10 @@ class CouponSchema(Schema):
     max_discount = fields.Decimal()
     # 使用次数限制
     usage_limit = fields.Integer()
+    # 发放总量，为空时不限量
+    total_quantity = fields.Integer(allow_none=True)
+    # 已领取数量，仅用于序列化输出
+    claimed_count = fields.Integer(dump_only=True)
 
 class UserCouponSchema(Schema):
     """用户优惠券关联序列化模式类
@@ -1,6 +1,11 @@
 from marshmallow import Schema, fields
+from sqlalchemy.orm import joinedload, selectinload
 from .service_schema import ServiceItemSchema, ServiceProviderSchema
 from .user_schema import UserSchema
+from .profiles import SerializationProfile
+from utils.images import image_urls
+from models.order import Order, OrderArchive, OrderReview
+from models.service import ServiceItem
 
 class OrderSchema(Schema):
     """订单序列化模式类
@@ -16,6 +21,10 @@ class OrderSchema(Schema):
     service_item_id = fields.Int(required=True)
     # 订单总金额，必填字段
     total_amount = fields.Decimal(required=True)
+    # 优惠券优惠金额，仅用于序列化输出
+    discount_amount = fields.Decimal(dump_only=True, allow_none=True)
+    # 使用的用户优惠券ID，仅用于序列化输出
+    user_coupon_id = fields.Int(dump_only=True, allow_none=True)
     # 实际支付金额
     paid_amount = fields.Decimal()
     # 订单状态，必填字段
@@ -24,6 +33,12 @@ class OrderSchema(Schema):
     appointment_time = fields.DateTime(required=True)
     # 服务地址
     address = fields.Str()
+    # 服务地址的纬度
+    latitude = fields.Float(allow_none=True)
+    # 服务地址的经度
+    longitude = fields.Float(allow_none=True)
+    # 服务地址所在的行政区划代码，仅用于序列化输出
+    division_code = fields.Int(dump_only=True)
     # 订单备注
     remark = fields.Str()
     # 创建时间，仅用于序列化输出
@@ -38,8 +53,8 @@ class OrderSchema(Schema):
     user = fields.Nested(UserSchema, dump_only=True)
     # 嵌套服务项目信息，仅用于序列化输出
     service_item = fields.Nested(ServiceItemSchema, dump_only=True)
-    # 服务提供者ID，必填字段
-    service_provider_id = fields.Integer(required=True)
+    # 服务提供者ID，自动派单的订单在派单前为空
+    service_provider_id = fields.Integer(allow_none=True)
 
 class OrderReviewSchema(Schema):
     """订单评价序列化模式类
@@ -59,6 +74,8 @@ class OrderReviewSchema(Schema):
     comment = fields.String()
     # 评价图片，多个URL用逗号分隔
     images = fields.String()
+    # 评价图片的原图和各尺寸衍生图URL，仅用于序列化输出
+    image_urls = fields.Method('get_image_urls', dump_only=True)
     # 评价创建时间，仅用于序列化输出
     created_at = fields.DateTime(dump_only=True)
     # 嵌套订单信息，仅用于序列化输出
@@ -67,3 +84,65 @@ class OrderReviewSchema(Schema):
     user = fields.Nested(UserSchema, dump_only = True)
     # 嵌套服务提供者信息，仅用于序列化输出
     service_provider = fields.Nested(ServiceProviderSchema, dump_only = True)
+
+    def get_image_urls(self, obj):
+        """获取评价图片的原图和衍生图URL"""
+        return image_urls(obj.images)
+
+# 订单基本字段
+ORDER_FIELDS = (
+    'id', 'order_no', 'user_id', 'service_item_id', 'service_provider_id', 'total_amount', 'discount_amount',
+    'user_coupon_id', 'paid_amount', 'status', 'appointment_time', 'address', 'latitude', 'longitude',
+    'division_code', 'remark', 'created_at', 'updated_at', 'pay_method', 'paid_at'
+)
+
+# 订单序列化配置
+# list：订单列表，只带服务项目摘要，服务项目用一条IN查询批量加载
+# detail：订单详情，带服务项目、类别和下单用户基本信息（不含地址和子类别）
+ORDER_PROFILES = {
+    'list': SerializationProfile(
+        OrderSchema,
+        only=('id', 'order_no', 'service_item_id', 'service_provider_id', 'total_amount', 'paid_amount',
+              'status', 'appointment_time', 'address', 'created_at',
+              'service_item.id', 'service_item.title', 'service_item.price', 'service_item.unit',
+              'service_item.images', 'service_item.image_urls'),
+        options=(selectinload(Order.service_item),)
+    ),
+    'detail': SerializationProfile(
+        OrderSchema,
+        only=ORDER_FIELDS + (
+            'service_item.id', 'service_item.title', 'service_item.description', 'service_item.price',
+            'service_item.unit', 'service_item.images', 'service_item.image_urls', 'service_item.category_id',
+            'service_item.category.id', 'service_item.category.name', 'service_item.category.icon',
+            'user.id', 'user.username', 'user.phone', 'user.avatar'
+        ),
+        options=(joinedload(Order.service_item).joinedload(ServiceItem.category), joinedload(Order.user))
+    ),
+}
+
+# 归档订单序列化配置，字段与订单的同名配置一致
+ORDER_ARCHIVE_PROFILES = {
+    'list': SerializationProfile(
+        OrderSchema,
+        only=ORDER_PROFILES['list'].only,
+        options=(selectinload(OrderArchive.service_item),)
+    ),
+    'detail': SerializationProfile(
+        OrderSchema,
+        only=ORDER_PROFILES['detail'].only,
+        options=(joinedload(OrderArchive.service_item).joinedload(ServiceItem.category), joinedload(OrderArchive.user))
+    ),
+}
+
+# 订单评价序列化配置
+REVIEW_PROFILES = {
+    'detail': SerializationProfile(
+        OrderReviewSchema,
+        only=('id', 'order_id', 'user_id', 'service_provider_id', 'rating', 'comment', 'images', 'image_urls',
+              'created_at',
+              'order.id', 'order.order_no', 'order.status', 'order.service_item_id',
+              'user.id', 'user.username', 'user.avatar',
+              'service_provider.id', 'service_provider.real_name'),
+        options=(joinedload(OrderReview.order), joinedload(OrderReview.user), joinedload(OrderReview.service_provider))
+    ),
+}
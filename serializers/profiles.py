@@ -0,0 +1,51 @@
+class SerializationProfile:
+    """序列化配置类
+    将一组要输出的字段与加载这些字段所需的关联预加载选项（selectinload/joinedload）绑定在一起，
+    保证按该配置序列化任意数量的对象时，执行的SQL语句数量是固定的
+    """
+
+    def __init__(self, schema_class, only=None, options=()):
+        # 序列化模式类
+        self.schema_class = schema_class
+        # 要输出的字段，支持'service_item.title'形式的嵌套字段，为空时输出全部字段
+        self.only = tuple(only) if only else None
+        # 查询时需要附加的关联加载选项
+        self.options = tuple(options)
+        # 缓存的序列化模式实例，键为many
+        self._schemas = {}
+
+    def schema(self, many=False):
+        """获取按本配置裁剪字段后的序列化模式实例
+
+        Args:
+            many: 是否序列化多个对象
+
+        Returns:
+            Schema: 序列化模式实例
+        """
+        if many not in self._schemas:
+            self._schemas[many] = self.schema_class(only=self.only, many=many)
+        return self._schemas[many]
+
+    def apply(self, query):
+        """为查询附加本配置的关联加载选项
+
+        Args:
+            query: SQLAlchemy查询对象
+
+        Returns:
+            Query: 附加了加载选项的查询对象
+        """
+        return query.options(*self.options)
+
+    def dump(self, obj, many=False):
+        """按本配置序列化对象
+
+        Args:
+            obj: 要序列化的模型实例或实例列表
+            many: 是否序列化多个对象
+
+        Returns:
+            dict或list: 序列化后的数据
+        """
+        return self.schema(many=many).dump(obj)
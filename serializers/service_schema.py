@@ -1,4 +1,5 @@
 from marshmallow import Schema, fields
+from utils.images import image_urls
 
 class ServiceCategorySchema(Schema):
     """服务类别序列化模式类
@@ -33,6 +34,8 @@ class ServiceItemSchema(Schema):
     unit = fields.Str()
     # 服务项目图片，多个URL用逗号分隔
     images = fields.Str()
+    # 服务项目图片的原图和各尺寸衍生图URL，仅用于序列化输出
+    image_urls = fields.Method('get_image_urls', dump_only=True)
     # 是否在售
     is_on_sale = fields.Bool()
     # 创建时间，仅用于序列化输出
@@ -44,6 +47,10 @@ class ServiceItemSchema(Schema):
     # 关联的服务提供者ID
     service_provider_id = fields.Integer()
 
+    def get_image_urls(self, obj):
+        """获取服务项目图片的原图和衍生图URL"""
+        return image_urls(obj.images)
+
 class ServiceProviderSchema(Schema):
     """服务提供者序列化模式类
     用于将服务提供者模型实例序列化为JSON格式，或将JSON数据反序列化为服务提供者模型实例
@@ -60,10 +67,16 @@ class ServiceProviderSchema(Schema):
     phone = fields.String(required=True)
     # 居住地址
     address = fields.String()
+    # 居住地址的纬度
+    latitude = fields.Float(allow_none=True)
+    # 居住地址的经度
+    longitude = fields.Float(allow_none=True)
     # 工作经验描述
     experience = fields.String()
     # 资质证书，多个URL用逗号分隔
     certificates = fields.String()
+    # 资质证书的原图和各尺寸衍生图URL，仅用于序列化输出
+    certificate_urls = fields.Method('get_certificate_urls', dump_only=True)
     # 是否已通过验证
     is_verified = fields.Boolean()
     # 审核状态
@@ -72,3 +85,17 @@ class ServiceProviderSchema(Schema):
     created_at = fields.DateTime(dump_only=True)
     # 更新时间，仅用于序列化输出
     updated_at = fields.DateTime(dump_only=True)
+    # 评价数量，仅用于序列化输出
+    review_count = fields.Integer(dump_only=True)
+    # 平均评分，仅用于序列化输出
+    rating_avg = fields.Float(dump_only=True)
+    # 各分值（1-5分）的评价数量，仅用于序列化输出
+    rating_histogram = fields.Method('get_rating_histogram', dump_only=True)
+
+    def get_rating_histogram(self, obj):
+        """获取评分直方图，键为分值"""
+        return {str(rating): getattr(obj, f'rating_{rating}') or 0 for rating in range(1, 6)}
+
+    def get_certificate_urls(self, obj):
+        """获取资质证书的原图和衍生图URL"""
+        return image_urls(obj.certificates)
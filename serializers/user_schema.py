@@ -8,6 +8,9 @@ class AddressSchema(Schema):
     detail_address = fields.Str(required=True)
     phone = fields.Str(required=True)
     name = fields.Str()
+    latitude = fields.Float(allow_none=True, validate=validate.Range(-90, 90))
+    longitude = fields.Float(allow_none=True, validate=validate.Range(-180, 180))
+    division_code = fields.Int(dump_only=True)  # 规范化后的行政区划代码
 
 
 class UserSchema(Schema):
@@ -1,10 +1,25 @@
 import pytest
+from datetime import datetime
+from decimal import Decimal
+from flask_jwt_extended import create_access_token
 from app import create_app
+from config import TestingConfig
 from extensions import db
+from models.order import Order
+from models.service import ServiceCategory, ServiceItem, ServiceProvider
+from models.user import User
+from utils import order_state
+from utils.category_tree import category_tree_cache
+from utils.coupon_claims import coupon_cache
+from utils.faq_cache import faq_cache
+from utils.geo_index import provider_geo_index
+from utils.schedule import schedule_index
+from utils.user_bloom import user_bloom_filters
+from utils.user_cache import user_cache
 
 @pytest.fixture
 def app():
-    app = create_app('testing')
+    app = create_app(TestingConfig)
     return app
 
 @pytest.fixture
@@ -13,8 +28,77 @@ def client(app):
 
 @pytest.fixture
 def db_session(app):
+    # 每个测试使用新建的数据库，清空上一个测试留在进程内缓存中的数据
+    for cache in (category_tree_cache, coupon_cache, faq_cache, provider_geo_index, schedule_index,
+                  user_bloom_filters, user_cache):
+        cache.invalidate()
     with app.app_context():
         db.create_all()
         yield db
         db.session.remove()
-        db.drop_all()
\ No newline at end of file
+        db.drop_all()
+
+@pytest.fixture
+def auth_headers(db_session):
+    """生成指定用户的认证请求头"""
+    def auth_headers(user):
+        return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+    return auth_headers
+
+@pytest.fixture
+def customer(db_session):
+    user = User(username='alice', email='alice@example.com', phone='13800000000', password='x')
+    db_session.session.add(user)
+    db_session.session.commit()
+    return user
+
+@pytest.fixture
+def admin(db_session):
+    user = User(username='admin', email='admin@example.com', phone='13800000009', password='x')
+    db_session.session.add(user)
+    db_session.session.commit()
+    return user
+
+@pytest.fixture
+def provider(db_session):
+    user = User(username='bob', email='bob@example.com', phone='13800000001', password='x')
+    db_session.session.add(user)
+    db_session.session.flush()
+    provider = ServiceProvider(user_id=user.id, real_name='鲍勃', id_card='110101199001011234', phone=user.phone)
+    db_session.session.add(provider)
+    db_session.session.commit()
+    return provider
+
+@pytest.fixture
+def item(db_session):
+    category = ServiceCategory(name='保洁')
+    db_session.session.add(category)
+    db_session.session.flush()
+    item = ServiceItem(category_id=category.id, title='日常保洁', price=Decimal('100.00'))
+    db_session.session.add(item)
+    db_session.session.commit()
+    return item
+
+@pytest.fixture
+def make_order(db_session, customer, provider, item):
+    """创建客户的订单，默认为派给服务人员的待支付订单"""
+    def make_order(**values):
+        order = Order(**{
+            'user_id': customer.id,
+            'service_item_id': item.id,
+            'service_provider_id': provider.id,
+            'total_amount': Decimal('100.00'),
+            'status': order_state.PENDING,
+            'appointment_time': datetime(2025, 5, 1, 9),
+            'address': '测试地址',
+            **values,
+        })
+        order.generate_order_no()
+        db_session.session.add(order)
+        db_session.session.commit()
+        return order
+    return make_order
+
+@pytest.fixture
+def order(make_order):
+    return make_order()
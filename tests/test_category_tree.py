@@ -0,0 +1,40 @@
+from decimal import Decimal
+from models.service import ServiceCategory, ServiceItem
+from utils.category_tree import category_tree_cache
+
+def _add(db_session, *objects):
+    db_session.session.add_all(objects)
+    db_session.session.commit()
+    return objects
+
+def test_items_filtered_by_category_subtree(client, db_session):
+    """测试按类别筛选服务项目时包含全部子孙类别"""
+    root, other = _add(db_session, ServiceCategory(name='保洁'), ServiceCategory(name='维修'))
+    child, = _add(db_session, ServiceCategory(name='深度保洁', parent_id=root.id))
+    grandchild, = _add(db_session, ServiceCategory(name='油烟机清洗', parent_id=child.id))
+    items = _add(db_session, *(ServiceItem(category_id=category.id, title=category.name, price=Decimal('10.00'))
+                               for category in (root, child, grandchild, other)))
+
+    tree = client.get('/services/categories').get_json()
+    assert [node['name'] for node in tree[0]['children']] == ['深度保洁']
+    assert tree[0]['children'][0]['children'][0]['id'] == grandchild.id
+
+    data = client.get(f'/services/items?category_id={child.id}').get_json()
+    assert sorted(item['id'] for item in data['items']) == [items[1].id, items[2].id]
+    data = client.get(f'/services/items?category_id={root.id}').get_json()
+    assert len(data['items']) == 3
+
+def test_cache_invalidated_after_commit_not_rollback(client, db_session):
+    """测试写入类别的事务提交后类别树缓存失效，回滚时缓存保持不变"""
+    _add(db_session, ServiceCategory(name='保洁'))
+    tree = category_tree_cache.get()
+    assert category_tree_cache.get() is tree
+
+    db_session.session.add(ServiceCategory(name='维修'))
+    db_session.session.flush()
+    db_session.session.rollback()
+    assert category_tree_cache.get() is tree
+
+    _add(db_session, ServiceCategory(name='维修'))
+    assert category_tree_cache.get() is not tree
+    assert [node['name'] for node in client.get('/services/categories').get_json()] == ['保洁', '维修']
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from models.marketing import Coupon, UserCoupon
+from models.user import User
+from utils.coupon_claims import coupon_cache
+
+@pytest.fixture
+def coupon(db_session):
+    now = datetime.utcnow()
+    coupon = Coupon(code='SPRING', discount_type='fixed', discount_value=Decimal('5.00'),
+                    start_date=now - timedelta(days=1), end_date=now + timedelta(days=1), total_quantity=2)
+    db_session.session.add(coupon)
+    db_session.session.commit()
+    return coupon
+
+def _claim(client, headers, code='SPRING'):
+    return client.post('/marketing/coupons/claim', json={'code': code}, headers=headers)
+
+def test_limited_coupon_is_not_oversold(client, db_session, auth_headers, coupon):
+    """测试限量优惠券最多被领取 total_quantity 张，每个用户只能领取一张"""
+    users = [User(username=f'user{i}', email=f'user{i}@example.com', phone=f'1380000010{i}', password='x')
+             for i in range(3)]
+    db_session.session.add_all(users)
+    db_session.session.commit()
+    headers = [auth_headers(user) for user in users]
+
+    assert _claim(client, headers[0]).status_code == 201
+    assert _claim(client, headers[0]).status_code == 400
+    assert _claim(client, headers[1]).status_code == 201
+    assert _claim(client, headers[2]).status_code == 409
+    # 已领完的优惠券在本进程内记录，不再访问数据库
+    assert coupon_cache.is_sold_out(coupon.id)
+
+    db_session.session.expire_all()
+    assert coupon.claimed_count == 2
+    assert db_session.session.query(UserCoupon).count() == 2
+
+def test_cached_coupon_invalidated_after_commit(client, db_session, auth_headers, customer, coupon):
+    """测试修改优惠券提交后缓存失效，回滚的修改不影响缓存"""
+    headers = auth_headers(customer)
+    assert _claim(client, headers, 'NOPE').status_code == 404
+    assert coupon_cache.get('SPRING') is not None
+
+    coupon.is_active = False
+    db_session.session.flush()
+    db_session.session.rollback()
+    assert coupon_cache._lookup('SPRING') is not None
+
+    coupon.is_active = False
+    db_session.session.commit()
+    assert coupon_cache._lookup('SPRING') is None
+    assert _claim(client, headers).status_code == 404
@@ -0,0 +1,22 @@
+import pytest
+from utils.coupon_codes import ALPHABET, CodePermutation, generate_codes, iter_codes, normalize
+
+def test_codes_are_unique_and_checked():
+    """测试券码不重复，且输错一位的券码能被校验字符识别"""
+    permutation = CodePermutation('secret')
+    codes = list(iter_codes(permutation, 7, 0, 20000))
+
+    assert len(set(codes)) == len(codes)
+    assert set(codes).isdisjoint(iter_codes(permutation, 8, 0, 20000))
+    code = codes[0]
+    assert normalize(code.lower()) == code
+    for position in range(len(code)):
+        for char in ALPHABET:
+            if char != code[position]:
+                assert normalize(code[:position] + char + code[position + 1:]) is None
+
+def test_generate_codes_rejects_non_positive_count():
+    """测试生成数量不是正整数时在预留序号之前报错"""
+    for count in (0, -5, 1.5):
+        with pytest.raises(ValueError):
+            generate_codes(1, count)
@@ -0,0 +1,21 @@
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+
+from utils.coupon_pricing import compute_quotes
+
+Row = namedtuple('Row', 'user_coupon_id coupon_id code discount_type discount_value max_discount end_date')
+
+def test_compute_quotes_orders_by_discount():
+    """测试优惠金额计算（百分比四舍五入、封顶、不超过订单金额）及排序"""
+    rows = [
+        Row(1, 1, 'P15', 'percentage', Decimal('15'), None, datetime(2030, 1, 2)),
+        Row(2, 2, 'P50', 'percentage', Decimal('50'), Decimal('20'), datetime(2030, 1, 1)),
+        Row(3, 3, 'F20', 'fixed', Decimal('20'), None, datetime(2030, 1, 1)),
+        Row(4, 4, 'F500', 'fixed', Decimal('500'), None, datetime(2030, 1, 3)),
+        Row(5, 5, 'X', 'unknown', Decimal('10'), None, datetime(2030, 1, 1)),
+    ]
+    quotes = compute_quotes(Decimal('99.99'), rows)
+
+    assert [quote.code for quote in quotes] == ['F500', 'P50', 'F20', 'P15']
+    assert [quote.discount for quote in quotes] == [Decimal('99.99'), Decimal('20.00'), Decimal('20.00'), Decimal('15.00')]
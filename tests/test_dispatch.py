@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+from extensions import db
+from models.order import Order
+from utils import order_state
+from utils.dispatch import assign
+from utils.schedule import ProviderSchedule, schedule_index
+
+SLOT = timedelta(hours=2)
+WEIGHTS = {'distance': 0.4, 'rating': 0.3, 'load': 0.3}
+T0 = datetime(2025, 5, 1, 9)
+
+def test_assign_prefers_closer_provider_and_respects_slots():
+    """测试派单优先分配较近的服务人员，且同一时段不会重复分配"""
+    schedules = {1: ProviderSchedule(SLOT), 2: ProviderSchedule(SLOT)}
+    ratings = {1: (4.5, 20), 2: (4.5, 20)}
+    orders = {10: T0, 11: T0, 12: T0}
+    candidates = {10: [(1, 0.5), (2, 3.0)], 11: [(1, 0.6), (2, 3.1)], 12: [(1, 0.7), (2, 3.2)]}
+
+    assigned = assign(orders, candidates, schedules, ratings, 10, WEIGHTS)
+
+    assert assigned[10] == 1
+    assert assigned[11] == 2
+    assert 12 not in assigned
+    assert schedules[1].starts == [T0] and schedules[2].starts == [T0]
+
+def test_assign_spreads_load():
+    """测试负载增加后其他服务人员的得分更高"""
+    schedules = {1: ProviderSchedule(SLOT), 2: ProviderSchedule(SLOT)}
+    ratings = {1: (5.0, 100), 2: (5.0, 100)}
+    orders = {10: T0, 11: T0 + SLOT}
+    candidates = {10: [(1, 1.0), (2, 1.2)], 11: [(1, 1.0), (2, 1.2)]}
+
+    assigned = assign(orders, candidates, schedules, ratings, 10, WEIGHTS)
+
+    assert sorted(assigned.values()) == [1, 2]
+
+def test_cancel_releases_slot_assigned_after_order_was_read(client, db_session, auth_headers, customer, provider,
+                                                            make_order, monkeypatch):
+    """测试取消请求读取订单后派单进程才分配服务人员时，取消仍释放该服务人员的时段"""
+    order = make_order(service_provider_id=None, appointment_time=T0)
+    order_id = order.id
+    assert schedule_index.get(provider.id).is_free(T0)
+
+    transition = order_state.transition
+
+    def dispatch_then_transition(event, *criteria, **values):
+        # 派单进程在取消的条件UPDATE之前提交了分配结果
+        db.session.execute(db.update(Order).where(Order.id == order_id).values(service_provider_id=provider.id))
+        schedule_index.add(provider.id, T0)
+        return transition(event, *criteria, **values)
+
+    monkeypatch.setattr(order_state, 'transition', dispatch_then_transition)
+    response = client.post(f'/orders/{order_id}/cancel', headers=auth_headers(customer))
+    assert response.status_code == 200
+    assert schedule_index.get(provider.id).is_free(T0)
@@ -0,0 +1,27 @@
+import os
+from utils.divisions import load_divisions, division_range
+
+DIVISIONS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'divisions.csv')
+
+def test_autocomplete_by_hanzi_and_pinyin():
+    """测试按汉字、全拼和拼音首字母前缀自动补全，全称完全匹配的排在前面"""
+    index = load_divisions(DIVISIONS_FILE)
+
+    assert index.autocomplete('海淀')[0].code == 110108
+    assert index.autocomplete('haidian')[0].code == 110108
+    assert 440106 in [d.code for d in index.autocomplete('thq')]
+    assert [d.code for d in index.autocomplete('nan', parent=440100)] == [440115]
+    assert index.full_name(110108) == '北京市 海淀区'
+
+def test_resolve_and_parse_normalize_spelling_variants():
+    """测试不同写法的省市区规范化为同一个区划代码"""
+    index = load_divisions(DIVISIONS_FILE)
+
+    assert index.resolve('广东省', '广州市', '天河区') == (440106, True)
+    assert index.resolve('广东', '广州', '天河') == (440106, True)
+    assert index.resolve('北京', '', '海淀区') == (110108, False)
+    assert index.resolve('火星', '', '') == (None, False)
+    assert index.parse('北京市海淀区中关村大街1号') == 110108
+    assert index.parse('广东广州天河区体育西路') == 440106
+    assert index.parse('浙江省宁波市鄞州区') == 330200
+    assert division_range(440100) == (440100, 440199)
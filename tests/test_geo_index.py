@@ -0,0 +1,37 @@
+import random
+
+from utils.geo_index import GridIndex, haversine_km
+
+def test_nearest_matches_brute_force():
+    """测试网格索引的最近邻查询结果与逐个计算距离的结果一致"""
+    rng = random.Random(42)
+    points = {i: (31 + rng.random(), 121 + rng.random()) for i in range(5000)}
+    grid = GridIndex(0.01)
+    for key, (lat, lng) in points.items():
+        grid.put(key, lat, lng)
+
+    for _ in range(50):
+        lat, lng = 31 + rng.random(), 121 + rng.random()
+        expected = sorted(
+            (d, key) for key, (plat, plng) in points.items()
+            if (d := haversine_km(lat, lng, plat, plng)) <= 3
+        )[:10]
+        assert [key for key, _ in grid.nearest(lat, lng, 10, 3)] == [key for _, key in expected]
+
+def test_put_moves_and_discard_removes():
+    """测试移动和删除点后索引保持正确"""
+    grid = GridIndex(0.01)
+    grid.put(1, 31.0, 121.0)
+    grid.put(1, 39.9, 116.4)
+    grid.put(2, 31.001, 121.001)
+    assert [key for key, _ in grid.nearest(31.0, 121.0, 5, 10)] == [2]
+    grid.discard(2)
+    grid.discard(3)
+    assert grid.nearest(31.0, 121.0, 5, 10) == []
+    assert len(grid) == 1
+
+def test_nearest_across_antimeridian():
+    """测试跨越180度经线的查询"""
+    grid = GridIndex(0.01)
+    grid.put(1, 0.0, -179.999)
+    assert [key for key, _ in grid.nearest(0.0, 179.999, 1, 1)] == [1]
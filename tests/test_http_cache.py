@@ -0,0 +1,68 @@
+import pytest
+from models.service import ServiceCategory, ServiceItem
+from models.support import FAQ
+
+@pytest.fixture
+def category(db_session):
+    category = ServiceCategory(name='保洁')
+    db_session.session.add(category)
+    db_session.session.commit()
+    return category
+
+def test_items_etag_changes_after_write_from_any_process(client, db_session, category):
+    """测试服务项目列表的ETag每次从数据库计算，其他进程的新增和删除立即使客户端缓存失效"""
+    db_session.session.add(ServiceItem(category_id=category.id, title='日常保洁', price=50))
+    db_session.session.commit()
+    response = client.get('/services/items')
+    etag = response.headers['ETag']
+    assert response.status_code == 200 and response.get_json()['total'] == 1
+    assert 'Last-Modified' not in response.headers
+    assert client.get('/services/items', headers={'If-None-Match': etag}).status_code == 304
+
+    # 绕过ORM写入，模拟其他进程
+    db_session.session.execute(ServiceItem.__table__.insert().values(
+        category_id=category.id, title='深度保洁', price=100))
+    db_session.session.commit()
+    response = client.get('/services/items', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.get_json()['total'] == 2
+    etag = response.headers['ETag']
+
+    db_session.session.execute(ServiceItem.__table__.delete().where(ServiceItem.title == '深度保洁'))
+    db_session.session.commit()
+    response = client.get('/services/items', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.get_json()['total'] == 1
+
+@pytest.mark.parametrize('url, cache_control', [
+    ('/services/categories', 'public, max-age=300'),
+    ('/support/faq', 'public, max-age=3600'),
+])
+def test_conditional_get(client, db_session, category, url, cache_control):
+    """测试类别树和常见问题返回ETag与Cache-Control，客户端缓存有效时返回空的304"""
+    response = client.get(url)
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == cache_control
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert response.data == b''
+    assert client.get(url, headers={'If-None-Match': '"stale"'}).status_code == 200
+
+def test_faq_etag_changes_after_commit(client, db_session):
+    """测试常见问题提交修改后ETag变化，回滚的修改不影响缓存"""
+    faq = FAQ(question='如何取消订单？', answer='在订单详情页取消')
+    db_session.session.add(faq)
+    db_session.session.commit()
+    etag = client.get('/support/faq').headers['ETag']
+
+    faq.answer = '待支付的订单可以取消'
+    db_session.session.flush()
+    db_session.session.rollback()
+    assert client.get('/support/faq', headers={'If-None-Match': etag}).status_code == 304
+
+    faq.answer = '待支付的订单可以取消'
+    db_session.session.commit()
+    response = client.get('/support/faq', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()[0]['answer'] == '待支付的订单可以取消'
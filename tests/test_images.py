@@ -0,0 +1,56 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+from utils.images import derivative_relpath, image_urls, original_relpath, process_missing
+
+@pytest.fixture
+def upload_folder(app, tmp_path):
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    return tmp_path
+
+def _png(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 80, 40)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+def _upload(client, headers, data):
+    return client.post('/uploads/images', headers=headers,
+                       data={'file': (io.BytesIO(data), 'photo.png')}, content_type='multipart/form-data')
+
+def test_upload_is_deduplicated_and_gets_derivatives(app, client, db_session, auth_headers, customer,
+                                                      upload_folder):
+    """测试相同内容的图片只保存一份，并生成各尺寸的WebP衍生图"""
+    headers = auth_headers(customer)
+    data = _png(1200, 600)
+
+    first = _upload(client, headers, data)
+    assert first.status_code == 201
+    second = _upload(client, headers, data)
+    assert second.status_code == 200
+    assert second.get_json()['deduplicated'] is True
+    digest = first.get_json()['hash']
+    assert second.get_json()['hash'] == digest
+    assert os.listdir(upload_folder / 'originals' / digest[:2] / digest[2:4]) == [os.path.basename(original_relpath(digest, 'png'))]
+
+    process_missing()
+    for variant, size in app.config['IMAGE_VARIANTS'].items():
+        with Image.open(upload_folder / derivative_relpath(digest, variant)) as image:
+            assert image.format == 'WEBP'
+            assert max(image.size) == size
+    urls = first.get_json()['urls']
+    assert urls['original'] == first.get_json()['url']
+    assert urls['thumbnail'].endswith(derivative_relpath(digest, 'thumbnail'))
+
+def test_upload_rejects_unsupported_format(client, db_session, auth_headers, customer, upload_folder):
+    """测试不是图片的文件返回400，且不留下临时文件"""
+    response = _upload(client, auth_headers(customer), b'%PDF-1.4 not an image')
+    assert response.status_code == 400
+    assert os.listdir(upload_folder / 'tmp') == []
+
+def test_external_images_use_original_url(app):
+    """测试不是本系统上传的图片各尺寸都使用原图URL"""
+    with app.app_context():
+        urls = image_urls('https://example.com/a.jpg, ')
+    assert urls == [dict.fromkeys(['original', *app.config['IMAGE_VARIANTS']], 'https://example.com/a.jpg')]
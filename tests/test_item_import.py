@@ -0,0 +1,20 @@
+import io
+import pytest
+from utils.item_import import check_header, iter_csv, iter_rows, _clean
+
+def test_iter_csv_streams_rows_and_strips_bom():
+    """测试CSV逐行读取时去掉BOM，空单元格和多余的列不进入导入数据"""
+    stream = io.BytesIO('﻿title,price,category,extra\n日常保洁,59.9,保洁,x\n,,,\n'.encode('utf-8'))
+    rows = [_clean(row) for row in iter_csv(stream)]
+
+    assert rows == [{'title': '日常保洁', 'price': '59.9', 'category': '保洁'}, {}]
+    assert not stream.closed
+
+def test_check_header_requires_category_column():
+    """测试表头缺少必须的列时报错，类别可以用名称或ID指定"""
+    check_header(['title', 'price', 'category'])
+    check_header(['title', 'price', 'category_id'])
+    with pytest.raises(ValueError, match='price, category'):
+        check_header(['title'])
+    with pytest.raises(ValueError):
+        iter_rows(io.BytesIO(b''), 'items.txt')
@@ -0,0 +1,28 @@
+from decimal import Decimal
+from models.service import ServiceCategory, ServiceItem
+
+def test_keyset_and_page_pagination(client, db_session):
+    """测试游标分页按ID遍历全部服务项目，页码分页返回与聚合查询一致的总数"""
+    category = ServiceCategory(name='保洁')
+    db_session.session.add(category)
+    db_session.session.flush()
+    db_session.session.add_all(ServiceItem(category_id=category.id, title=f'项目{i}', price=Decimal('10.00'),
+                                           is_on_sale=i != 3)
+                               for i in range(5))
+    db_session.session.commit()
+
+    ids, after = [], 0
+    while after is not None:
+        data = client.get(f'/services/items?after={after}&per_page=2').get_json()
+        assert 'total' not in data
+        assert data['has_more'] == (data['next_after'] is not None)
+        ids.extend(item['id'] for item in data['items'])
+        after = data['next_after']
+    assert ids == [1, 2, 3, 4, 5]
+
+    data = client.get('/services/items?after=0&per_page=2&with_total=1&on_sale=1').get_json()
+    assert data['total'] == 4
+
+    data = client.get('/services/items?page=3&per_page=2').get_json()
+    assert [item['id'] for item in data['items']] == [5]
+    assert data['total'] == 5
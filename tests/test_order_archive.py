@@ -0,0 +1,64 @@
+import json
+import sqlite3
+
+import pytest
+from datetime import datetime, timedelta
+from app import create_app
+from config import TestingConfig
+from models.order import Order, OrderArchive
+from utils import order_state
+from utils.order_archive import ARCHIVE_COLUMNS, archive_orders
+from views.admin import routes as admin_routes
+
+@pytest.fixture
+def database_path(tmp_path):
+    # 使用WAL模式的数据库文件，导出过程中其他连接可以提交归档
+    path = tmp_path / 'orders.db'
+    sqlite3.connect(path).execute('PRAGMA journal_mode=WAL').close()
+    return path
+
+@pytest.fixture
+def app(database_path):
+    class Config(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{database_path}'
+
+    return create_app(Config)
+
+def test_archive_moves_only_old_finished_orders(db_session, make_order):
+    """测试只归档超过保留期的已完成和已取消订单，订单ID和订单号不变"""
+    old = datetime.utcnow() - timedelta(days=60)
+    completed = make_order(status=order_state.COMPLETED, updated_at=old)
+    cancelled = make_order(status=order_state.CANCELLED, updated_at=old)
+    paid = make_order(status=order_state.PAID, updated_at=old)
+    recent = make_order(status=order_state.COMPLETED)
+    order_nos = {completed.id: completed.order_no, cancelled.id: cancelled.order_no}
+
+    assert archive_orders(days=30) == 2
+    assert set(db_session.session.scalars(db_session.select(Order.id))) == {paid.id, recent.id}
+    archived = db_session.session.execute(db_session.select(OrderArchive.id, OrderArchive.order_no)).all()
+    assert dict(archived) == order_nos
+
+def test_export_is_complete_while_orders_are_archived(database_path, client, db_session, auth_headers, admin, make_order,
+                                                      monkeypatch):
+    """测试导出过程中归档订单，每个订单恰好导出一次"""
+    monkeypatch.setattr(admin_routes, 'EXPORT_BATCH_SIZE', 1)
+    order_ids = [make_order(status=order_state.COMPLETED).id for _ in range(3)]
+
+    response = client.get('/admin/exports/orders', headers=auth_headers(admin), buffered=False)
+    chunks = iter(response.response)
+    lines = [next(chunks)]
+
+    # 其他进程把所有订单移动到归档表
+    other = sqlite3.connect(database_path, isolation_level=None)
+    columns = ', '.join(ARCHIVE_COLUMNS)
+    other.execute('BEGIN')
+    other.execute(f'INSERT INTO order_archive ({columns}, archived_at) '
+                  f'SELECT {columns}, CURRENT_TIMESTAMP FROM "order"')
+    other.execute('DELETE FROM "order"')
+    other.execute('COMMIT')
+    other.close()
+
+    lines.extend(chunks)
+    response.close()
+    exported = [json.loads(line)['id'] for line in b''.join(lines).decode().splitlines()]
+    assert sorted(exported) == order_ids
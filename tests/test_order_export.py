@@ -0,0 +1,40 @@
+import csv
+import io
+import json
+
+from datetime import datetime
+from serializers.order_schema import ORDER_FIELDS
+from utils import order_state
+
+def test_export_requires_admin(client, db_session, auth_headers, customer):
+    """测试只有管理员可以导出订单"""
+    assert client.get('/admin/exports/orders', headers=auth_headers(customer)).status_code == 403
+
+def test_export_formats_and_filters(client, db_session, auth_headers, admin, make_order):
+    """测试NDJSON和CSV导出的内容以及状态、时间范围筛选"""
+    headers = auth_headers(admin)
+    paid = make_order(status=order_state.PAID, created_at=datetime(2025, 5, 1), remark='换行\n"引号"')
+    pending = make_order(created_at=datetime(2025, 6, 1))
+
+    response = client.get('/admin/exports/orders', headers=headers)
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['id'] for row in rows] == [paid.id, pending.id]
+    assert set(rows[0]) == set(ORDER_FIELDS)
+    assert rows[0]['total_amount'] == '100.00'
+
+    response = client.get('/admin/exports/orders?format=csv&status=paid', headers=headers)
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == list(ORDER_FIELDS)
+    assert len(rows) == 2
+    assert rows[1][ORDER_FIELDS.index('remark')] == '换行\n"引号"'
+
+    response = client.get('/admin/exports/orders?created_from=2025-05-15T00:00:00', headers=headers)
+    assert [json.loads(line)['id'] for line in response.get_data(as_text=True).splitlines()] == [pending.id]
+
+def test_export_rejects_invalid_parameters(client, db_session, auth_headers, admin):
+    """测试不支持的格式和无法解析的时间返回400"""
+    headers = auth_headers(admin)
+    assert client.get('/admin/exports/orders?format=xml', headers=headers).status_code == 400
+    assert client.get('/admin/exports/orders?paid_from=yesterday', headers=headers).status_code == 400
@@ -0,0 +1,81 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from extensions import db
+from models.service import ServiceItem
+from utils import order_state
+from utils.order_archive import archive_orders
+
+T0 = datetime(2025, 5, 1, 9)
+
+def test_cursor_pages_cover_live_and_archived_orders(client, db_session, auth_headers, customer, make_order):
+    """测试游标分页按 (created_at, id) 倒序遍历全部订单（含已归档订单），同一创建时间的订单不重复也不遗漏"""
+    old = datetime.utcnow() - timedelta(days=60)
+    for i in range(8):
+        # 每两个订单的创建时间相同，其中先创建的订单已完成并归档
+        status = order_state.COMPLETED if i % 2 == 0 else order_state.PENDING
+        make_order(status=status, created_at=T0 + timedelta(minutes=i // 2), updated_at=old)
+    assert archive_orders(days=30) == 4
+
+    ids, cursor = [], None
+    while True:
+        url = '/orders/?per_page=3' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url, headers=auth_headers(customer)).get_json()
+        assert len(data['items']) <= 3
+        ids.extend(item['id'] for item in data['items'])
+        cursor = data['next_cursor']
+        assert data['has_more'] == (cursor is not None)
+        if not cursor:
+            break
+    assert ids == [8, 7, 6, 5, 4, 3, 2, 1]
+
+    data = client.get('/orders/?status=completed', headers=auth_headers(customer)).get_json()
+    assert [item['id'] for item in data['items']] == [7, 5, 3, 1]
+
+def test_invalid_cursor_is_rejected(client, db_session, auth_headers, customer):
+    """测试无法解析的游标返回400"""
+    response = client.get('/orders/?cursor=not-a-cursor', headers=auth_headers(customer))
+    assert response.status_code == 400
+
+@contextmanager
+def count_queries():
+    """统计执行的SQL语句数量"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db.event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        db.event.remove(db.engine, 'before_cursor_execute', record)
+
+def test_order_profiles_use_fixed_number_of_queries(client, db_session, auth_headers, customer, item, make_order):
+    """测试订单列表和详情的SQL语句数量与订单数量无关，且包含配置的嵌套字段"""
+    headers = auth_headers(customer)
+
+    def list_orders():
+        with count_queries() as statements:
+            data = client.get('/orders/?per_page=100', headers=headers).get_json()
+        return data, len(statements)
+
+    make_order()
+    list_orders()  # 首次请求会加载令牌吊销列表
+    _, single = list_orders()
+    for i in range(5):
+        other = ServiceItem(category_id=item.category_id, title=f'项目{i}', price=Decimal('50.00'))
+        db_session.session.add(other)
+        db_session.session.commit()
+        make_order(service_item_id=other.id)
+    data, many = list_orders()
+    assert many == single
+    assert len(data['items']) == 6
+    assert set(data['items'][0]['service_item']) >= {'id', 'title', 'price'}
+    assert 'description' not in data['items'][0]['service_item']
+
+    with count_queries() as statements:
+        detail = client.get(f"/orders/{data['items'][0]['id']}", headers=headers).get_json()
+    assert len(statements) <= 2
+    assert detail['service_item']['category']['name'] == '保洁'
+    assert detail['user']['username'] == customer.username
@@ -0,0 +1,36 @@
+import os
+import pytest
+from utils.order_no import OrderNoGenerator, format_order_no, MAX_SEQUENCE, MAX_WORKER_ID
+
+def test_order_no_unique_and_monotonic():
+    """测试订单号生成器在同一毫秒内序号用尽时仍保持唯一且单调递增"""
+    generator = OrderNoGenerator(worker_id=7)
+    ids = generator.next_ids((MAX_SEQUENCE + 1) * 3)
+
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+    assert all((i >> 12) & 0x3FF == 7 for i in ids)
+
+def test_order_no_differs_across_workers():
+    """测试不同worker ID生成的订单号互不冲突"""
+    a = OrderNoGenerator(worker_id=1).next_ids(1000)
+    b = OrderNoGenerator(worker_id=2).next_ids(1000)
+
+    assert not set(a) & set(b)
+    assert len(format_order_no(a[0])) == 19
+
+def test_worker_id_fallback(monkeypatch):
+    """测试未设置ORDER_WORKER_ID时开发环境退化为PID低位、生产环境报错"""
+    monkeypatch.delenv('ORDER_WORKER_ID', raising=False)
+    assert OrderNoGenerator().worker_id == os.getpid() & MAX_WORKER_ID
+    with pytest.raises(RuntimeError):
+        OrderNoGenerator(require_worker_id=True).next_id()
+
+    monkeypatch.setenv('ORDER_WORKER_ID', '1024')
+    with pytest.raises(ValueError):
+        OrderNoGenerator().next_id()
+    monkeypatch.setenv('ORDER_WORKER_ID', '5')
+    generator = OrderNoGenerator(require_worker_id=True)
+    assert generator.worker_id == 5
+    generator.reset()
+    assert generator.require_worker_id
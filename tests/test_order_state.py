@@ -0,0 +1,32 @@
+from models.order import Order
+from utils import order_state
+from views.admin import OrderModelView
+
+def test_illegal_transitions_are_rejected(client, db_session, auth_headers, customer, provider, order):
+    """测试非法的状态转换返回冲突，且不修改订单状态"""
+    # 待支付的订单不能完成
+    response = client.post(f'/orders/{order.id}/complete', headers=auth_headers(provider.user))
+    assert response.status_code == 409
+
+    client.post('/payments/callback', json={'order_no': order.order_no, 'status': 'success'})
+    db_session.session.expire_all()
+    assert order.status == order_state.PAID
+    assert order.paid_at is not None
+
+    # 已支付的订单不能取消，重复的支付回调不会改变状态
+    assert client.post(f'/orders/{order.id}/cancel', headers=auth_headers(customer)).status_code == 400
+    assert not order_state.transition('pay', Order.id == order.id)
+
+    # 订单只能由派单的服务人员完成
+    assert client.post(f'/orders/{order.id}/complete', headers=auth_headers(customer)).status_code == 403
+    response = client.post(f'/orders/{order.id}/complete', headers=auth_headers(provider.user))
+    assert response.status_code == 200
+    db_session.session.expire_all()
+    assert order.status == order_state.COMPLETED
+    assert client.post(f'/orders/{order.id}/complete', headers=auth_headers(provider.user)).status_code == 409
+
+def test_admin_order_form_cannot_set_status(app, db_session):
+    """测试后台订单表单不包含状态字段"""
+    view = OrderModelView(Order, db_session.session, endpoint='order_state_test')
+    assert not hasattr(view._edit_form_class, 'status')
+    assert hasattr(view._edit_form_class, 'order_no')
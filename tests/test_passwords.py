@@ -0,0 +1,53 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from werkzeug.security import generate_password_hash
+from utils.passwords import PasswordHasher, PasswordHasherBusy
+
+def test_needs_rehash_when_method_changes():
+    """测试哈希参数与当前配置不同时需要重新计算，新哈希可以正常校验"""
+    hasher = PasswordHasher(0, 4, method='pbkdf2:sha256:1000')
+    old = generate_password_hash('secret', method='pbkdf2:sha256:500')
+
+    assert hasher.verify(old, 'secret')
+    assert hasher.needs_rehash(old)
+    new = hasher.hash('secret')
+    assert not hasher.needs_rehash(new)
+    assert hasher.verify(new, 'secret') and not hasher.verify(new, 'wrong')
+
+def test_rejects_when_saturated():
+    """测试等待中的任务达到上限时立即拒绝，任务完成后恢复"""
+    hasher = PasswordHasher(0, 1, method='pbkdf2:sha256:1000')
+    hasher._slots.acquire()
+    with pytest.raises(PasswordHasherBusy):
+        hasher.hash('secret')
+    hasher._slots.release()
+    assert hasher.hash('secret')
+
+def test_timed_out_task_keeps_slot_until_done():
+    """测试等待超时的任务被取消，仍在计算的任务结束前继续占用名额"""
+    started, finish = threading.Event(), threading.Event()
+
+    def slow(*args):
+        started.set()
+        finish.wait(5)
+        return 'done'
+
+    hasher = PasswordHasher(1, 2, timeout=0.05)
+    hasher._executor = ThreadPoolExecutor(max_workers=1)
+    hasher._pid = os.getpid()
+    with pytest.raises(PasswordHasherBusy):
+        hasher._run(slow)
+    started.wait(5)
+    # 排队中的任务超时后被取消，立即释放名额
+    with pytest.raises(PasswordHasherBusy):
+        hasher._run(slow)
+    assert hasher._slots.acquire(blocking=False)
+    # 第一个任务仍在计算，名额未释放
+    assert not hasher._slots.acquire(blocking=False)
+    finish.set()
+    hasher._executor.shutdown()
+    hasher._slots.release()
+    assert hasher._slots.acquire(blocking=False) and hasher._slots.acquire(blocking=False)
@@ -0,0 +1,32 @@
+from utils import order_state
+from utils.provider_rating import RATINGS, rebuild_provider_ratings
+
+def _stats(provider):
+    return (provider.review_count, provider.rating_sum, provider.rating_avg,
+            tuple(getattr(provider, f'rating_{rating}') for rating in RATINGS))
+
+def test_reviews_update_rating_stats(client, db_session, auth_headers, customer, provider, make_order):
+    """测试创建评价时增量更新服务人员的评分统计，结果与全量重建一致"""
+    headers = auth_headers(customer)
+    updated_at = provider.updated_at
+    orders = [make_order(status=order_state.COMPLETED) for _ in range(3)]
+
+    for order, rating in zip(orders, (5, 2)):
+        response = client.post(f'/orders/{order.id}/review', json={'rating': rating, 'comment': '好'}, headers=headers)
+        assert response.status_code == 201
+    # 重复评价和非法评分不计入统计
+    response = client.post(f'/orders/{orders[0].id}/review', json={'rating': 1, 'comment': '差'}, headers=headers)
+    assert response.status_code == 400
+    response = client.post(f'/orders/{orders[2].id}/review', json={'rating': 6, 'comment': '好'}, headers=headers)
+    assert response.status_code == 400
+
+    db_session.session.expire_all()
+    assert _stats(provider) == (2, 7, 3.5, (0, 1, 0, 0, 1))
+    assert provider.updated_at == updated_at
+
+    # 统计被破坏后全量重建
+    provider.review_count = 0
+    db_session.session.commit()
+    assert rebuild_provider_ratings() == 1
+    db_session.session.expire_all()
+    assert _stats(provider) == (2, 7, 3.5, (0, 1, 0, 0, 1))
@@ -0,0 +1,54 @@
+import sqlite3
+
+import pytest
+from datetime import datetime, timedelta
+from app import create_app
+from config import TestingConfig
+from extensions import db
+from utils.schedule import ProviderSchedule, schedule_index
+
+def test_provider_schedule_conflicts():
+    """测试服务人员档期冲突检测与空闲时段查询"""
+    slot = timedelta(hours=2)
+    base = datetime(2030, 1, 1, 8, 0)
+    schedule = ProviderSchedule(slot, [base + timedelta(hours=2), base + timedelta(hours=5)])
+
+    assert schedule.is_free(base)
+    assert not schedule.is_free(base + timedelta(hours=1))
+    assert schedule.is_free(base + timedelta(hours=7))
+    assert schedule.next_free_slots(base, 3) == [
+        base,
+        base + timedelta(hours=7),
+        base + timedelta(hours=9),
+    ]
+
+    schedule.remove(base + timedelta(hours=2))
+    assert schedule.is_free(base + timedelta(hours=2))
+
+def test_aware_appointment_time_is_naive_utc():
+    """测试带时区的预约时间转换为不带时区的UTC时间后可与档期比较"""
+    from utils.helpers import parse_datetime
+    when = parse_datetime('2030-01-01T12:00:00+08:00')
+    assert when == datetime(2030, 1, 1, 4, 0) and when.tzinfo is None
+    schedule = ProviderSchedule(timedelta(hours=2), [datetime(2030, 1, 1, 3, 0)])
+    assert not schedule.is_free(when)
+
+def test_locked_load_takes_sqlite_write_lock(tmp_path):
+    """测试SQLite下加锁加载档期即取得写锁，其他连接在提交前无法开始写事务"""
+    path = tmp_path / 'schedule.db'
+
+    class Config(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    app = create_app(Config)
+    with app.app_context():
+        db.create_all()
+        other = sqlite3.connect(path, timeout=0, isolation_level=None)
+
+        schedule_index.get_many([1], lock=True)
+        with pytest.raises(sqlite3.OperationalError, match='locked'):
+            other.execute('BEGIN IMMEDIATE')
+        db.session.rollback()
+        other.execute('BEGIN IMMEDIATE')
+        other.execute('ROLLBACK')
+        other.close()
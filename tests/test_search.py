@@ -0,0 +1,44 @@
+from sqlalchemy import create_engine
+
+from utils import search
+from utils.search import index_exists, make_snippet, query_terms, segment
+
+def test_segment_splits_cjk_into_bigrams():
+    """测试中文被切分为重叠二元组，写入索引时保留末尾单字"""
+    assert segment('深度保洁 Deep clean').split() == ['深度', '度保', '保洁', 'Deep', 'clean']
+    assert segment('清洗', tail=True).split() == ['清洗', '洗']
+    assert segment(None) == ''
+
+def test_query_terms():
+    """测试查询词拆分：多字按二元组短语匹配，单个汉字按前缀匹配"""
+    assert query_terms('油烟机 deep-clean') == [(['油烟', '烟机'], False), (['deep'], False), (['clean'], False)]
+    assert query_terms('洗') == [(['洗'], True)]
+    assert query_terms('"*') == []
+
+def test_make_snippet_highlights_match():
+    """测试片段截取与关键词高亮"""
+    text = '专业家庭深度清洁，包含厨房油烟机清洗'
+    assert make_snippet(text, '油烟机', width=2) == '…厨房<b>油烟机</b>清洗'
+    assert make_snippet(text, '月嫂', width=2) == '专业家庭…'
+
+def test_make_snippet_escapes_html():
+    """测试片段中的原文经过HTML转义，只保留高亮标记"""
+    text = '<script>alert(1)</script> 油烟机 & "清洗"'
+    assert make_snippet(text, '油烟机') == '&lt;script&gt;alert(1)&lt;/script&gt; <b>油烟机</b> &amp; &#34;清洗&#34;'
+    assert make_snippet('<i>月嫂</i>', '保洁') == '&lt;i&gt;月嫂&lt;/i&gt;'
+
+def test_missing_index_is_rechecked(tmp_path, monkeypatch):
+    """测试索引表不存在的结果只短暂缓存，其他进程创建索引表后可以检测到"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    with engine.connect() as connection:
+        assert not index_exists(connection)
+        # 模拟其他进程创建索引表
+        connection.exec_driver_sql(f'CREATE VIRTUAL TABLE {search.SQLITE_TABLE} USING fts5(title, description)')
+        connection.commit()
+        assert not index_exists(connection)
+
+        monkeypatch.setattr(search, 'MISSING_INDEX_RECHECK', 0)
+        assert index_exists(connection)
+        monkeypatch.undo()
+        assert index_exists(connection)
+    engine.dispose()
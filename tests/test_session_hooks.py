@@ -0,0 +1,26 @@
+from extensions import db
+from utils.session_hooks import on_commit
+
+def test_callbacks_run_once_after_commit(db_session):
+    """测试回调在提交后执行一次，同一事务内的变更合并传给回调"""
+    calls = []
+    changes = on_commit(db.session, 'test', calls.append, set)
+    changes.add(1)
+    on_commit(db.session, 'test', calls.append, set).add(2)
+    on_commit(db.session, 'flag', lambda: calls.append('flag'))
+    on_commit(db.session, 'flag', lambda: calls.append('again'))
+    assert calls == []
+
+    db.session.commit()
+    assert calls == [{1, 2}, 'flag']
+    db.session.commit()
+    assert len(calls) == 2
+
+def test_callbacks_discarded_on_rollback(db_session):
+    """测试回滚时丢弃已登记的回调"""
+    calls = []
+    db.session.execute(db.select(1))
+    on_commit(db.session, 'test', calls.append, list).append(1)
+    db.session.rollback()
+    db.session.commit()
+    assert calls == []
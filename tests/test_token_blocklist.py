@@ -0,0 +1,31 @@
+import time
+
+from flask_jwt_extended import create_refresh_token
+
+from models.user import User
+from utils.token_blocklist import TokenBlocklist, token_blocklist
+
+def test_blocklist_drops_expired_entries():
+    """测试吊销列表按过期时间自动清除条目"""
+    blocklist = TokenBlocklist()
+    now = time.time()
+    blocklist.add([('expired', now - 1), ('active', now + 60)])
+
+    blocklist._purge(now)
+    assert 'expired' not in blocklist._entries
+    assert blocklist._entries['active'] == now + 60
+    assert len(blocklist._expiry) == 1
+
+def test_refresh_token_cannot_be_replayed(client, db_session):
+    """测试刷新令牌只能使用一次，尚未同步吊销列表的进程也拒绝重复使用"""
+    user = User(username='alice', email='alice@example.com', phone='13800000000', password='x')
+    db_session.session.add(user)
+    db_session.session.commit()
+    headers = {'Authorization': f'Bearer {create_refresh_token(identity=str(user.id))}'}
+
+    assert client.post('/users/refresh', headers=headers).status_code == 200
+    # 模拟另一个尚未同步吊销记录的进程
+    token_blocklist._entries.clear()
+    response = client.post('/users/refresh', headers=headers)
+    assert response.status_code == 401
+    assert 'access_token' not in response.get_json()
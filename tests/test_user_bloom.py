@@ -0,0 +1,38 @@
+from models.user import User
+from utils.user_bloom import FIELDS, BloomFilter, find_taken, user_bloom_filters
+
+def test_bloom_filter_has_no_false_negatives():
+    """测试布隆过滤器不漏判，误判率接近设定值"""
+    bloom = BloomFilter(10000, 0.01)
+    for i in range(10000):
+        bloom.add(f'user{i}@example.com')
+
+    assert all(f'user{i}@example.com' in bloom for i in range(10000))
+    false_positives = sum(f'other{i}@example.com' in bloom for i in range(10000))
+    assert false_positives < 300
+
+def test_bloom_filter_counts_each_element_once():
+    """测试重复加入同一元素不增加计数"""
+    bloom = BloomFilter(100, 0.01)
+    bloom.add('alice@example.com')
+    bloom.add('alice@example.com')
+    assert bloom.count == 1
+
+def test_only_changed_fields_are_added_after_update(db_session):
+    """测试修改用户时只把修改过的字段加入过滤器"""
+    user = User(username='alice', email='alice@example.com', phone='13800000000', password='x')
+    db_session.session.add(user)
+    db_session.session.commit()
+    assert find_taken(email='alice@example.com') == {'email'}
+    filters = user_bloom_filters._filters
+    counts = {field: filters[field].count for field in FIELDS}
+
+    user.password = 'y'
+    db_session.session.commit()
+    assert {field: filters[field].count for field in FIELDS} == counts
+
+    user.email = 'alice2@example.com'
+    db_session.session.commit()
+    assert filters['email'].count == counts['email'] + 1
+    assert filters['phone'].count == counts['phone']
+    assert find_taken(email='alice2@example.com') == {'email'}
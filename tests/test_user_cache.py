@@ -0,0 +1,36 @@
+from extensions import db
+from models.user import User
+from utils.user_cache import user_cache
+
+def _profile(client, headers):
+    response = client.get('/users/profile', headers=headers)
+    return response.status_code, (response.get_json() or {}).get('username')
+
+def test_cached_user_invalidated_after_commit_not_rollback(client, db_session, auth_headers, customer):
+    """测试当前用户缓存命中时不查询数据库，提交修改后失效，回滚的修改不影响缓存"""
+    headers = auth_headers(customer)
+    assert _profile(client, headers) == (200, 'alice')
+    assert customer.id in user_cache._entries
+
+    # 绕过ORM修改不会触发失效，缓存命中时仍返回旧值
+    db_session.session.execute(db.update(User).where(User.id == customer.id).values(username='carol'))
+    db_session.session.commit()
+    assert _profile(client, headers) == (200, 'alice')
+
+    customer.username = 'dave'
+    db_session.session.flush()
+    db_session.session.rollback()
+    assert customer.id in user_cache._entries
+
+    customer.username = 'erin'
+    db_session.session.commit()
+    assert customer.id not in user_cache._entries
+    assert _profile(client, headers) == (200, 'erin')
+
+def test_deleted_user_is_rejected(client, db_session, auth_headers, customer):
+    """测试用户删除后缓存失效，令牌不再能加载用户"""
+    headers = auth_headers(customer)
+    assert _profile(client, headers)[0] == 200
+    db_session.session.delete(customer)
+    db_session.session.commit()
+    assert _profile(client, headers)[0] == 401
@@ -0,0 +1,124 @@
+"""服务类别树缓存
+
+用一次查询加载全部服务类别并在进程内构建类别树，缓存序列化结果和每个类别的子树ID列表。
+本进程内写入类别时立即失效；其他进程（worker）的写入在 CATEGORY_CACHE_TTL 秒后生效。
+"""
+
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy.orm import object_session
+
+from extensions import db
+from models.service import ServiceCategory
+from utils.http_cache import body_etag, json_body
+from utils.session_hooks import on_commit
+
+
+class CategoryTree:
+    """服务类别树快照"""
+
+    def __init__(self, rows):
+        # 类别ID -> 序列化后的类别（children 直接引用子类别的序列化结果）
+        self.nodes = {}
+        # 类别ID -> 物化路径
+        self.paths = {}
+        for row in rows:
+            self.nodes[row.id] = {
+                'id': row.id,
+                'name': row.name,
+                'parent_id': row.parent_id,
+                'icon': row.icon,
+                'children': []
+            }
+            self.paths[row.id] = row.path
+        for node in self.nodes.values():
+            parent = self.nodes.get(node['parent_id'])
+            if parent:
+                parent['children'].append(node)
+        # 与原接口一致：返回全部类别，每个类别带有递归的子类别
+        self.payload = list(self.nodes.values())
+        self._descendants = {}
+        self._body = None
+        self._etag = None
+
+    @property
+    def body(self):
+        """编码后的JSON响应体"""
+        if self._body is None:
+            self._body = json_body(self.payload)
+        return self._body
+
+    @property
+    def etag(self):
+        """响应体的哈希，内容不变时各进程、各次重新加载得到的ETag相同"""
+        if self._etag is None:
+            self._etag = body_etag(self.body)
+        return self._etag
+
+    def descendant_ids(self, category_id):
+        """获取类别自身及全部子孙类别的ID
+
+        Args:
+            category_id: 类别ID
+
+        Returns:
+            list: 类别ID列表，类别不存在时返回空列表
+        """
+        if category_id not in self.nodes:
+            return []
+        ids = self._descendants.get(category_id)
+        if ids is None:
+            ids = []
+            stack = [self.nodes[category_id]]
+            while stack:
+                node = stack.pop()
+                ids.append(node['id'])
+                stack.extend(node['children'])
+            self._descendants[category_id] = ids
+        return ids
+
+
+class CategoryTreeCache:
+    """进程内的服务类别树缓存"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tree = None
+        self._loaded_at = 0
+
+    def get(self):
+        """获取类别树，缓存过期或失效时用一次查询重新加载"""
+        ttl = current_app.config.get('CATEGORY_CACHE_TTL', 60)
+        tree = self._tree
+        if tree is not None and time.monotonic() - self._loaded_at < ttl:
+            return tree
+
+        rows = db.session.execute(
+            db.select(ServiceCategory.id, ServiceCategory.name, ServiceCategory.parent_id,
+                      ServiceCategory.icon, ServiceCategory.path)
+            .order_by(ServiceCategory.id)
+        ).all()
+        tree = CategoryTree(rows)
+        with self._lock:
+            self._tree = tree
+            self._loaded_at = time.monotonic()
+        return tree
+
+    def invalidate(self):
+        """使缓存失效"""
+        with self._lock:
+            self._tree = None
+
+
+# 全局类别树缓存实例
+category_tree_cache = CategoryTreeCache()
+
+
+@db.event.listens_for(ServiceCategory, 'after_insert')
+@db.event.listens_for(ServiceCategory, 'after_update')
+@db.event.listens_for(ServiceCategory, 'after_delete')
+def _mark_category_changed(mapper, connection, target):
+    # 本次事务写入过服务类别时，提交后使缓存失效
+    on_commit(object_session(target), 'category_tree', category_tree_cache.invalidate)
@@ -0,0 +1,209 @@
+"""优惠券领取
+
+促销期间同一张优惠券每秒可能有数千次领取请求，领取过程不做“先查询再插入”：
+- 优惠券定义按优惠券码缓存在进程内（COUPON_CACHE_TTL 秒），领取时不查询 coupon 表；
+  本进程内修改或删除优惠券在事务提交后立即失效；
+- 每个用户只能领取一张由 user_coupon 表的 (user_id, coupon_id) 唯一约束保证，插入冲突即为重复领取；
+- 限量优惠券用一条条件UPDATE（claimed_count < total_quantity）原子递增已领取数量，
+  与领取记录在同一事务中提交，更新不到行即已领完，事务回滚，不会超发；
+- 已领完的优惠券在本进程内记录 COUPON_CACHE_TTL 秒，之后的领取请求直接拒绝，不再访问数据库；
+- 批量生成的一次性券码（见utils.coupon_codes）用一条条件UPDATE标记为已使用并得到所属的优惠券，
+  格式或校验字符不正确的输入不查询 coupon_code 表；已拥有该优惠券的用户不能再兑换同一优惠券的券码，
+  券码的使用标记随领取一起回滚。
+
+压测见 benchmarks/bench_coupon_claim.py。
+"""
+
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import object_session
+
+from extensions import db
+from models.marketing import Coupon, UserCoupon
+from serializers.marketing_schema import CouponSchema
+from utils import coupon_codes
+from utils.session_hooks import on_commit
+
+# 缓存的优惠券定义，data 为优惠券的序列化结果
+CouponInfo = namedtuple('CouponInfo', 'id is_active start_date end_date total_quantity data')
+
+
+class CouponClaimError(Exception):
+    """领取失败
+
+    Args:
+        message: 错误信息
+        status: 对应的HTTP状态码
+    """
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+class CouponCache:
+    """进程内的优惠券定义缓存，按优惠券码保存"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 优惠券码 -> (缓存时间, CouponInfo)
+        self._entries = {}
+        # 优惠券ID -> 优惠券码
+        self._codes = {}
+        # 优惠券ID -> 发现已领完的时间
+        self._sold_out = {}
+
+    def _lookup(self, code):
+        ttl = current_app.config.get('COUPON_CACHE_TTL', 30)
+        entry = self._entries.get(code)
+        if entry is not None and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+        return None
+
+    def _put(self, coupon):
+        info = CouponInfo(coupon.id, coupon.is_active, coupon.start_date, coupon.end_date,
+                          coupon.total_quantity, CouponSchema().dump(coupon))
+        with self._lock:
+            self._entries[coupon.code] = (time.monotonic(), info)
+            self._codes[coupon.id] = coupon.code
+        return info
+
+    def get(self, code):
+        """按优惠券码获取优惠券定义，缓存过期或失效时重新查询（不存在的优惠券码不缓存）
+
+        Returns:
+            CouponInfo: 优惠券定义，不存在时返回None
+        """
+        info = self._lookup(code)
+        if info is not None:
+            return info
+        coupon = Coupon.query.filter_by(code=code).first()
+        return self._put(coupon) if coupon is not None else None
+
+    def get_by_id(self, coupon_id):
+        """按优惠券ID获取优惠券定义
+
+        Returns:
+            CouponInfo: 优惠券定义，不存在时返回None
+        """
+        code = self._codes.get(coupon_id)
+        info = self._lookup(code) if code is not None else None
+        if info is not None and info.id == coupon_id:
+            return info
+        coupon = db.session.get(Coupon, coupon_id)
+        return self._put(coupon) if coupon is not None else None
+
+    def is_sold_out(self, coupon_id):
+        """本进程是否已发现该优惠券领完"""
+        marked_at = self._sold_out.get(coupon_id)
+        return marked_at is not None and time.monotonic() - marked_at < current_app.config.get('COUPON_CACHE_TTL', 30)
+
+    def mark_sold_out(self, coupon_id):
+        """记录优惠券已领完"""
+        with self._lock:
+            self._sold_out[coupon_id] = time.monotonic()
+
+    def invalidate(self, codes=None, coupon_ids=()):
+        """使缓存失效
+
+        Args:
+            codes: 要失效的优惠券码，为None时清空全部缓存
+            coupon_ids: 要失效的优惠券ID（同时清除已领完记录）
+        """
+        with self._lock:
+            if codes is None:
+                self._entries.clear()
+                self._codes.clear()
+                self._sold_out.clear()
+                return
+            for code in codes:
+                self._entries.pop(code, None)
+            coupon_ids = set(coupon_ids)
+            # 优惠券码可能已被修改，按ID查找旧的缓存条目
+            for code in [code for code, (_, info) in self._entries.items() if info and info.id in coupon_ids]:
+                del self._entries[code]
+            for coupon_id in coupon_ids:
+                self._codes.pop(coupon_id, None)
+                self._sold_out.pop(coupon_id, None)
+
+
+# 全局优惠券缓存实例
+coupon_cache = CouponCache()
+
+
+def claim_coupon(user_id, code):
+    """领取优惠券并提交
+
+    code 可以是优惠券码，也可以是批量生成的一次性券码（见utils.coupon_codes），
+    使用一次性券码时券码与领取记录在同一事务中提交
+
+    Args:
+        user_id: 用户ID
+        code: 优惠券码或一次性券码
+
+    Returns:
+        tuple: (用户优惠券ID, 优惠券定义)
+
+    Raises:
+        CouponClaimError: 优惠券不存在、不在有效期内、已领完或用户已领取过
+    """
+    info = None
+    coupon_id = None
+    batch_code = coupon_codes.normalize(code)
+    if batch_code is not None:
+        coupon_id = coupon_codes.redeem_code(batch_code, user_id)
+        if coupon_id is not None:
+            info = coupon_cache.get_by_id(coupon_id)
+    if info is None:
+        info = coupon_cache.get(code)
+    if info is None or not info.is_active:
+        db.session.rollback()
+        raise CouponClaimError('Invalid or expired coupon code', 404)
+    if not info.start_date <= datetime.utcnow() <= info.end_date:
+        db.session.rollback()
+        raise CouponClaimError('Coupon is expired or not active', 400)
+    if info.total_quantity is not None and coupon_cache.is_sold_out(info.id):
+        db.session.rollback()
+        raise CouponClaimError('Coupon is out of stock', 409)
+
+    try:
+        user_coupon_id = db.session.execute(
+            db.insert(UserCoupon).values(user_id=user_id, coupon_id=info.id).returning(UserCoupon.id)
+        ).scalar_one()
+    except IntegrityError:
+        db.session.rollback()
+        if coupon_id is not None:
+            raise CouponClaimError('User already has this coupon; only one code per coupon can be redeemed', 400)
+        raise CouponClaimError('User has already claimed this coupon', 400)
+
+    if info.total_quantity is not None:
+        # 先插入领取记录再递增已领取数量，缩短持有优惠券行锁的时间
+        result = db.session.execute(
+            db.update(Coupon)
+            .where(Coupon.id == info.id, Coupon.is_active.is_(True), Coupon.total_quantity.isnot(None),
+                   Coupon.claimed_count < Coupon.total_quantity)
+            .values(claimed_count=Coupon.claimed_count + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            db.session.rollback()
+            coupon_cache.mark_sold_out(info.id)
+            raise CouponClaimError('Coupon is out of stock', 409)
+    db.session.commit()
+    return user_coupon_id, info
+
+
+def _invalidate_changes(changes):
+    coupon_cache.invalidate([code for code, _ in changes], [coupon_id for _, coupon_id in changes])
+
+
+@db.event.listens_for(Coupon, 'after_update')
+@db.event.listens_for(Coupon, 'after_delete')
+def _record_coupon_change(mapper, connection, target):
+    # 本次事务修改或删除的优惠券，提交后从缓存中移除
+    on_commit(object_session(target), 'coupon_cache', _invalidate_changes, set).add((target.code, target.id))
@@ -0,0 +1,202 @@
+"""批量生成优惠券码
+
+一次活动需要生成上百万个一次性券码，券码由序号经过带密钥的置换得到，生成时不需要查询是否重复：
+- 每张优惠券的券码按序号 0, 1, 2, ... 生成，coupon.code_count 记录已生成的数量，
+  每批生成前用一条UPDATE原子预留序号区间，并发生成的批次不会使用相同的序号；
+- (优惠券ID, 序号) 组成60位整数（优惠券ID占高 ID_BITS 位），经过4轮Feistel置换（轮函数为带密钥的BLAKE2b）
+  得到另一个60位整数。置换是一一映射，不同的输入一定得到不同的输出，因此券码全局不重复；
+  不知道密钥时无法由一个券码推出其他券码；
+- 60位整数编码为12位Crockford Base32字符（不含易混淆的I、L、O、U），末尾加1位Luhn mod 32校验字符，
+  输错一位或相邻两位颠倒的券码在查询数据库之前即可识别。
+
+券码按 COUPON_CODE_CHUNK_SIZE 行一批用 executemany 插入，每批一个事务。
+
+兑换券码即领取所属的优惠券，与直接领取一样受 user_coupon 表 (user_id, coupon_id) 唯一约束限制：
+同一用户只能兑换同一张优惠券的一个券码，兑换第二个券码时返回“已拥有该优惠券”，券码不会被标记为已使用。
+"""
+
+import hashlib
+from datetime import datetime
+
+from flask import current_app
+
+from extensions import db
+from models.marketing import Coupon, CouponCode
+
+# Crockford Base32 字符集
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+ALPHABET_INDEX = {char: index for index, char in enumerate(ALPHABET)}
+# 输入时容易混淆的字符
+ALIASES = {'O': '0', 'I': '1', 'L': '1'}
+
+# 置换的位数，编码为 BITS // 5 个字符
+BITS = 60
+HALF_BITS = BITS // 2
+HALF_MASK = (1 << HALF_BITS) - 1
+# 优惠券ID占用的位数，其余位为序号（每张优惠券最多 2**SEQUENCE_BITS 个券码）
+ID_BITS = 24
+SEQUENCE_BITS = BITS - ID_BITS
+ROUNDS = 4
+
+# 券码长度（含校验字符）
+CODE_LENGTH = BITS // 5 + 1
+
+
+class CodePermutation:
+    """60位整数上带密钥的置换（Feistel网络）
+
+    Args:
+        key: 密钥（字符串或字节）
+    """
+
+    def __init__(self, key):
+        if isinstance(key, str):
+            key = key.encode()
+        # 每轮使用不同的子密钥，预先初始化带密钥的哈希对象，每次计算时复制（比每次用密钥初始化快）
+        self._rounds = [
+            hashlib.blake2b(key=hashlib.blake2b(key + bytes([i]), digest_size=32).digest(), digest_size=4)
+            for i in range(ROUNDS)
+        ]
+
+    def permute(self, value):
+        """置换一个 [0, 2**60) 范围内的整数"""
+        left, right = value >> HALF_BITS, value & HALF_MASK
+        for round_hash in self._rounds:
+            h = round_hash.copy()
+            h.update(right.to_bytes(4, 'little'))
+            left, right = right, left ^ (int.from_bytes(h.digest(), 'little') & HALF_MASK)
+        return (left << HALF_BITS) | right
+
+
+def check_char(body):
+    """Luhn mod 32 校验字符"""
+    total = 0
+    factor = 2
+    for char in reversed(body):
+        addend = factor * ALPHABET_INDEX[char]
+        total += addend // 32 + addend % 32
+        factor = 3 - factor
+    return ALPHABET[-total % 32]
+
+
+# 10位整数 -> 2个字符，及这2个字符对Luhn校验和的贡献（券码主体为偶数个字符，从右数每对字符的权重都是 1, 2）
+PAIRS = [ALPHABET[value >> 5] + ALPHABET[value & 31] for value in range(1024)]
+PAIR_SUMS = [(value >> 5) + (2 * (value & 31)) // 32 + (2 * (value & 31)) % 32 for value in range(1024)]
+
+
+def encode(value):
+    """把60位整数编码为带校验字符的券码"""
+    pairs = []
+    total = 0
+    for _ in range(BITS // 10):
+        pair = value & 1023
+        pairs.append(PAIRS[pair])
+        total += PAIR_SUMS[pair]
+        value >>= 10
+    pairs.reverse()
+    return ''.join(pairs) + ALPHABET[-total % 32]
+
+
+def normalize(code):
+    """规范化用户输入的券码（去掉空格和连字符、转为大写、替换易混淆字符）
+
+    Returns:
+        str: 格式和校验字符正确时返回规范化的券码，否则返回None
+    """
+    code = ''.join(ALIASES.get(char, char) for char in code.upper() if char not in ' -')
+    if len(code) != CODE_LENGTH or any(char not in ALPHABET_INDEX for char in code):
+        return None
+    if check_char(code[:-1]) != code[-1]:
+        return None
+    return code
+
+
+def get_permutation():
+    """当前配置密钥的券码置换"""
+    key = current_app.config['COUPON_CODE_KEY']
+    permutation = current_app.extensions.get('coupon_code_permutation')
+    if permutation is None or permutation[0] != key:
+        permutation = current_app.extensions['coupon_code_permutation'] = (key, CodePermutation(key))
+    return permutation[1]
+
+
+def iter_codes(permutation, coupon_id, start, count):
+    """按序号生成券码
+
+    Args:
+        permutation: CodePermutation
+        coupon_id: 优惠券ID，小于 2**ID_BITS
+        start: 起始序号，start + count 不超过 2**SEQUENCE_BITS
+        count: 数量
+    """
+    prefix = coupon_id << SEQUENCE_BITS
+    permute = permutation.permute
+    for sequence in range(start, start + count):
+        yield encode(permute(prefix | sequence))
+
+
+def generate_codes(coupon_id, count, chunk_size=None):
+    """为优惠券批量生成券码并写入数据库
+
+    Args:
+        coupon_id: 优惠券ID
+        count: 生成数量
+        chunk_size: 每个事务插入的行数，默认使用配置 COUPON_CODE_CHUNK_SIZE
+
+    Returns:
+        int: 本批券码的起始序号
+
+    Raises:
+        ValueError: 数量不是正整数、优惠券不存在或券码数量超出上限
+    """
+    if not isinstance(count, int) or count <= 0:
+        raise ValueError('count must be a positive integer')
+    chunk_size = chunk_size or current_app.config.get('COUPON_CODE_CHUNK_SIZE', 10000)
+    if coupon_id >= 1 << ID_BITS:
+        raise ValueError(f'Coupon {coupon_id} cannot have batch codes')
+    # 预留序号区间并立即提交，并发生成的批次得到不重叠的区间
+    result = db.session.execute(
+        db.update(Coupon)
+        .where(Coupon.id == coupon_id)
+        .values(code_count=Coupon.code_count + count)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.session.rollback()
+        raise ValueError(f'Coupon {coupon_id} not found')
+    end = db.session.scalar(db.select(Coupon.code_count).where(Coupon.id == coupon_id))
+    if end > 1 << SEQUENCE_BITS:
+        db.session.rollback()
+        raise ValueError(f'Too many codes for coupon {coupon_id}')
+    db.session.commit()
+    start = end - count
+
+    table = CouponCode.__table__
+    insert = table.insert()
+    codes = iter_codes(get_permutation(), coupon_id, start, count)
+    remaining = count
+    while remaining:
+        size = min(chunk_size, remaining)
+        db.session.execute(insert, [{'coupon_id': coupon_id, 'code': next(codes)} for _ in range(size)])
+        db.session.commit()
+        remaining -= size
+    return start
+
+
+def redeem_code(code, user_id):
+    """把一次性券码标记为已被该用户使用，需由调用方提交
+
+    Args:
+        code: 规范化后的券码
+        user_id: 用户ID
+
+    Returns:
+        int: 券码所属的优惠券ID，券码不存在或已被使用时返回None
+    """
+    return db.session.execute(
+        db.update(CouponCode)
+        .where(CouponCode.code == code, CouponCode.redeemed_at.is_(None))
+        .values(user_id=user_id, redeemed_at=datetime.utcnow())
+        .returning(CouponCode.coupon_id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
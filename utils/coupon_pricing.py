@@ -0,0 +1,143 @@
+"""优惠券计价
+
+下单和价格预览时计算用户每张未使用优惠券的优惠金额，并选出最优的一张：
+- 用户可用的优惠券（未使用、已激活、在有效期内、满足最低消费）用一次查询取出所需的列，不加载ORM对象；
+- 金额统一换算为整数（分）后在一次遍历中计算全部优惠金额，避免逐张构造Decimal运算；
+- 下单时按优惠金额从高到低用条件UPDATE（used_at IS NULL）标记使用，与订单在同一事务中提交，
+  并发使用同一张优惠券时只有一个订单成功，其余订单自动改用次优的优惠券。
+
+优惠规则：
+- percentage：按订单金额的 discount_value% 优惠（四舍五入到分），不超过 max_discount；
+- fixed：优惠 discount_value 元，不超过 max_discount；
+- 优惠金额不超过订单金额。
+"""
+
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+
+from extensions import db
+from models.marketing import Coupon, UserCoupon
+
+# 支持的折扣类型
+PERCENTAGE = 'percentage'
+FIXED = 'fixed'
+
+# 一张优惠券的计价结果，discount 为优惠金额（Decimal，单位元）
+Quote = namedtuple('Quote', 'user_coupon_id coupon_id code discount_type discount end_date')
+
+
+class CouponUnavailable(ValueError):
+    """指定的优惠券不可用（不存在、已使用、已过期或不满足使用条件）"""
+
+
+def _cents(value):
+    return int(Decimal(value) * 100)
+
+
+def _yuan(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def compute_quotes(amount, rows):
+    """计算每张优惠券的优惠金额
+
+    Args:
+        amount: 订单金额
+        rows: 可用优惠券的列值，每行包含 user_coupon_id、coupon_id、code、discount_type、
+            discount_value、max_discount、end_date
+
+    Returns:
+        list: [Quote]，按优惠金额从高到低排序，金额相同时先到期的在前；优惠金额为0的不返回
+    """
+    amount_cents = _cents(amount)
+    quotes = []
+    for row in rows:
+        if row.discount_type == PERCENTAGE:
+            # 折扣值精确到0.01%，即订单金额（分）乘以万分比
+            discount = (amount_cents * _cents(row.discount_value) + 5000) // 10000
+        elif row.discount_type == FIXED:
+            discount = _cents(row.discount_value)
+        else:
+            continue
+        if row.max_discount is not None:
+            discount = min(discount, _cents(row.max_discount))
+        discount = min(discount, amount_cents)
+        if discount > 0:
+            quotes.append((discount, row))
+    quotes.sort(key=lambda quote: (-quote[0], quote[1].end_date, quote[1].user_coupon_id))
+    return [
+        Quote(row.user_coupon_id, row.coupon_id, row.code, row.discount_type, _yuan(discount), row.end_date)
+        for discount, row in quotes
+    ]
+
+
+def available_coupons(user_id, amount, now=None):
+    """查询用户可用于该订单金额的未使用优惠券
+
+    Returns:
+        list: 优惠券的列值（Row），见 compute_quotes
+    """
+    now = now or datetime.utcnow()
+    return db.session.execute(
+        db.select(UserCoupon.id.label('user_coupon_id'), Coupon.id.label('coupon_id'), Coupon.code,
+                  Coupon.discount_type, Coupon.discount_value, Coupon.max_discount, Coupon.end_date)
+        .join(Coupon, UserCoupon.coupon_id == Coupon.id)
+        .where(UserCoupon.user_id == user_id, UserCoupon.used_at.is_(None),
+               Coupon.is_active.is_(True), Coupon.start_date <= now, Coupon.end_date >= now,
+               db.or_(Coupon.min_spend.is_(None), Coupon.min_spend <= amount))
+    ).all()
+
+
+def quote_coupons(user_id, amount):
+    """计算用户每张可用优惠券对该订单金额的优惠
+
+    Returns:
+        list: [Quote]，第一项为最优的优惠券
+    """
+    return compute_quotes(amount, available_coupons(user_id, amount))
+
+
+def apply_coupon(user_id, amount, user_coupon_id=None):
+    """为订单选择优惠券并标记为已使用，需由调用方与订单一起提交
+
+    Args:
+        user_id: 用户ID
+        amount: 订单金额
+        user_coupon_id: 指定使用的用户优惠券ID，为None时使用最优的优惠券
+
+    Returns:
+        Quote: 使用的优惠券，没有可用的优惠券时返回None
+
+    Raises:
+        CouponUnavailable: 指定的优惠券不可用
+    """
+    quotes = quote_coupons(user_id, amount)
+    if user_coupon_id is not None:
+        quotes = [quote for quote in quotes if quote.user_coupon_id == user_coupon_id]
+        if not quotes:
+            raise CouponUnavailable(f'Coupon {user_coupon_id} is not applicable')
+    now = datetime.utcnow()
+    for quote in quotes:
+        # 条件UPDATE：并发请求中只有一个能把同一张优惠券标记为已使用
+        result = db.session.execute(
+            db.update(UserCoupon)
+            .where(UserCoupon.id == quote.user_coupon_id, UserCoupon.used_at.is_(None))
+            .values(used_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            return quote
+    if user_coupon_id is not None:
+        raise CouponUnavailable(f'Coupon {user_coupon_id} has already been used')
+    return None
+
+
+def release_coupon(user_coupon_id):
+    """订单取消时退回使用的优惠券，需由调用方提交"""
+    db.session.execute(
+        db.update(UserCoupon)
+        .where(UserCoupon.id == user_coupon_id)
+        .values(used_at=None)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,208 @@
+"""订单自动派单
+
+选择自动派单的订单创建时不指定服务人员（service_provider_id 为空），由派单任务按批处理：
+
+1. 取出一批待派单订单（按预约时间排序，PostgreSQL 下用 SKIP LOCKED 支持多个派单进程并行）；
+2. 在地理位置索引中为每个订单找出附近的已验证服务人员作为候选；
+3. 用一次查询筛选出在售服务项目覆盖订单类别的候选，一次查询加载评分，一次查询加载档期；
+4. 按距离、评分、当前负载为每个（订单, 服务人员）打分，按分数从高到低贪心分配，
+   分配时检查档期冲突，服务人员负载增加后其余候选边重新打分（惰性更新）；
+5. 用一条 executemany UPDATE 写回，UPDATE 条件保证订单在此期间被取消或已派单时不会被覆盖，
+   写回后按本批的更新时间重新查询实际更新的订单，只登记和统计这些订单。
+
+每个订单只有少量候选服务人员，(订单 x 服务人员) 矩阵非常稀疏，直接在候选边上做贪心分配，
+复杂度为 O(E log E)（E 为候选边数），不需要构造稠密的代价矩阵。
+"""
+
+import heapq
+from datetime import datetime
+
+from flask import current_app
+
+from extensions import db
+from models.order import Order
+from models.service import ServiceItem, ServiceProvider
+from utils import order_state
+from utils.geo_index import provider_geo_index
+from utils.schedule import ProviderSchedule, schedule_index
+
+# 可以派单的订单状态
+DISPATCHABLE_STATUSES = (order_state.PENDING, order_state.PAID)
+
+# 评价数量较少时，评分向该默认值收缩（贝叶斯平均）
+PRIOR_RATING = 4.0
+PRIOR_REVIEWS = 5
+
+
+def score(distance_km, radius_km, rating_avg, review_count, load, weights):
+    """计算服务人员承接订单的得分，得分越高越优先
+
+    Args:
+        distance_km: 服务人员到订单地址的距离（公里）
+        radius_km: 派单搜索半径（公里）
+        rating_avg: 服务人员平均评分
+        review_count: 服务人员评价数量
+        load: 服务人员当前已有的预约数
+        weights: 各项权重，包含 distance、rating、load
+
+    Returns:
+        float: 得分
+    """
+    # 只有一两条评价的服务人员不应因为偶然的5分排在最前
+    rating = (rating_avg * review_count + PRIOR_RATING * PRIOR_REVIEWS) / (review_count + PRIOR_REVIEWS)
+    return (weights['distance'] * (1 - distance_km / radius_km)
+            + weights['rating'] * rating / 5
+            + weights['load'] / (1 + load))
+
+
+def assign(orders, candidates, schedules, ratings, radius_km, weights):
+    """为一批订单分配服务人员
+
+    Args:
+        orders: {订单ID: 预约时间}
+        candidates: {订单ID: [(服务人员ID, 距离公里数)]}，只包含能承接该订单类别的服务人员
+        schedules: {服务人员ID: ProviderSchedule}，分配成功的时段会登记到其中
+        ratings: {服务人员ID: (平均评分, 评价数量)}
+        radius_km: 派单搜索半径（公里）
+        weights: 各项得分权重
+
+    Returns:
+        dict: {订单ID: 服务人员ID}，没有可用服务人员的订单不在其中
+    """
+    load = {provider_id: len(schedule.starts) for provider_id, schedule in schedules.items()}
+    heap = []
+    for order_id, order_candidates in candidates.items():
+        for provider_id, distance in order_candidates:
+            rating_avg, review_count = ratings[provider_id]
+            value = score(distance, radius_km, rating_avg, review_count, load[provider_id], weights)
+            heap.append((-value, order_id, provider_id, distance, load[provider_id]))
+    heapq.heapify(heap)
+
+    assigned = {}
+    while heap:
+        _, order_id, provider_id, distance, seen_load = heapq.heappop(heap)
+        if order_id in assigned:
+            continue
+        if load[provider_id] != seen_load:
+            # 服务人员负载已增加，得分只会降低：重新打分后放回堆中
+            rating_avg, review_count = ratings[provider_id]
+            value = score(distance, radius_km, rating_avg, review_count, load[provider_id], weights)
+            heapq.heappush(heap, (-value, order_id, provider_id, distance, load[provider_id]))
+            continue
+        schedule = schedules[provider_id]
+        if not schedule.is_free(orders[order_id]):
+            continue
+        schedule.add(orders[order_id])
+        load[provider_id] += 1
+        assigned[order_id] = provider_id
+    return assigned
+
+
+def dispatch_pending(batch_size=None, after=None):
+    """为一批待派单的订单分配服务人员
+
+    Args:
+        batch_size: 本批最多处理的订单数，默认使用配置 DISPATCH_BATCH_SIZE
+        after: 游标 (预约时间, 订单ID)，只处理排在其后的订单，用于跳过暂时无法派单的订单
+
+    Returns:
+        dict: 本批订单数 pending、分配成功数 assigned、本批最后一个订单的游标 last
+    """
+    config = current_app.config
+    if batch_size is None:
+        batch_size = config['DISPATCH_BATCH_SIZE']
+    radius_km = config['DISPATCH_RADIUS_KM']
+    weights = config['DISPATCH_WEIGHTS']
+
+    # 1. 取出一批待派单订单
+    query = (
+        db.select(Order.id, Order.appointment_time, Order.latitude, Order.longitude, ServiceItem.category_id)
+        .join(ServiceItem, ServiceItem.id == Order.service_item_id)
+        .where(Order.service_provider_id.is_(None), Order.status.in_(DISPATCHABLE_STATUSES),
+               Order.appointment_time > datetime.utcnow())
+    )
+    if after is not None:
+        query = query.where(db.tuple_(Order.appointment_time, Order.id) > tuple(after))
+    rows = db.session.execute(
+        query.order_by(Order.appointment_time, Order.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True, of=Order)
+    ).all()
+    if not rows:
+        db.session.commit()
+        return {'pending': 0, 'assigned': 0, 'last': None}
+    appointments = {row.id: row.appointment_time for row in rows}
+
+    # 2. 在地理位置索引中查找附近的服务人员
+    nearby = {}
+    for row in rows:
+        if row.latitude is not None and row.longitude is not None:
+            nearby[row.id] = provider_geo_index.nearest(
+                row.latitude, row.longitude, k=config['DISPATCH_CANDIDATES'], radius_km=radius_km
+            )
+    provider_ids = {provider_id for hits in nearby.values() for provider_id, _ in hits}
+
+    candidates = {}
+    if provider_ids:
+        # 3. 一次查询得到候选服务人员覆盖的类别
+        offers = set(db.session.execute(
+            db.select(ServiceItem.category_id, ServiceItem.service_provider_id).distinct()
+            .where(ServiceItem.category_id.in_({row.category_id for row in rows}),
+                   ServiceItem.service_provider_id.in_(provider_ids),
+                   ServiceItem.is_on_sale.is_(True))
+        ).all())
+        for row in rows:
+            order_candidates = [
+                (provider_id, distance) for provider_id, distance in nearby.get(row.id, ())
+                if (row.category_id, provider_id) in offers
+            ]
+            if order_candidates:
+                candidates[row.id] = order_candidates
+
+    assigned = {}
+    if candidates:
+        provider_ids = {provider_id for hits in candidates.values() for provider_id, _ in hits}
+        # 4. 一次查询加载评分，一次查询加载档期（锁定服务人员行直到提交，与下单串行；
+        #    复制一份，分配时登记批次内的新预约）
+        ratings = {
+            provider_id: (rating_avg, review_count)
+            for provider_id, rating_avg, review_count in db.session.execute(
+                db.select(ServiceProvider.id, ServiceProvider.rating_avg, ServiceProvider.review_count)
+                .where(ServiceProvider.id.in_(provider_ids))
+            )
+        }
+        schedules = {
+            provider_id: ProviderSchedule(schedule.slot, schedule.starts)
+            for provider_id, schedule in schedule_index.get_many(provider_ids, lock=True).items()
+        }
+        candidates = {
+            order_id: [(provider_id, distance) for provider_id, distance in order_candidates if provider_id in ratings]
+            for order_id, order_candidates in candidates.items()
+        }
+        assigned = assign(appointments, candidates, schedules, ratings, radius_km, weights)
+
+    # 5. 批量写回，条件UPDATE避免覆盖已取消或已被其他派单进程处理的订单
+    if assigned:
+        table = Order.__table__
+        updated_at = datetime.utcnow()
+        db.session.execute(
+            table.update()
+            .where(table.c.id == db.bindparam('_id'), table.c.service_provider_id.is_(None),
+                   # executemany 不支持 IN 展开参数
+                   db.or_(*(table.c.status == status for status in DISPATCHABLE_STATUSES)))
+            .values(service_provider_id=db.bindparam('_provider_id'), updated_at=updated_at),
+            [{'_id': order_id, '_provider_id': provider_id} for order_id, provider_id in assigned.items()]
+        )
+        # executemany 的 UPDATE 不能返回各行的更新结果，按本批写入的更新时间查出实际更新的订单
+        updated = set(db.session.execute(
+            db.select(Order.id, Order.service_provider_id)
+            .where(Order.id.in_(list(assigned)), Order.updated_at == updated_at)
+        ).all())
+        assigned = {
+            order_id: provider_id for order_id, provider_id in assigned.items() if (order_id, provider_id) in updated
+        }
+    db.session.commit()
+
+    for order_id, provider_id in assigned.items():
+        schedule_index.add(provider_id, appointments[order_id])
+    return {'pending': len(rows), 'assigned': len(assigned), 'last': (rows[-1].appointment_time, rows[-1].id)}
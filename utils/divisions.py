@@ -0,0 +1,314 @@
+"""行政区划数据与地址规范化
+
+行政区划数据来自随项目发布的CSV文件（配置 DIVISIONS_FILE，列为 code,name,pinyin，拼音按音节用空格分隔），
+代码为6位行政区划代码：省级为 xx0000，地级为 xxxx00，其余为县级；上级代码由代码本身推导。
+
+数据在本进程第一次使用时加载为只读索引：
+- 自动补全：每个区划以汉字全称、简称（去掉省/市/区/县等后缀）、全拼、拼音首字母为键，
+  全部键排序后保存在一个数组中（扁平化的前缀树），前缀查询用二分查找定位连续区间，内存占用只与键的总长度有关；
+- 规范化：用户填写的省、市、区县按上下级关系逐级匹配全称或简称，匹配到的区划代码保存在 division_code 列，
+  按地区筛选时转为代码区间（如城市 440100 对应 440100-440199）的整数比较，可以使用索引。
+"""
+
+import bisect
+import csv
+import threading
+from collections import namedtuple
+
+from flask import current_app
+
+from extensions import db
+from models.order import Order
+from models.user import Address
+
+# 区划级别
+LEVEL_PROVINCE = 1
+LEVEL_CITY = 2
+LEVEL_DISTRICT = 3
+
+# 生成简称时去掉的后缀，长的在前
+SUFFIXES = ('特别行政区', '维吾尔自治区', '壮族自治区', '回族自治区', '自治区', '新区', '省', '市', '区', '县')
+
+Division = namedtuple('Division', 'code name pinyin level parent_code')
+
+
+def division_level(code):
+    """根据区划代码判断级别"""
+    if code % 10000 == 0:
+        return LEVEL_PROVINCE
+    if code % 100 == 0:
+        return LEVEL_CITY
+    return LEVEL_DISTRICT
+
+
+def parent_code(code):
+    """上级区划代码，省级区划返回None"""
+    level = division_level(code)
+    if level == LEVEL_PROVINCE:
+        return None
+    if level == LEVEL_CITY:
+        return code // 10000 * 10000
+    return code // 100 * 100
+
+
+def division_range(code):
+    """区划及其全部下级区划的代码区间
+
+    Returns:
+        tuple: (最小代码, 最大代码)，闭区间
+    """
+    level = division_level(code)
+    if level == LEVEL_PROVINCE:
+        return code, code + 9999
+    if level == LEVEL_CITY:
+        return code, code + 99
+    return code, code
+
+
+def short_name(name, pinyin):
+    """去掉后缀的简称及其拼音，去掉后不足2个字时返回 (None, None)"""
+    syllables = pinyin.split()
+    for suffix in SUFFIXES:
+        if name.endswith(suffix) and len(name) - len(suffix) >= 2:
+            short = name[:-len(suffix)]
+            # 每个汉字对应一个音节时才能得到简称的拼音
+            short_pinyin = ' '.join(syllables[:len(short)]) if len(syllables) == len(name) else None
+            return short, short_pinyin
+    return None, None
+
+
+class PrefixIndex:
+    """排序数组形式的前缀索引
+
+    Args:
+        entries: [(键, 值)]
+    """
+
+    def __init__(self, entries):
+        entries = sorted(set(entries))
+        self._keys = [key for key, _ in entries]
+        self._values = [value for _, value in entries]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def search(self, prefix):
+        """按键的顺序产生以prefix开头的全部 (键, 值)"""
+        index = bisect.bisect_left(self._keys, prefix)
+        keys = self._keys
+        while index < len(keys) and keys[index].startswith(prefix):
+            yield keys[index], self._values[index]
+            index += 1
+
+
+class DivisionIndex:
+    """行政区划索引
+
+    Args:
+        divisions: [Division]
+    """
+
+    def __init__(self, divisions):
+        self.divisions = {division.code: division for division in divisions}
+        # 上级代码 -> [下级代码]
+        self.children = {}
+        # (上级代码, 全称或简称) -> 代码
+        self._names = {}
+        entries = []
+        for division in self.divisions.values():
+            self.children.setdefault(division.parent_code, []).append(division.code)
+            short, short_pinyin = short_name(division.name, division.pinyin)
+            keys = {division.name, division.pinyin.replace(' ', ''),
+                    ''.join(syllable[0] for syllable in division.pinyin.split())}
+            self._names[(division.parent_code, division.name)] = division.code
+            if short:
+                keys.add(short)
+                self._names.setdefault((division.parent_code, short), division.code)
+            if short_pinyin:
+                keys.add(short_pinyin.replace(' ', ''))
+            entries.extend((key, division.code) for key in keys if key)
+        for codes in self.children.values():
+            codes.sort()
+        self._prefix = PrefixIndex(entries)
+
+    def full_name(self, code):
+        """区划的完整名称，如“广东省 广州市 天河区”（直辖市的市级与省级同名时只保留一个）"""
+        names = []
+        while code is not None:
+            division = self.divisions[code]
+            if not names or names[0] != division.name:
+                names.insert(0, division.name)
+            code = division.parent_code
+        return ' '.join(names)
+
+    def autocomplete(self, q, parent=None, limit=10):
+        """按汉字或拼音前缀查询区划
+
+        Args:
+            q: 汉字、全拼或拼音首字母前缀，不区分大小写
+            parent: 只返回该区划的下级区划（可选）
+            limit: 最多返回的数量
+
+        Returns:
+            list: [Division]，全称完全匹配的在前，其余按级别和代码排序
+        """
+        q = q.strip().lower().replace(' ', '')
+        if not q:
+            return []
+        low, high = division_range(parent) if parent else (None, None)
+        matched = {}
+        for key, code in self._prefix.search(q):
+            if parent and not (low <= code <= high and code != parent):
+                continue
+            exact = key == self.divisions[code].name
+            matched[code] = matched.get(code, False) or exact
+        # 直辖市的市级区划与省级同名，省级已匹配时不重复返回
+        codes = [code for code in matched
+                 if not (self.divisions[code].parent_code in matched
+                         and self.divisions[self.divisions[code].parent_code].name == self.divisions[code].name)]
+        codes.sort(key=lambda code: (not matched[code], self.divisions[code].level, code))
+        return [self.divisions[code] for code in codes[:limit]]
+
+    def match(self, name, parent):
+        """在上级区划下按全称或简称查找区划
+
+        Returns:
+            int: 区划代码，找不到时返回None
+        """
+        name = (name or '').strip()
+        return self._names.get((parent, name)) if name else None
+
+    def _match_district(self, name, province):
+        # 未填写或未匹配到城市时，在省内全部区县中查找唯一的同名区县
+        codes = [code for city in self.children.get(province, ())
+                 if (code := self.match(name, city)) is not None]
+        return codes[0] if len(codes) == 1 else None
+
+    def resolve(self, province, city, district):
+        """把用户填写的省、市、区县规范化为区划代码
+
+        Returns:
+            tuple: (匹配到的最下级区划代码, 是否三级全部匹配)，省份都未匹配时代码为None
+        """
+        province_code = self.match(province, None)
+        if province_code is None:
+            return None, False
+        city_code = self.match(city, province_code)
+        if city_code is None:
+            district_code = self._match_district(district, province_code)
+            if district_code is not None:
+                return district_code, False
+            return province_code, False
+        district_code = self.match(district, city_code)
+        if district_code is None:
+            return city_code, False
+        return district_code, True
+
+    def _match_prefix(self, text, parent):
+        # 在上级区划下查找 text 开头最长的全称或简称
+        best = None
+        for code in self.children.get(parent, ()):
+            division = self.divisions[code]
+            for name in (division.name, short_name(division.name, division.pinyin)[0]):
+                if name and text.startswith(name) and (best is None or len(name) > best[1]):
+                    best = (code, len(name))
+        return best
+
+    def parse(self, text):
+        """从地址文本开头解析省、市、区县，如“北京市海淀区中关村大街1号”
+
+        Returns:
+            int: 匹配到的最下级区划代码，开头不是省级区划时返回None
+        """
+        text = (text or '').strip()
+        found = self._match_prefix(text, None)
+        if found is None:
+            return None
+        code, position = found
+        province = code
+        found = self._match_prefix(text[position:], province)
+        if found is not None:
+            code, length = found
+            position += length
+            found = self._match_prefix(text[position:], code)
+        else:
+            # 省名后直接是区县（常见于直辖市）
+            for city in self.children.get(province, ()):
+                candidate = self._match_prefix(text[position:], city)
+                if candidate is not None and (found is None or candidate[1] > found[1]):
+                    found = candidate
+        if found is not None:
+            code = found[0]
+        return code
+
+
+def load_divisions(path):
+    """从CSV文件加载行政区划
+
+    Returns:
+        DivisionIndex: 行政区划索引
+    """
+    divisions = []
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            code = int(row['code'])
+            divisions.append(Division(code, row['name'].strip(), row['pinyin'].strip().lower(),
+                                      division_level(code), parent_code(code)))
+    return DivisionIndex(divisions)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_division_index():
+    """当前配置的行政区划索引，每个进程只加载一次"""
+    path = current_app.config['DIVISIONS_FILE']
+    index = _indexes.get(path)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(path)
+            if index is None:
+                index = _indexes[path] = load_divisions(path)
+    return index
+
+
+def _backfill(query, resolve, table, batch_size):
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(query.where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)).all()
+        if not rows:
+            return updated
+        last_id = rows[-1][0]
+        values = [{'_id': row[0], '_code': code} for row in rows if (code := resolve(row)) is not None]
+        if values:
+            db.session.execute(
+                table.update().where(table.c.id == db.bindparam('_id')).values(division_code=db.bindparam('_code')),
+                values
+            )
+        db.session.commit()
+        updated += len(values)
+
+
+def backfill_division_codes(batch_size=1000):
+    """为尚未规范化的地址和订单补充行政区划代码，按ID分批处理，每批一个事务
+
+    Returns:
+        tuple: (更新的地址数, 更新的订单数)
+    """
+    index = get_division_index()
+    addresses = Address.__table__
+    orders = Order.__table__
+    address_count = _backfill(
+        db.select(addresses.c.id, addresses.c.province, addresses.c.city, addresses.c.district)
+        .where(addresses.c.division_code.is_(None)),
+        lambda row: index.resolve(row.province, row.city, row.district)[0],
+        addresses, batch_size
+    )
+    order_count = _backfill(
+        db.select(orders.c.id, orders.c.address).where(orders.c.division_code.is_(None)),
+        lambda row: index.parse(row.address),
+        orders, batch_size
+    )
+    return address_count, order_count
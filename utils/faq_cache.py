@@ -0,0 +1,62 @@
+"""常见问题缓存
+
+常见问题很少修改，序列化后的JSON响应体及其ETag缓存在进程内，
+本进程内写入常见问题时立即失效；其他进程（worker）的写入在 FAQ_CACHE_TTL 秒后生效。
+"""
+
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy.orm import object_session
+
+from extensions import db
+from models.support import FAQ
+from serializers.support_schema import FAQSchema
+from utils.http_cache import body_etag, json_body
+from utils.session_hooks import on_commit
+
+
+class FAQCache:
+    """进程内的常见问题缓存"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (JSON响应体, ETag)
+        self._entry = None
+        self._loaded_at = 0
+
+    def get(self):
+        """获取常见问题列表的JSON响应体及其ETag，缓存过期或失效时重新加载
+
+        Returns:
+            tuple: (JSON响应体, ETag)
+        """
+        ttl = current_app.config.get('FAQ_CACHE_TTL', 300)
+        entry = self._entry
+        if entry is not None and time.monotonic() - self._loaded_at < ttl:
+            return entry
+
+        body = json_body(FAQSchema(many=True).dump(FAQ.query.order_by(FAQ.id).all()))
+        entry = (body, body_etag(body))
+        with self._lock:
+            self._entry = entry
+            self._loaded_at = time.monotonic()
+        return entry
+
+    def invalidate(self):
+        """使缓存失效"""
+        with self._lock:
+            self._entry = None
+
+
+# 全局常见问题缓存实例
+faq_cache = FAQCache()
+
+
+@db.event.listens_for(FAQ, 'after_insert')
+@db.event.listens_for(FAQ, 'after_update')
+@db.event.listens_for(FAQ, 'after_delete')
+def _mark_faq_changed(mapper, connection, target):
+    # 本次事务写入过常见问题时，提交后使缓存失效
+    on_commit(object_session(target), 'faq_cache', faq_cache.invalidate)
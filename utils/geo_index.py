@@ -0,0 +1,219 @@
+"""服务人员地理位置索引
+
+把已验证且有经纬度的服务人员按经纬度网格（每格 GEO_CELL_DEGREES 度）分桶保存在进程内，
+查询附近的服务人员时从查询点所在网格开始一圈一圈向外扩展，只计算附近网格中服务人员的距离，
+找到 k 个且下一圈不可能更近时提前结束，不需要扫描全表。
+
+服务人员的新增、修改、删除在事务提交后增量更新到本进程的索引；
+其他进程（worker）的写入在 GEO_INDEX_TTL 秒后随全量重建生效。
+"""
+
+import heapq
+import math
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy.orm import object_session
+
+from extensions import db
+from models.service import ServiceProvider
+from utils.session_hooks import on_commit
+
+# 地球平均半径（公里）
+EARTH_RADIUS_KM = 6371.0088
+# 每度纬度对应的距离（公里）
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """计算两个经纬度坐标之间的球面距离
+
+    Returns:
+        float: 距离（公里）
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """经纬度网格索引
+
+    网格坐标为 (纬度格, 经度格)，经度方向首尾相接（跨越180度经线时可以正确查询）
+    """
+
+    def __init__(self, cell_degrees):
+        self.cell = cell_degrees
+        # 经度方向的网格数
+        self.columns = max(1, round(360 / cell_degrees))
+        # 网格坐标 -> {ID: (纬度, 经度)}
+        self._buckets = {}
+        # ID -> (纬度, 经度, 网格坐标)
+        self._points = {}
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cell_of(self, lat, lng):
+        return (math.floor((lat + 90) / self.cell),
+                math.floor((lng + 180) / self.cell) % self.columns)
+
+    def put(self, key, lat, lng):
+        """添加或移动一个点"""
+        self.discard(key)
+        cell = self._cell_of(lat, lng)
+        self._buckets.setdefault(cell, {})[key] = (lat, lng)
+        self._points[key] = (lat, lng, cell)
+
+    def discard(self, key):
+        """删除一个点（不存在时忽略）"""
+        point = self._points.pop(key, None)
+        if point is None:
+            return
+        bucket = self._buckets[point[2]]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[point[2]]
+
+    def nearest(self, lat, lng, k, radius_km):
+        """查询距离最近的 k 个点
+
+        Args:
+            lat: 纬度
+            lng: 经度
+            k: 最多返回的数量
+            radius_km: 搜索半径（公里）
+
+        Returns:
+            list: [(ID, 距离公里数)]，按距离从近到远排序
+        """
+        row, column = self._cell_of(lat, lng)
+        cell_km = self.cell * KM_PER_DEGREE
+        # 搜索范围内离赤道最远处的经度格宽度最小，用它估算需要扩展的圈数和下一圈的最近距离
+        far_lat = min(90.0, abs(lat) + radius_km / KM_PER_DEGREE + self.cell)
+        min_cell_km = cell_km * math.cos(math.radians(far_lat))
+        rows = math.ceil(radius_km / cell_km)
+        if min_cell_km > 1e-9:
+            columns = min(math.ceil(radius_km / min_cell_km), (self.columns - 1) // 2)
+        else:
+            columns = (self.columns - 1) // 2
+            min_cell_km = 0.0
+
+        # 大顶堆：(-距离, ID)，只保留最近的 k 个
+        heap = []
+        buckets = self._buckets
+        for ring in range(max(rows, columns) + 1):
+            # 下一圈的点与查询点至少相隔 ring - 1 个完整网格
+            if len(heap) == k and ring > 0 and -heap[0][0] <= (ring - 1) * min(cell_km, min_cell_km):
+                break
+            for dy in range(-min(ring, rows), min(ring, rows) + 1):
+                if abs(dy) == ring:
+                    dxs = range(-min(ring, columns), min(ring, columns) + 1)
+                elif ring <= columns:
+                    dxs = (-ring, ring) if ring else (0,)
+                else:
+                    continue
+                for dx in dxs:
+                    bucket = buckets.get((row + dy, (column + dx) % self.columns))
+                    if not bucket:
+                        continue
+                    for key, (plat, plng) in bucket.items():
+                        distance = haversine_km(lat, lng, plat, plng)
+                        if distance > radius_km:
+                            continue
+                        if len(heap) < k:
+                            heapq.heappush(heap, (-distance, key))
+                        elif distance < -heap[0][0]:
+                            heapq.heapreplace(heap, (-distance, key))
+        return [(key, -negative) for negative, key in sorted(heap, reverse=True)]
+
+
+class ProviderGeoIndex:
+    """进程内的服务人员地理位置索引"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._grid = None
+        self._loaded_at = 0
+
+    def _load(self):
+        grid = GridIndex(current_app.config.get('GEO_CELL_DEGREES', 0.01))
+        rows = db.session.execute(
+            db.select(ServiceProvider.id, ServiceProvider.latitude, ServiceProvider.longitude)
+            .where(ServiceProvider.is_verified.is_(True),
+                   ServiceProvider.latitude.isnot(None), ServiceProvider.longitude.isnot(None))
+        )
+        for provider_id, lat, lng in rows:
+            grid.put(provider_id, lat, lng)
+        return grid
+
+    def _get_grid(self):
+        ttl = current_app.config.get('GEO_INDEX_TTL', 300)
+        grid = self._grid
+        if grid is not None and time.monotonic() - self._loaded_at < ttl:
+            return grid
+        grid = self._load()
+        with self._lock:
+            self._grid = grid
+            self._loaded_at = time.monotonic()
+        return grid
+
+    def nearest(self, lat, lng, k=10, radius_km=5):
+        """查询附近已验证的服务人员
+
+        Args:
+            lat: 纬度
+            lng: 经度
+            k: 最多返回的数量
+            radius_km: 搜索半径（公里）
+
+        Returns:
+            list: [(服务人员ID, 距离公里数)]，按距离从近到远排序
+        """
+        grid = self._get_grid()
+        with self._lock:
+            return grid.nearest(lat, lng, k, radius_km)
+
+    def apply(self, changes):
+        """把已提交的服务人员变更增量更新到索引
+
+        Args:
+            changes: {服务人员ID: (纬度, 经度, 是否已验证)}，已删除的服务人员对应None
+        """
+        with self._lock:
+            grid = self._grid
+            if grid is None:
+                return
+            for provider_id, change in changes.items():
+                if change is None or not change[2] or change[0] is None or change[1] is None:
+                    grid.discard(provider_id)
+                else:
+                    grid.put(provider_id, change[0], change[1])
+
+    def invalidate(self):
+        """使索引失效，下次查询时重新加载"""
+        with self._lock:
+            self._grid = None
+
+
+# 全局服务人员地理位置索引实例
+provider_geo_index = ProviderGeoIndex()
+
+
+def _provider_changes(target):
+    # 本次事务中服务人员的变更，提交后增量更新到索引
+    return on_commit(object_session(target), 'provider_geo_index', provider_geo_index.apply, dict)
+
+
+@db.event.listens_for(ServiceProvider, 'after_insert')
+@db.event.listens_for(ServiceProvider, 'after_update')
+def _record_provider_change(mapper, connection, target):
+    _provider_changes(target)[target.id] = (target.latitude, target.longitude, bool(target.is_verified))
+
+
+@db.event.listens_for(ServiceProvider, 'after_delete')
+def _record_provider_delete(mapper, connection, target):
+    _provider_changes(target)[target.id] = None
@@ -1,5 +1,7 @@
+import base64
+import json
 import re
-from datetime import datetime
+from datetime import datetime, timezone
 import random
 
 def is_valid_email(email):
@@ -50,3 +52,69 @@ def format_datetime(dt, format='%Y-%m-%d %H:%M:%S'):
     if isinstance(dt, datetime):
         return dt.strftime(format)
     return None
+
+def parse_datetime(value):
+    """解析ISO 8601格式的日期时间字符串
+    
+    数据库中的时间均为不带时区的UTC时间，带时区的输入（如'2025-03-20T10:00:00+08:00'）转换为不带时区的UTC时间
+    
+    Args:
+        value: 日期时间字符串，如'2025-03-20T10:00:00'，也可以直接传入datetime对象
+        
+    Returns:
+        datetime: 解析后的不带时区的datetime对象，格式错误时返回None
+    """
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def parse_coordinates(lat, lng):
+    """解析并校验经纬度
+    
+    Args:
+        lat: 纬度，范围-90到90
+        lng: 经度，范围-180到180
+        
+    Returns:
+        tuple: (纬度, 经度)，缺失、格式错误或超出范围时返回None
+    """
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+def encode_cursor(*values):
+    """将分页游标的键值编码为URL安全的字符串
+    
+    Args:
+        values: 游标键值，datetime会被转换为ISO 8601字符串
+        
+    Returns:
+        str: 编码后的游标
+    """
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """解码由encode_cursor生成的分页游标
+    
+    Args:
+        cursor: 游标字符串
+        
+    Returns:
+        list: 游标键值列表，游标无效时返回None
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError):
+        return None
+    return payload if isinstance(payload, list) else None
@@ -0,0 +1,82 @@
+"""HTTP 条件请求与缓存策略
+
+只读接口先根据缓存中的校验值（数据版本、最后修改时间、响应体哈希）计算 ETag / Last-Modified，
+请求带有匹配的 If-None-Match / If-Modified-Since 时直接返回 304，不查询数据、不执行序列化；
+否则返回完整响应并附带 ETag、Last-Modified 以及按接口配置的 Cache-Control（配置项 HTTP_CACHE_CONTROL）。
+"""
+
+import hashlib
+
+from flask import current_app, request
+from werkzeug.http import is_resource_modified
+
+
+def body_etag(body):
+    """根据响应体计算ETag
+
+    Args:
+        body: 响应体（bytes或str）
+
+    Returns:
+        str: ETag值（不含引号）
+    """
+    if isinstance(body, str):
+        body = body.encode()
+    return hashlib.sha1(body).hexdigest()
+
+
+def validator_etag(*parts):
+    """根据一组校验值计算ETag，各校验值的字符串形式参与哈希
+
+    Returns:
+        str: ETag值（不含引号）
+    """
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def json_body(payload):
+    """将数据编码为JSON响应体（bytes），格式与jsonify一致"""
+    return current_app.json.response(payload).get_data()
+
+
+def _set_cache_headers(response, etag, last_modified, policy):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    cache_control = current_app.config.get('HTTP_CACHE_CONTROL', {}).get(policy)
+    if cache_control:
+        response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def not_modified(etag, last_modified=None, policy=None):
+    """判断客户端缓存是否仍然有效
+
+    Args:
+        etag: 当前资源的ETag
+        last_modified: 当前资源的最后修改时间（可选）
+        policy: HTTP_CACHE_CONTROL 中的缓存策略名称
+
+    Returns:
+        Response: 客户端缓存有效时返回304响应，否则返回None
+    """
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    return _set_cache_headers(current_app.response_class(status=304), etag, last_modified, policy)
+
+
+def cached_response(body, etag, last_modified=None, policy=None, status=200):
+    """构造带有缓存校验头的JSON响应
+
+    Args:
+        body: JSON响应体
+        etag: 资源的ETag
+        last_modified: 资源的最后修改时间（可选）
+        policy: HTTP_CACHE_CONTROL 中的缓存策略名称
+        status: 状态码
+
+    Returns:
+        Response: 响应对象
+    """
+    response = current_app.response_class(body, status=status, mimetype=current_app.json.mimetype)
+    return _set_cache_headers(response, etag, last_modified, policy)
@@ -0,0 +1,243 @@
+"""图片上传与衍生图处理
+
+上传的原图按内容的 SHA-256 命名保存（originals/ab/cd/<hash>.<ext>），相同内容只保存一份；
+原图保存后由后台线程池按 IMAGE_VARIANTS 生成固定尺寸的 WebP 衍生图（derived/ab/cd/<hash>_<尺寸名>.webp）。
+衍生图的URL由原图URL直接推导，序列化时不需要查询数据库或文件系统；
+衍生图缺失时（例如处理过程中进程重启）可用 flask images process 补齐。
+
+衍生图需要 Pillow，未安装时只保存原图并记录警告。
+"""
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# 支持的图片格式：(文件头, 扩展名)
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+# 上传时每次读取的字节数
+CHUNK_SIZE = 64 * 1024
+# 本系统保存的原图URL中的哈希
+ORIGINAL_PATTERN = re.compile(r'/originals/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.[a-z]+$')
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def sniff_extension(head):
+    """根据文件头识别图片格式
+
+    Args:
+        head: 文件开头的至少12个字节
+
+    Returns:
+        str: 扩展名，不支持的格式返回None
+    """
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def original_relpath(digest, extension):
+    """原图相对于上传目录的路径"""
+    return f'originals/{digest[:2]}/{digest[2:4]}/{digest}.{extension}'
+
+
+def derivative_relpath(digest, variant):
+    """衍生图相对于上传目录的路径"""
+    return f'derived/{digest[:2]}/{digest[2:4]}/{digest}_{variant}.webp'
+
+
+def save_upload(stream):
+    """保存上传的图片，边读取边计算哈希，内容相同的图片只保存一份
+
+    Args:
+        stream: 上传文件的输入流
+
+    Returns:
+        tuple: (SHA-256哈希, 扩展名, 是否为新图片)
+
+    Raises:
+        ValueError: 图片过大或格式不支持
+    """
+    folder = current_app.config['UPLOAD_FOLDER']
+    max_bytes = current_app.config['IMAGE_MAX_BYTES']
+    tmp_folder = os.path.join(folder, 'tmp')
+    os.makedirs(tmp_folder, exist_ok=True)
+
+    hasher = hashlib.sha256()
+    head = b''
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_folder)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError('Image is too large')
+                if len(head) < 12:
+                    head += chunk[:12 - len(head)]
+                hasher.update(chunk)
+                out.write(chunk)
+        extension = sniff_extension(head)
+        if not extension:
+            raise ValueError('Unsupported image format')
+
+        digest = hasher.hexdigest()
+        path = os.path.join(folder, original_relpath(digest, extension))
+        if os.path.exists(path):
+            return digest, extension, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        tmp_path = None
+        return digest, extension, True
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _derivative_targets(digest):
+    folder = current_app.config['UPLOAD_FOLDER']
+    return [
+        (os.path.join(folder, derivative_relpath(digest, variant)), size)
+        for variant, size in current_app.config['IMAGE_VARIANTS'].items()
+    ]
+
+
+def generate_derivatives(source, targets, quality):
+    """生成WebP衍生图，已存在的衍生图跳过
+
+    不依赖应用上下文，可在后台线程中执行
+
+    Args:
+        source: 原图路径
+        targets: [(衍生图路径, 最长边像素数)]
+        quality: WebP质量（0-100）
+
+    Returns:
+        int: 新生成的衍生图数量
+    """
+    targets = [(path, size) for path, size in targets if not os.path.exists(path)]
+    if not targets:
+        return 0
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        logger.warning('Pillow is not installed, skipping image derivatives for %s', source)
+        return 0
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or 'A' in image.getbands() else 'RGB')
+        for path, size in targets:
+            derivative = image.copy()
+            derivative.thumbnail((size, size), Image.LANCZOS)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再改名，避免客户端读到写了一半的图片
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            derivative.save(tmp_path, 'WEBP', quality=quality)
+            os.replace(tmp_path, path)
+    return len(targets)
+
+
+def _generate_logged(source, targets, quality):
+    try:
+        return generate_derivatives(source, targets, quality)
+    except Exception:
+        logger.exception('Failed to generate image derivatives for %s', source)
+        return 0
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    with _executor_lock:
+        # 线程池不能跨fork使用，每个worker进程各自创建
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config['IMAGE_WORKERS'], thread_name_prefix='image-derivatives'
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def schedule_derivatives(digest, extension):
+    """提交后台任务生成衍生图，衍生图都已存在时不提交
+
+    Returns:
+        Future: 后台任务，不需要处理时返回None
+    """
+    targets = [(path, size) for path, size in _derivative_targets(digest) if not os.path.exists(path)]
+    if not targets:
+        return None
+    source = os.path.join(current_app.config['UPLOAD_FOLDER'], original_relpath(digest, extension))
+    return _get_executor().submit(_generate_logged, source, targets, current_app.config['IMAGE_WEBP_QUALITY'])
+
+
+def process_missing():
+    """在当前进程中为所有缺少衍生图的原图生成衍生图
+
+    Returns:
+        tuple: (原图数量, 新生成的衍生图数量)
+    """
+    root = os.path.join(current_app.config['UPLOAD_FOLDER'], 'originals')
+    originals = generated = 0
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            digest, _, extension = filename.partition('.')
+            if len(digest) != 64:
+                continue
+            originals += 1
+            generated += _generate_logged(
+                os.path.join(directory, filename), _derivative_targets(digest), current_app.config['IMAGE_WEBP_QUALITY']
+            )
+    return originals, generated
+
+
+def image_url(digest, extension):
+    """原图的URL"""
+    return f"{current_app.config['UPLOAD_URL_PREFIX']}/{original_relpath(digest, extension)}"
+
+
+def image_urls(value):
+    """把逗号分隔的图片URL展开为原图和各尺寸衍生图的URL
+
+    Args:
+        value: 逗号分隔的图片URL
+
+    Returns:
+        list: 每张图片一个字典，键为 original 和 IMAGE_VARIANTS 中的尺寸名；
+            不是本系统上传的图片没有衍生图，各尺寸都使用原图URL
+    """
+    prefix = current_app.config['UPLOAD_URL_PREFIX']
+    variants = current_app.config['IMAGE_VARIANTS']
+    result = []
+    for url in (value or '').split(','):
+        url = url.strip()
+        if not url:
+            continue
+        match = ORIGINAL_PATTERN.search(url) if url.startswith(prefix + '/') else None
+        entry = {'original': url}
+        for variant in variants:
+            entry[variant] = f'{prefix}/{derivative_relpath(match.group(1), variant)}' if match else url
+        result.append(entry)
+    return result
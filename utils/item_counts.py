@@ -0,0 +1,37 @@
+"""服务项目数量与最后修改时间
+
+服务项目列表的 total 和 HTTP 缓存校验值（ETag）由一条聚合查询得到：
+按类别和在售状态筛选后的 count(*) 与 max(updated_at)，筛选条件走 ix_service_item_category_sale 索引，
+不加载服务项目行。每个请求都从数据库读取，各进程（worker）对同一资源计算出相同的ETag，
+任一进程写入服务项目后立即生效，不会在 Cache-Control 的 max-age 之外继续返回过期的304。
+
+删除最后修改的服务项目时 max(updated_at) 会变小，因此最后修改时间只参与ETag计算，
+数量同时参与，新增、修改和删除都会改变ETag。
+"""
+
+from collections import namedtuple
+
+from extensions import db
+from models.service import ServiceItem
+
+# 服务项目数量和最后修改时间（没有服务项目时为None）
+ItemStats = namedtuple('ItemStats', 'total last_modified')
+
+
+def item_stats(category_ids=None, on_sale=False):
+    """统计服务项目数量和最后修改时间
+
+    Args:
+        category_ids: 类别ID列表，为空时统计全部类别
+        on_sale: 是否只统计在售的服务项目
+
+    Returns:
+        ItemStats: 服务项目数量和最后修改时间
+    """
+    query = db.select(db.func.count(), db.func.max(ServiceItem.updated_at))
+    if category_ids is not None:
+        query = query.where(ServiceItem.category_id.in_(category_ids))
+    if on_sale:
+        query = query.where(ServiceItem.is_on_sale.is_(True))
+    total, last_modified = db.session.execute(query).one()
+    return ItemStats(total, last_modified)
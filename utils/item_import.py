@@ -0,0 +1,257 @@
+"""服务项目批量导入
+
+逐行流式读取 CSV 或 XLSX 文件，每 IMPORT_CHUNK_SIZE 行为一批：
+1. 批内新出现的类别名称用一次查询解析为类别ID（已解析的名称在整个导入过程中复用）；
+2. 用 ServiceItemSchema 一次校验整批数据，校验失败的行记录行号和错误信息；
+3. 校验通过的行用一条 executemany INSERT 写入并提交。
+内存占用只与批大小有关，与文件行数无关。
+
+批量 INSERT 不触发 ORM 事件，导入后需手动写入全文检索索引。
+XLSX 需要 openpyxl。
+"""
+
+import csv
+import io
+
+from flask import current_app
+from marshmallow import EXCLUDE, ValidationError
+
+from extensions import db
+from models.service import ServiceCategory, ServiceItem
+from serializers.service_schema import ServiceItemSchema
+from utils import search
+
+# 可以导入的列，category 为类别名称，也可以直接提供 category_id
+COLUMNS = ('category', 'category_id', 'title', 'description', 'price', 'unit', 'images', 'is_on_sale')
+# 必须提供的列
+REQUIRED_COLUMNS = ('title', 'price')
+# 标题的最大长度，模式不校验长度，超长的行在写入前拒绝，避免整批写入失败
+TITLE_MAX_LENGTH = ServiceItem.__table__.c.title.type.length
+
+
+def iter_csv(stream):
+    """逐行读取CSV文件，首行为表头
+
+    Yields:
+        dict: 列名到单元格值的映射
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.DictReader(text)
+    finally:
+        # 不关闭调用方的文件
+        text.detach()
+
+
+def iter_xlsx(stream):
+    """逐行读取XLSX文件第一个工作表，首行为表头
+
+    Yields:
+        dict: 列名到单元格值的映射
+    """
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('XLSX import requires openpyxl')
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+        for values in rows:
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def iter_rows(stream, filename):
+    """根据文件扩展名选择CSV或XLSX读取方式
+
+    Raises:
+        ValueError: 不支持的文件类型
+    """
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return iter_csv(stream)
+    if name.endswith('.xlsx'):
+        return iter_xlsx(stream)
+    raise ValueError('Only .csv and .xlsx files are supported')
+
+
+def check_header(columns):
+    """检查表头是否包含必须的列
+
+    Raises:
+        ValueError: 缺少必须的列
+    """
+    columns = set(columns)
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if not columns & {'category', 'category_id'}:
+        missing.append('category')
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+
+def _clean(row):
+    # 空单元格视为未提供该字段，数值、布尔等单元格统一转为字符串交给模式校验
+    data = {}
+    for column in COLUMNS:
+        value = row.get(column)
+        if value is None:
+            continue
+        value = str(value).strip()
+        if value:
+            data[column] = value
+    return data
+
+
+class ItemImporter:
+    """服务项目导入器，逐批导入并汇总每行的错误"""
+
+    def __init__(self, service_provider_id, chunk_size=None, max_errors=None):
+        # 导入的服务项目所属的服务人员
+        self.service_provider_id = service_provider_id
+        self.chunk_size = chunk_size or current_app.config['IMPORT_CHUNK_SIZE']
+        # 最多记录的错误行数，超出后只计数
+        self.max_errors = max_errors or current_app.config['IMPORT_MAX_ERRORS']
+        self.schema = ServiceItemSchema(many=True, unknown=EXCLUDE)
+        # 类别名称 -> 类别ID
+        self.categories = {}
+        # 已确认存在的类别ID
+        self.category_ids = set()
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def _error(self, line, messages):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': line, 'errors': messages})
+
+    def _resolve_categories(self, rows):
+        # 批内未见过的类别名称和类别ID合并为一次查询
+        names, ids = set(), set()
+        for _, row in rows:
+            if 'category_id' in row:
+                try:
+                    ids.add(int(row['category_id']))
+                except ValueError:
+                    pass
+            elif 'category' in row:
+                names.add(row['category'])
+        names -= self.categories.keys()
+        ids -= self.category_ids
+        if not names and not ids:
+            return
+        found = db.session.execute(
+            db.select(ServiceCategory.name, ServiceCategory.id)
+            .where(db.or_(ServiceCategory.name.in_(names), ServiceCategory.id.in_(ids)))
+        ).all()
+        for name, category_id in found:
+            self.categories[name] = category_id
+            self.category_ids.add(category_id)
+
+    def _import_chunk(self, rows):
+        start = len(self.errors)
+        try:
+            self._insert_chunk(rows)
+        finally:
+            # 类别错误和校验错误分别记录，按行号排序
+            self.errors[start:] = sorted(self.errors[start:], key=lambda error: error['row'])
+
+    def _insert_chunk(self, rows):
+        # 1. 类别名称解析为ID，并确认类别存在
+        self._resolve_categories(rows)
+        pending = []
+        for line, row in rows:
+            if 'category_id' not in row and 'category' in row:
+                category_id = self.categories.get(row['category'])
+                if category_id is None:
+                    self._error(line, {'category': [f"Unknown category: {row['category']}"]})
+                    continue
+                row['category_id'] = category_id
+            row.pop('category', None)
+            pending.append((line, row))
+        if not pending:
+            return
+
+        # 2. 整批校验
+        try:
+            loaded = self.schema.load([row for _, row in pending])
+            invalid = {}
+        except ValidationError as e:
+            loaded = e.valid_data
+            invalid = e.messages
+        values = []
+        for index, (line, _) in enumerate(pending):
+            if index in invalid:
+                self._error(line, invalid[index])
+                continue
+            data = loaded[index]
+            if data['category_id'] not in self.category_ids:
+                self._error(line, {'category_id': [f"Unknown category: {data['category_id']}"]})
+                continue
+            if len(data['title']) > TITLE_MAX_LENGTH:
+                self._error(line, {'title': [f'Longer than maximum length {TITLE_MAX_LENGTH}.']})
+                continue
+            data['service_provider_id'] = self.service_provider_id
+            data.setdefault('is_on_sale', True)
+            values.append(data)
+        if not values:
+            return
+
+        # 3. executemany 批量写入，RETURNING 得到新服务项目的ID用于写入检索索引
+        table = ServiceItem.__table__
+        rows = db.session.execute(
+            table.insert().returning(table.c.id, table.c.title, table.c.description, sort_by_parameter_order=True),
+            values
+        ).all()
+        connection = db.session.connection()
+        if search.index_exists(connection):
+            search.index_items(connection, [tuple(row) for row in rows])
+        db.session.commit()
+        self.imported += len(rows)
+
+    def run(self, rows):
+        """导入全部行
+
+        Args:
+            rows: 逐行产生 {列名: 值} 的迭代器
+
+        Returns:
+            dict: 导入成功数 imported、失败数 failed、错误明细 errors（行号从表头之后的第一行数据起为2）
+
+        Raises:
+            ValueError: 缺少必须的列
+        """
+        chunk = []
+        # 行号与表格软件中显示的一致：表头为第1行
+        for line, row in enumerate(rows, start=2):
+            if line == 2:
+                check_header(row.keys())
+            chunk.append((line, _clean(row)))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+        return {'imported': self.imported, 'failed': self.failed, 'errors': self.errors}
+
+
+def import_items(stream, filename, service_provider_id, chunk_size=None):
+    """从CSV或XLSX文件导入服务项目
+
+    Args:
+        stream: 文件输入流
+        filename: 文件名，用于判断文件类型
+        service_provider_id: 服务项目所属的服务人员ID
+        chunk_size: 每批处理的行数，默认使用配置 IMPORT_CHUNK_SIZE
+
+    Returns:
+        dict: 导入结果，见 ItemImporter.run
+
+    Raises:
+        ValueError: 文件类型不支持或缺少必须的列
+    """
+    rows = iter_rows(stream, filename)
+    return ItemImporter(service_provider_id, chunk_size=chunk_size).run(rows)
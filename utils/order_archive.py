@@ -0,0 +1,71 @@
+"""订单归档
+
+将已完成或已取消、且最后更新时间早于指定天数的订单从 order 表移动到 order_archive 表。
+每批订单在一个事务中完成 INSERT ... SELECT 与 DELETE，归档过程可随时中断、重复执行。
+"""
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from extensions import db
+from models.order import Order, OrderArchive
+from utils import order_state
+
+# 可以归档的订单状态（终态）
+ARCHIVABLE_STATUSES = (order_state.COMPLETED, order_state.CANCELLED)
+
+# 归档时复制的字段
+ARCHIVE_COLUMNS = (
+    'id', 'order_no', 'user_id', 'service_item_id', 'service_provider_id', 'total_amount', 'discount_amount',
+    'user_coupon_id', 'paid_amount', 'status', 'appointment_time', 'address', 'latitude', 'longitude',
+    'division_code', 'remark', 'created_at', 'updated_at', 'pay_method', 'paid_at'
+)
+
+
+def archive_orders(days=None, batch_size=None):
+    """归档旧订单
+
+    Args:
+        days: 订单最后更新时间早于多少天前才归档，默认使用配置 ORDER_ARCHIVE_DAYS
+        batch_size: 每个事务移动的订单数，默认使用配置 ORDER_ARCHIVE_BATCH_SIZE
+
+    Returns:
+        int: 归档的订单总数
+    """
+    if days is None:
+        days = current_app.config['ORDER_ARCHIVE_DAYS']
+    if batch_size is None:
+        batch_size = current_app.config['ORDER_ARCHIVE_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(days=days)
+
+    total = 0
+    while True:
+        # 1. 选出一批待归档订单的ID
+        #    始终保留ID最大的订单：SQLite删除最大rowid后会复用该ID，导致新订单与归档订单ID冲突
+        ids = db.session.scalars(
+            db.select(Order.id)
+            .where(Order.status.in_(ARCHIVABLE_STATUSES), Order.updated_at < cutoff,
+                   Order.id < db.select(db.func.max(Order.id)).scalar_subquery())
+            .order_by(Order.id)
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            break
+
+        # 2. 复制到归档表并从热表删除，同一事务内完成
+        archived_at = datetime.utcnow()
+        source = db.select(
+            *[getattr(Order, column) for column in ARCHIVE_COLUMNS],
+            db.literal(archived_at, db.DateTime)
+        ).where(Order.id.in_(ids))
+        db.session.execute(db.insert(OrderArchive).from_select(ARCHIVE_COLUMNS + ('archived_at',), source))
+        db.session.execute(
+            db.delete(Order).where(Order.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        total += len(ids)
+        if len(ids) < batch_size:
+            break
+    return total
@@ -0,0 +1,137 @@
+"""订单号生成器
+
+采用类 Snowflake 的 64 位编号：毫秒时间戳(41位) + worker ID(10位) + 进程内序号(12位)。
+每个进程每毫秒最多生成 4096 个编号，不同进程只要 worker ID 不同就不会冲突，生成时无需访问数据库或加锁协调。
+
+worker ID 优先读取环境变量 ORDER_WORKER_ID（0-1023），必须在所有服务器的所有进程之间唯一。
+部署 gunicorn 时每台服务器分配一个节点号 ORDER_NODE_ID，每个 worker 在本服务器内取一个
+当前存活的 worker 都没有使用的最小序号（worker 重启后新进程复用该序号），两者组合为 worker ID：
+
+    WORKERS_PER_NODE = 32
+
+    def pre_fork(server, worker):
+        # 在 master 进程中执行，server.WORKERS 为当前存活的 worker
+        used = {getattr(w, 'order_index', None) for w in server.WORKERS.values()}
+        worker.order_index = min(i for i in range(WORKERS_PER_NODE) if i not in used)
+
+    def post_fork(server, worker):
+        node_id = int(os.environ['ORDER_NODE_ID'])
+        os.environ['ORDER_WORKER_ID'] = str(node_id * WORKERS_PER_NODE + worker.order_index)
+
+（每台服务器最多 WORKERS_PER_NODE 个 worker，节点号 0-31）。
+以上只保证同一个 master 的 worker 之间不重复：USR2 平滑升级期间新旧两个 master 的 worker 同时存在，
+序号可能重复，不在此方案覆盖范围内，升级时应先停止旧 master 再启动新 master，或为新 master 使用不同的节点号。
+
+未设置时退化为进程 PID 的低 10 位，多台服务器或PID低位相同的进程之间可能冲突，仅用于开发和测试；
+生产环境（ORDER_WORKER_ID_REQUIRED = True）未设置或超出范围时生成订单号直接报错。
+"""
+
+import os
+import threading
+import time
+
+# 自定义纪元：2025-01-01 00:00:00 UTC（毫秒）
+EPOCH_MS = 1735689600000
+
+WORKER_ID_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_ID_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+
+def default_worker_id(required=False):
+    """获取当前进程的 worker ID
+
+    Args:
+        required: 是否必须设置环境变量 ORDER_WORKER_ID，为False时未设置退化为进程 PID 的低 10 位
+
+    Raises:
+        RuntimeError: 要求设置但未设置 ORDER_WORKER_ID
+        ValueError: ORDER_WORKER_ID 不是 0-1023 的整数
+    """
+    worker_id = os.environ.get('ORDER_WORKER_ID')
+    if worker_id is None:
+        if required:
+            raise RuntimeError('ORDER_WORKER_ID must be set to a unique value for each worker process')
+        return os.getpid() & MAX_WORKER_ID
+    worker_id = int(worker_id)
+    if not 0 <= worker_id <= MAX_WORKER_ID:
+        raise ValueError(f'ORDER_WORKER_ID must be between 0 and {MAX_WORKER_ID}')
+    return worker_id
+
+
+class OrderNoGenerator:
+    """单调递增、无冲突的订单号生成器
+
+    时钟回拨或同一毫秒内序号用尽时，沿用/借用下一个逻辑毫秒继续生成，保证编号严格单调递增且不会阻塞
+
+    Args:
+        worker_id: worker ID，为None时在首次生成编号时由 default_worker_id 确定
+        require_worker_id: 未指定 worker_id 时是否必须设置环境变量 ORDER_WORKER_ID
+    """
+
+    def __init__(self, worker_id=None, require_worker_id=False):
+        if worker_id is not None and not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f'worker_id must be between 0 and {MAX_WORKER_ID}')
+        # 未指定时在首次生成编号时才确定，以便 gunicorn 的 post_fork 钩子先设置好环境变量
+        self._worker_id = worker_id
+        self.require_worker_id = require_worker_id
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    @property
+    def worker_id(self):
+        if self._worker_id is None:
+            self._worker_id = default_worker_id(self.require_worker_id)
+        return self._worker_id
+
+    def _advance(self):
+        # 调用方需持有锁
+        now_ms = int(time.time() * 1000) - EPOCH_MS
+        if now_ms > self._last_ms:
+            self._last_ms = now_ms
+            self._sequence = 0
+        elif self._sequence < MAX_SEQUENCE:
+            self._sequence += 1
+        else:
+            self._last_ms += 1
+            self._sequence = 0
+        return (self._last_ms << (WORKER_ID_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+    def next_id(self):
+        """生成一个编号"""
+        with self._lock:
+            return self._advance()
+
+    def next_ids(self, count):
+        """批量生成 count 个编号"""
+        with self._lock:
+            return [self._advance() for _ in range(count)]
+
+    def reset(self, worker_id=None):
+        """重置生成器状态（fork 之后在子进程中调用），保留 require_worker_id 设置"""
+        self.__init__(worker_id, self.require_worker_id)
+
+
+def format_order_no(order_id):
+    """将编号格式化为订单号字符串（19位数字，字符串排序与时间顺序一致）"""
+    return f'{order_id:019d}'
+
+
+# 全局订单号生成器实例
+order_no_generator = OrderNoGenerator()
+
+# fork 出的子进程（如 gunicorn worker）重新读取 worker ID 并清空序号状态
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=order_no_generator.reset)
+
+
+def generate_order_no():
+    """生成一个订单号"""
+    return format_order_no(order_no_generator.next_id())
+
+
+def generate_order_nos(count):
+    """批量生成 count 个订单号"""
+    return [format_order_no(order_id) for order_id in order_no_generator.next_ids(count)]
@@ -0,0 +1,62 @@
+"""订单状态机
+
+所有订单状态变更都通过 transition 完成：每次状态变更是一条带条件的
+UPDATE order SET status=... WHERE <条件> AND status IN (<允许的源状态>)，
+由数据库保证"检查状态 + 修改状态"的原子性（比较并交换），无需先读取订单、也无需行锁。
+例如迟到的取消请求与支付回调并发时，只有先执行的一方会生效，另一方影响行数为0。
+"""
+
+from extensions import db
+
+# 订单状态
+PENDING = 'pending'  # 待支付
+PAID = 'paid'  # 已支付
+COMPLETED = 'completed'  # 已完成
+CANCELLED = 'cancelled'  # 已取消
+
+# 状态转换表：事件 -> (允许的源状态, 目标状态)
+TRANSITIONS = {
+    'pay': ((PENDING,), PAID),
+    'cancel': ((PENDING,), CANCELLED),
+    'complete': ((PAID,), COMPLETED),
+}
+
+
+def can_transition(status, event):
+    """判断处于 status 状态的订单能否执行 event
+
+    Args:
+        status: 订单当前状态
+        event: 状态转换事件，见TRANSITIONS
+
+    Returns:
+        bool: 可以转换返回True，否则返回False
+    """
+    return status in TRANSITIONS[event][0]
+
+
+def transition(event, *criteria, **values):
+    """执行订单状态转换
+
+    Args:
+        event: 状态转换事件，见TRANSITIONS
+        criteria: 定位订单的过滤条件，如 Order.id == order_id
+        values: 随状态一起更新的其他字段，可以是SQL表达式
+
+    Returns:
+        int: 影响的行数，为0表示订单不存在或当前状态不允许该转换
+
+    Note:
+        只执行UPDATE，不提交事务，由调用方提交
+    """
+    # 延迟导入，避免与模型模块循环导入
+    from models.order import Order
+
+    sources, target = TRANSITIONS[event]
+    result = db.session.execute(
+        db.update(Order)
+        .where(*criteria, Order.status.in_(sources))
+        .values(status=target, **values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
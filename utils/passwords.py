@@ -0,0 +1,168 @@
+"""密码哈希
+
+密码哈希（scrypt/pbkdf2）是CPU密集的计算，单次耗时数十毫秒，在请求线程中直接计算时，
+登录高峰会占满请求线程和CPU，同一进程内的其他请求得不到及时执行。这里把哈希计算交给独立的进程池执行：
+
+1. 每个应用进程有 PASSWORD_HASH_WORKERS 个哈希进程，同时进行的哈希计算不超过哈希进程数，请求线程只等待结果；
+2. 正在计算和排队的任务数超过 PASSWORD_HASH_MAX_PENDING 时立即拒绝（PasswordHasherBusy），
+   由接口返回503，避免请求在队列中越积越多（等待超过 PASSWORD_HASH_TIMEOUT 秒同样按繁忙处理）；
+3. 登录成功时检查已保存哈希的算法参数，与当前配置 PASSWORD_HASH_METHOD 不一致时重新计算并保存。
+
+PASSWORD_HASH_WORKERS 为0时在当前线程中计算（测试环境使用）。
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(RuntimeError):
+    """等待计算的密码哈希任务过多"""
+
+
+@lru_cache(maxsize=None)
+def method_prefix(method):
+    """哈希算法及参数在哈希值中的前缀，例如 scrypt 对应 scrypt:32768:8:1"""
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+class PasswordHasher:
+    """用进程池计算密码哈希，并限制等待中的任务数
+
+    Args:
+        workers: 哈希进程数，为0时在当前线程中计算
+        max_pending: 最多同时等待（计算中和排队中）的任务数
+        method: 生成哈希使用的算法，格式同 generate_password_hash 的 method 参数
+        timeout: 等待单个任务结果的最长时间（秒）
+    """
+
+    def __init__(self, workers, max_pending, method='scrypt', timeout=10):
+        self.workers = workers
+        self.method = method
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            # 进程池不能跨fork使用，每个worker进程各自创建；
+            # 使用spawn启动哈希进程，避免在多线程的应用进程中fork
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy('Too many pending password hashing tasks')
+        if not self.workers:
+            try:
+                return func(*args)
+            finally:
+                self._slots.release()
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException as e:
+            self._slots.release()
+            if isinstance(e, BrokenProcessPool):
+                self._reset_executor()
+            raise
+        # 任务结束（完成、失败或取消）时才释放名额：等待超时的任务可能仍在哈希进程中计算
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # 仍在排队的任务直接取消，不再占用哈希进程；已开始计算的任务无法中断，计算完成后释放名额
+            future.cancel()
+            raise PasswordHasherBusy('Password hashing timed out')
+        except BrokenProcessPool:
+            self._reset_executor()
+            raise
+
+    def _reset_executor(self):
+        # 哈希进程异常退出后进程池不可再用，下次调用时重新创建
+        with self._lock:
+            self._executor = None
+
+    def hash(self, password):
+        """计算密码哈希
+
+        Raises:
+            PasswordHasherBusy: 等待中的任务过多或等待超时
+        """
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        """校验密码是否与哈希匹配
+
+        Raises:
+            PasswordHasherBusy: 等待中的任务过多或等待超时
+        """
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """已保存的哈希是否使用了与当前配置不同的算法或参数"""
+        return pwhash.split('$', 1)[0] != method_prefix(self.method)
+
+    def shutdown(self):
+        """关闭哈希进程"""
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown()
+            self._executor = None
+
+
+def get_password_hasher():
+    """当前应用的密码哈希器，按应用配置创建"""
+    extensions = current_app.extensions
+    hasher = extensions.get('password_hasher')
+    if hasher is None:
+        config = current_app.config
+        hasher = extensions.setdefault('password_hasher', PasswordHasher(
+            config.get('PASSWORD_HASH_WORKERS', 2),
+            config.get('PASSWORD_HASH_MAX_PENDING', 32),
+            method=config.get('PASSWORD_HASH_METHOD', 'scrypt'),
+            timeout=config.get('PASSWORD_HASH_TIMEOUT', 10),
+        ))
+    return hasher
+
+
+def hash_password(password):
+    """计算密码哈希，见 PasswordHasher.hash"""
+    return get_password_hasher().hash(password)
+
+
+def verify_password(user, password):
+    """校验用户密码，校验通过且哈希参数已过时时重新计算哈希（需由调用方提交）
+
+    重新计算哈希时哈希进程繁忙则跳过，下次登录再更新
+
+    Args:
+        user: 用户
+        password: 用户输入的密码
+
+    Returns:
+        bool: 密码是否正确
+
+    Raises:
+        PasswordHasherBusy: 等待中的任务过多
+    """
+    hasher = get_password_hasher()
+    if not hasher.verify(user.password, password):
+        return False
+    if hasher.needs_rehash(user.password):
+        try:
+            user.password = hasher.hash(password)
+        except PasswordHasherBusy:
+            pass
+    return True
@@ -0,0 +1,85 @@
+"""服务人员评分统计
+
+服务人员的评价数量、评分总和、平均分和1-5分直方图以冗余字段保存在 service_provider 表中：
+创建评价时在同一事务内用一条自增UPDATE维护，排名时直接按 (rating_avg, review_count) 索引读取，
+无需对 order_review 做 GROUP BY。
+"""
+
+from extensions import db
+from models.service import ServiceProvider
+
+# 合法评分
+RATINGS = (1, 2, 3, 4, 5)
+
+
+def histogram_column(rating):
+    """获取评分对应的直方图字段"""
+    return getattr(ServiceProvider, f'rating_{rating}')
+
+
+def record_review(provider_id, rating):
+    """登记一条新评价
+
+    Args:
+        provider_id: 服务人员ID
+        rating: 评分（1-5）
+
+    Note:
+        只执行UPDATE，不提交事务，由调用方与评价记录一起提交
+    """
+    # SET子句右侧引用的都是更新前的值
+    db.session.execute(
+        db.update(ServiceProvider)
+        .where(ServiceProvider.id == provider_id)
+        .values({
+            ServiceProvider.review_count: ServiceProvider.review_count + 1,
+            ServiceProvider.rating_sum: ServiceProvider.rating_sum + rating,
+            ServiceProvider.rating_avg: (ServiceProvider.rating_sum + rating) * 1.0 / (ServiceProvider.review_count + 1),
+            histogram_column(rating): histogram_column(rating) + 1,
+            # 评分变化不算服务人员资料更新
+            ServiceProvider.updated_at: ServiceProvider.updated_at,
+        })
+        .execution_options(synchronize_session=False)
+    )
+
+
+def rebuild_provider_ratings():
+    """根据 order_review 全量重建所有服务人员的评分统计
+
+    Returns:
+        int: 有评价的服务人员数量
+    """
+    # 延迟导入，避免与订单模型循环导入
+    from models.order import OrderReview
+
+    # 1. 一次聚合查询得到每个服务人员各分值的评价数量
+    rows = db.session.execute(
+        db.select(OrderReview.service_provider_id, OrderReview.rating, db.func.count())
+        .where(OrderReview.rating.in_(RATINGS))
+        .group_by(OrderReview.service_provider_id, OrderReview.rating)
+    ).all()
+    stats = {}
+    for provider_id, rating, count in rows:
+        stats.setdefault(provider_id, dict.fromkeys(RATINGS, 0))[rating] = count
+
+    # 2. 先清零，再批量写入
+    reset = {'review_count': 0, 'rating_sum': 0, 'rating_avg': 0}
+    reset.update({f'rating_{rating}': 0 for rating in RATINGS})
+    reset['updated_at'] = ServiceProvider.updated_at
+    db.session.execute(db.update(ServiceProvider).values(**reset).execution_options(synchronize_session=False))
+    if stats:
+        table = ServiceProvider.__table__
+        values = {column: db.bindparam(f'_{column}')
+                  for column in ['review_count', 'rating_sum', 'rating_avg'] + [f'rating_{r}' for r in RATINGS]}
+        values['updated_at'] = table.c.updated_at
+        params = []
+        for provider_id, histogram in stats.items():
+            review_count = sum(histogram.values())
+            rating_sum = sum(rating * count for rating, count in histogram.items())
+            param = {'_id': provider_id, '_review_count': review_count, '_rating_sum': rating_sum,
+                     '_rating_avg': rating_sum / review_count}
+            param.update({f'_rating_{rating}': count for rating, count in histogram.items()})
+            params.append(param)
+        db.session.execute(table.update().where(table.c.id == db.bindparam('_id')).values(**values), params)
+    db.session.commit()
+    return len(stats)
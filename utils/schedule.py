@@ -0,0 +1,209 @@
+"""服务人员档期索引
+
+为每个服务人员维护一个按预约开始时间排序的区间列表（每个预约占用一个固定时长的时段），
+用于在对数时间内回答"服务人员X在T时刻是否空闲"以及"从T开始的N个空闲时段"。
+
+索引只加载未取消且尚未结束的预约（一次走 (service_provider_id, appointment_time) 索引的范围查询），
+不会遍历服务人员的全部 orders 关系。
+"""
+
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from extensions import db
+
+
+class ProviderSchedule:
+    """单个服务人员的档期
+
+    starts 为已占用时段的开始时间（升序），每个时段长度为 slot，区间为 [start, start + slot)
+    """
+
+    def __init__(self, slot, starts=()):
+        self.slot = slot
+        self.starts = sorted(starts)
+
+    def is_free(self, when):
+        """判断 [when, when + slot) 是否与已有预约冲突
+
+        Args:
+            when: 预约开始时间
+
+        Returns:
+            bool: 无冲突返回True，否则返回False
+        """
+        # 与 when 冲突的预约开始时间一定落在 (when - slot, when + slot) 内
+        i = bisect_right(self.starts, when - self.slot)
+        return i == len(self.starts) or self.starts[i] >= when + self.slot
+
+    def next_free_slots(self, start, count):
+        """获取从 start 开始的前 count 个空闲时段
+
+        Args:
+            start: 查询起始时间
+            count: 需要的空闲时段数量
+
+        Returns:
+            list: 空闲时段开始时间列表
+        """
+        slots = []
+        candidate = start
+        i = bisect_right(self.starts, candidate - self.slot)
+        while len(slots) < count:
+            if i == len(self.starts) or self.starts[i] >= candidate + self.slot:
+                slots.append(candidate)
+                candidate += self.slot
+            else:
+                # 跳到冲突预约结束的时刻，继续向后查找
+                candidate = max(candidate, self.starts[i] + self.slot)
+                i += 1
+        return slots
+
+    def add(self, when):
+        """登记一个新的预约时段"""
+        insort(self.starts, when)
+
+    def remove(self, when):
+        """移除一个预约时段（例如订单取消）"""
+        i = bisect_left(self.starts, when)
+        if i < len(self.starts) and self.starts[i] == when:
+            del self.starts[i]
+
+
+def _begin_immediate():
+    """SQLite：以 BEGIN IMMEDIATE 开始当前事务，取得写锁直到提交或回滚
+
+    pysqlite 只在第一条写语句前自动开始事务，此前的查询不在事务中，这里可以显式开始事务；
+    当前事务已有写语句时已经持有写锁，无需处理
+    """
+    connection = db.session.connection()
+    if not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+class ScheduleIndex:
+    """进程内的服务人员档期索引
+
+    读路径（空闲时段查询）使用缓存，缓存超过 ORDER_SCHEDULE_TTL 秒后重新加载；
+    写路径（创建订单）通过 fresh=True 强制从数据库重新加载，避免多个 worker 之间的档期不一致；
+    同时通过 lock=True 在当前事务中锁定服务人员行（SELECT ... FOR UPDATE），同一服务人员的
+    "检查档期 -> 插入订单" 串行执行，并发预约同一时段时后到的请求会看到先提交的订单。
+    SQLite 不支持行锁，改为以 BEGIN IMMEDIATE 开始事务，提前取得数据库写锁，所有写事务串行执行。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._schedules = {}
+
+    @staticmethod
+    def slot_length():
+        """获取单个预约时段的长度"""
+        return timedelta(minutes=current_app.config.get('ORDER_SLOT_MINUTES', 120))
+
+    def _load(self, provider_ids, lock=False):
+        # 延迟导入，避免与模型模块循环导入
+        from models.order import Order
+        from models.service import ServiceProvider
+
+        slot = self.slot_length()
+        query = db.session.query(Order.service_provider_id, Order.appointment_time).filter(
+            Order.service_provider_id.in_(provider_ids),
+            Order.status != 'cancelled',
+            Order.appointment_time > datetime.utcnow() - slot
+        )
+        if lock and db.session.get_bind().dialect.name == 'sqlite':
+            _begin_immediate()
+        elif lock:
+            # 按ID顺序加锁，避免多个服务人员的批量请求之间死锁；锁持有到调用方提交或回滚
+            db.session.execute(
+                db.select(ServiceProvider.id).where(ServiceProvider.id.in_(provider_ids))
+                .order_by(ServiceProvider.id).with_for_update()
+            )
+            # 加锁读取读到最新提交的订单（不使用可重复读隔离级别下事务开始时的快照）
+            query = query.with_for_update(read=True)
+        rows = query.all()
+        starts = {provider_id: [] for provider_id in provider_ids}
+        for row in rows:
+            starts[row.service_provider_id].append(row.appointment_time)
+        return {provider_id: ProviderSchedule(slot, times) for provider_id, times in starts.items()}
+
+    def get(self, provider_id, fresh=False, lock=False):
+        """获取服务人员的档期
+
+        Args:
+            provider_id: 服务人员ID
+            fresh: 是否忽略缓存，强制从数据库加载
+            lock: 是否在当前事务中锁定服务人员行（隐含fresh），用于随后插入订单
+
+        Returns:
+            ProviderSchedule: 服务人员档期
+        """
+        return self.get_many([provider_id], fresh=fresh, lock=lock)[provider_id]
+
+    def get_many(self, provider_ids, fresh=False, lock=False):
+        """批量获取多个服务人员的档期，未命中缓存的服务人员用一次查询加载
+
+        Args:
+            provider_ids: 服务人员ID列表
+            fresh: 是否忽略缓存，强制从数据库加载
+            lock: 是否在当前事务中锁定服务人员行（隐含fresh），用于随后插入订单
+
+        Returns:
+            dict: 服务人员ID到 ProviderSchedule 的映射
+        """
+        ttl = current_app.config.get('ORDER_SCHEDULE_TTL', 30)
+        now = time.monotonic()
+        fresh = fresh or lock
+        schedules = {}
+        with self._lock:
+            for provider_id in set(provider_ids):
+                cached = self._schedules.get(provider_id)
+                if not fresh and cached and now - cached[0] < ttl:
+                    schedules[provider_id] = cached[1]
+
+        missing = [provider_id for provider_id in set(provider_ids) if provider_id not in schedules]
+        if missing:
+            loaded = self._load(missing, lock=lock)
+            with self._lock:
+                for provider_id, schedule in loaded.items():
+                    self._schedules[provider_id] = (now, schedule)
+            schedules.update(loaded)
+        return schedules
+
+    def is_free(self, provider_id, when, fresh=False, lock=False):
+        """判断服务人员在 when 时刻是否空闲"""
+        return self.get(provider_id, fresh=fresh, lock=lock).is_free(when)
+
+    def next_free_slots(self, provider_id, start, count):
+        """获取服务人员从 start 开始的前 count 个空闲时段"""
+        return self.get(provider_id).next_free_slots(start, count)
+
+    def add(self, provider_id, when):
+        """订单创建成功后登记预约时段"""
+        with self._lock:
+            cached = self._schedules.get(provider_id)
+            if cached:
+                cached[1].add(when)
+
+    def remove(self, provider_id, when):
+        """订单取消后释放预约时段"""
+        with self._lock:
+            cached = self._schedules.get(provider_id)
+            if cached:
+                cached[1].remove(when)
+
+    def invalidate(self, provider_id=None):
+        """使缓存失效，provider_id 为空时清空全部缓存"""
+        with self._lock:
+            if provider_id is None:
+                self._schedules.clear()
+            else:
+                self._schedules.pop(provider_id, None)
+
+
+# 全局档期索引实例
+schedule_index = ScheduleIndex()
@@ -0,0 +1,294 @@
+"""服务项目全文检索
+
+SQLite 使用 FTS5 虚拟表 service_item_fts（BM25 排序），PostgreSQL 使用 service_item_search 表的
+tsvector 列 + GIN 索引（ts_rank_cd 排序）。
+
+中文没有空格分词，索引和查询两端都先把连续的中日韩文字切分为重叠的二元组（"深度保洁" -> "深度 度保 保洁"），
+再交给数据库按空格分词：两个字及以上的查询词按二元组短语匹配，单字查询按前缀匹配。
+服务项目的增删改通过 SQLAlchemy 事件同步到索引；已有数据可用 flask services reindex-search 重建。
+"""
+
+import re
+import time
+
+from flask import current_app
+from markupsafe import escape
+from sqlalchemy import inspect
+
+from extensions import db
+from models.service import ServiceItem
+
+# SQLite FTS5 索引表
+SQLITE_TABLE = 'service_item_fts'
+# PostgreSQL tsvector 索引表
+POSTGRES_TABLE = 'service_item_search'
+
+# 中日韩文字
+CJK_RUN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+')
+# 数据库分词器会忽略的字符
+NON_WORD = re.compile(r'\W+')
+
+# 索引表不存在时重新检查的间隔（秒），其他进程创建索引表后无需重启即可使用检索
+MISSING_INDEX_RECHECK = 30
+
+# 已确认存在索引表的数据库
+_index_exists = set()
+# 数据库 -> 最近一次确认索引表不存在的时间
+_index_missing = {}
+
+
+def _bigrams(run, tail):
+    if len(run) == 1:
+        return run
+    tokens = [run[i:i + 2] for i in range(len(run) - 1)]
+    if tail:
+        # 末尾的字不是任何二元组的开头，单独保留一个单字以便单字前缀查询命中
+        tokens.append(run[-1])
+    return ' '.join(tokens)
+
+
+def segment(text, tail=False):
+    """将文本中连续的中日韩文字切分为重叠的二元组，其他文字保持不变
+
+    Args:
+        text: 原始文本
+        tail: 是否在每段中日韩文字末尾追加最后一个字（写入索引时使用）
+
+    Returns:
+        str: 以空格分隔的分词结果
+    """
+    if not text:
+        return ''
+    return CJK_RUN.sub(lambda m: f' {_bigrams(m.group(), tail)} ', text)
+
+
+def query_terms(q):
+    """将用户输入的查询拆分为查询词，每个查询词为一组需要连续出现的分词
+
+    Args:
+        q: 用户输入的查询字符串
+
+    Returns:
+        list: [(分词列表, 是否前缀匹配)]
+    """
+    terms = []
+    for word in NON_WORD.sub(' ', q or '').split():
+        tokens = segment(word).split()
+        if tokens:
+            # 单个汉字只能作为二元组的前缀出现
+            terms.append((tokens, len(tokens) == 1 and len(tokens[0]) == 1 and bool(CJK_RUN.match(tokens[0]))))
+    return terms
+
+
+def _dialect(connection):
+    return connection.dialect.name
+
+
+def index_exists(connection):
+    """判断当前数据库中是否已创建检索索引表
+
+    存在的结果一直缓存；不存在的结果缓存 MISSING_INDEX_RECHECK 秒后重新检查
+    """
+    key = str(connection.engine.url)
+    if key in _index_exists:
+        return True
+    checked_at = _index_missing.get(key)
+    if checked_at is not None and time.monotonic() - checked_at < MISSING_INDEX_RECHECK:
+        return False
+    table = SQLITE_TABLE if _dialect(connection) == 'sqlite' else POSTGRES_TABLE
+    if inspect(connection).has_table(table):
+        _index_exists.add(key)
+        _index_missing.pop(key, None)
+        return True
+    _index_missing[key] = time.monotonic()
+    return False
+
+
+def create_index(connection):
+    """创建检索索引表（已存在时跳过）"""
+    if _dialect(connection) == 'sqlite':
+        connection.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} "
+            f"USING fts5(title, description, tokenize='unicode61 remove_diacritics 2')"
+        )
+    else:
+        connection.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {POSTGRES_TABLE} "
+            f"(item_id INTEGER PRIMARY KEY, document TSVECTOR NOT NULL)"
+        )
+        connection.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_{POSTGRES_TABLE}_document ON {POSTGRES_TABLE} USING GIN (document)"
+        )
+    key = str(connection.engine.url)
+    _index_exists.add(key)
+    _index_missing.pop(key, None)
+
+
+def index_items(connection, items):
+    """写入或更新服务项目的索引
+
+    Args:
+        connection: 数据库连接
+        items: [(服务项目ID, 标题, 描述)]
+    """
+    if not items:
+        return
+    ids = [item_id for item_id, _, _ in items]
+    remove_items(connection, ids)
+    rows = [{'id': item_id, 'title': segment(title, tail=True), 'description': segment(description, tail=True)}
+            for item_id, title, description in items]
+    if _dialect(connection) == 'sqlite':
+        statement = f'INSERT INTO {SQLITE_TABLE} (rowid, title, description) VALUES (:id, :title, :description)'
+    else:
+        config = current_app.config.get('SEARCH_PG_CONFIG', 'simple')
+        statement = (
+            f"INSERT INTO {POSTGRES_TABLE} (item_id, document) VALUES (:id, "
+            f"setweight(to_tsvector('{config}', :title), 'A') || setweight(to_tsvector('{config}', :description), 'B'))"
+        )
+    connection.execute(db.text(statement), rows)
+
+
+def remove_items(connection, ids):
+    """从索引中删除服务项目"""
+    if _dialect(connection) == 'sqlite':
+        statement = db.text(f'DELETE FROM {SQLITE_TABLE} WHERE rowid IN :ids')
+    else:
+        statement = db.text(f'DELETE FROM {POSTGRES_TABLE} WHERE item_id IN :ids')
+    connection.execute(statement.bindparams(db.bindparam('ids', expanding=True)), {'ids': list(ids)})
+
+
+def rebuild_index(batch_size=1000):
+    """重建全部服务项目的检索索引
+
+    Returns:
+        int: 写入索引的服务项目数量
+    """
+    connection = db.session.connection()
+    create_index(connection)
+    table = SQLITE_TABLE if _dialect(connection) == 'sqlite' else POSTGRES_TABLE
+    connection.exec_driver_sql(f'DELETE FROM {table}')
+
+    total = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(ServiceItem.id, ServiceItem.title, ServiceItem.description)
+            .where(ServiceItem.id > last_id).order_by(ServiceItem.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        index_items(connection, [tuple(row) for row in rows])
+        total += len(rows)
+        last_id = rows[-1].id
+    db.session.commit()
+    return total
+
+
+def search_item_ids(q, category_ids=None, on_sale=False, limit=10, offset=0):
+    """检索服务项目
+
+    Args:
+        q: 查询字符串
+        category_ids: 限定的类别ID列表（可选）
+        on_sale: 是否只返回在售的服务项目
+        limit: 返回数量
+        offset: 跳过的结果数量
+
+    Returns:
+        list: [(服务项目ID, 相关度得分)]，按相关度从高到低排序，得分越大越相关
+    """
+    terms = query_terms(q)
+    connection = db.session.connection()
+    if not terms or not index_exists(connection):
+        return []
+
+    params = {'limit': limit, 'offset': offset}
+    filters = ''
+    if category_ids is not None:
+        filters += ' AND service_item.category_id IN :category_ids'
+        params['category_ids'] = list(category_ids)
+    if on_sale:
+        filters += ' AND service_item.is_on_sale'
+
+    if _dialect(connection) == 'sqlite':
+        params['query'] = ' '.join(
+            f'"{tokens[0]}"*' if prefix else '"' + ' '.join(tokens) + '"' for tokens, prefix in terms
+        )
+        # bm25() 越小越相关，标题权重高于描述
+        statement = (
+            f'SELECT service_item.id, -bm25({SQLITE_TABLE}, 5.0, 1.0) AS score FROM {SQLITE_TABLE} '
+            f'JOIN service_item ON service_item.id = {SQLITE_TABLE}.rowid '
+            f'WHERE {SQLITE_TABLE} MATCH :query{filters} '
+            f'ORDER BY score DESC LIMIT :limit OFFSET :offset'
+        )
+    else:
+        params['query'] = ' & '.join(
+            f'{tokens[0]}:*' if prefix else '(' + ' <-> '.join(tokens) + ')' for tokens, prefix in terms
+        )
+        statement = (
+            f'SELECT service_item.id, ts_rank_cd(s.document, query) AS score '
+            f'FROM {POSTGRES_TABLE} s JOIN service_item ON service_item.id = s.item_id, '
+            f"to_tsquery('{current_app.config.get('SEARCH_PG_CONFIG', 'simple')}', :query) query "
+            f'WHERE s.document @@ query{filters} '
+            f'ORDER BY score DESC LIMIT :limit OFFSET :offset'
+        )
+    statement = db.text(statement)
+    if category_ids is not None:
+        statement = statement.bindparams(db.bindparam('category_ids', expanding=True))
+    return [(row[0], row[1]) for row in connection.execute(statement, params)]
+
+
+def make_snippet(text, q, width=30, start_mark='<b>', end_mark='</b>'):
+    """从原文中截取包含查询词的片段并高亮查询词
+
+    原文按HTML转义后再插入高亮标记，片段可以直接作为HTML输出
+
+    Args:
+        text: 原文
+        q: 查询字符串
+        width: 查询词前后保留的字符数
+
+    Returns:
+        str: 片段，原文为空时返回空字符串
+    """
+    if not text:
+        return ''
+    words = [word for word in NON_WORD.sub(' ', q or '').split() if word]
+    if not words:
+        return str(escape(text[:width * 2]))
+    pattern = re.compile('|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True)), re.IGNORECASE)
+    match = pattern.search(text)
+    if not match:
+        return str(escape(text[:width * 2])) + ('…' if len(text) > width * 2 else '')
+    begin = max(match.start() - width, 0)
+    end = min(match.end() + width, len(text))
+    # 先截取再逐段转义，转义不会改变截取位置，也不会把实体拆开
+    parts = []
+    position = begin
+    for m in pattern.finditer(text, begin, end):
+        parts.append(f'{escape(text[position:m.start()])}{start_mark}{escape(m.group())}{end_mark}')
+        position = m.end()
+    parts.append(str(escape(text[position:end])))
+    fragment = ''.join(parts)
+    return ('…' if begin > 0 else '') + fragment + ('…' if end < len(text) else '')
+
+
+@db.event.listens_for(ServiceItem, 'after_insert')
+def _index_inserted_item(mapper, connection, target):
+    if index_exists(connection):
+        index_items(connection, [(target.id, target.title, target.description)])
+
+
+@db.event.listens_for(ServiceItem, 'after_update')
+def _index_updated_item(mapper, connection, target):
+    state = db.inspect(target)
+    if not (state.attrs.title.history.has_changes() or state.attrs.description.history.has_changes()):
+        return
+    if index_exists(connection):
+        index_items(connection, [(target.id, target.title, target.description)])
+
+
+@db.event.listens_for(ServiceItem, 'after_delete')
+def _remove_deleted_item(mapper, connection, target):
+    if index_exists(connection):
+        remove_items(connection, [target.id])
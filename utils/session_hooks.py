@@ -0,0 +1,48 @@
+"""事务提交后回调
+
+进程内缓存只应反映已提交的数据：模型事件（after_insert / after_update / after_delete）中
+调用 on_commit 登记回调，事务提交后执行，回滚时丢弃。登记的回调保存在 session.info 中，
+同一事务内以相同 key 多次登记只执行一次。
+"""
+
+from sqlalchemy.orm import Session
+
+from extensions import db
+
+# session.info 中保存待执行回调的键
+_INFO_KEY = 'on_commit_callbacks'
+
+
+def on_commit(session, key, callback, factory=None):
+    """登记在 session 当前事务提交后执行的回调
+
+    Args:
+        session: 数据库会话
+        key: 回调的唯一标识，同一事务内相同 key 只登记第一次的回调
+        callback: 提交后执行的回调；提供 factory 时以累积的变更为参数调用，否则无参数调用
+        factory: 创建变更容器的函数，如 set、list、dict
+
+    Returns:
+        本事务内累积变更的容器（提供 factory 时），调用方向其中添加变更；否则返回None
+    """
+    callbacks = session.info.setdefault(_INFO_KEY, {})
+    if key not in callbacks:
+        callbacks[key] = (callback, factory() if factory is not None else None, factory is not None)
+    return callbacks[key][1]
+
+
+@db.event.listens_for(Session, 'after_commit')
+def _run_on_commit(session):
+    callbacks = session.info.pop(_INFO_KEY, None)
+    if not callbacks:
+        return
+    for callback, changes, with_changes in callbacks.values():
+        if with_changes:
+            callback(changes)
+        else:
+            callback()
+
+
+@db.event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop(_INFO_KEY, None)
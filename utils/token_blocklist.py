@@ -0,0 +1,143 @@
+"""JWT吊销列表
+
+登出、刷新令牌轮换时把作废令牌的 jti 写入 revoked_token 表，同时加入本进程的吊销列表。
+每个需要认证的请求只在进程内的字典中检查 jti（O(1)），不查询数据库：
+
+- 进程内吊销列表为 {jti: 过期时间}，令牌过期后 JWT 校验本身就会拒绝，对应条目按过期时间自动清除；
+- 其他进程吊销的令牌每 TOKEN_BLOCKLIST_SYNC 秒增量同步一次（按吊销时间，向前多取
+  TOKEN_BLOCKLIST_SYNC_MARGIN 秒以容忍各服务器时钟偏差和事务提交延迟），即吊销最迟在该间隔后对所有进程生效；
+- 本进程第一次使用时加载全部未过期的吊销记录。
+"""
+
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from extensions import db, jwt
+from models.user import RevokedToken
+from utils.session_hooks import on_commit
+
+
+class TokenBlocklist:
+    """进程内的令牌吊销列表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # jti -> 过期时间（时间戳）
+        self._entries = {}
+        # 过期时间小顶堆：(过期时间, jti)
+        self._expiry = []
+        self._loaded = False
+        # 上次同步时的数据库时间窗口起点（UTC）
+        self._synced_until = None
+        self._synced_at = 0
+
+    def _add(self, jti, expires):
+        if jti not in self._entries:
+            self._entries[jti] = expires
+            heapq.heappush(self._expiry, (expires, jti))
+
+    def _purge(self, now):
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= now:
+            _, jti = heapq.heappop(expiry)
+            self._entries.pop(jti, None)
+
+    def _sync(self):
+        config = current_app.config
+        now = time.monotonic()
+        if self._loaded and now - self._synced_at < config.get('TOKEN_BLOCKLIST_SYNC', 2):
+            return
+        started = datetime.utcnow()
+        query = db.select(RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.expires_at > started)
+        if self._loaded:
+            margin = timedelta(seconds=config.get('TOKEN_BLOCKLIST_SYNC_MARGIN', 60))
+            query = query.where(RevokedToken.revoked_at >= self._synced_until - margin)
+        rows = db.session.execute(query).all()
+        with self._lock:
+            for jti, expires_at in rows:
+                self._add(jti, _timestamp(expires_at))
+            self._purge(time.time())
+            self._loaded = True
+            self._synced_until = started
+            self._synced_at = now
+
+    def is_revoked(self, jti):
+        """令牌是否已被吊销"""
+        self._sync()
+        entry = self._entries.get(jti)
+        return entry is not None and entry > time.time()
+
+    def add(self, tokens):
+        """把已提交的吊销记录加入本进程的吊销列表
+
+        Args:
+            tokens: [(jti, 过期时间戳)]
+        """
+        with self._lock:
+            for jti, expires in tokens:
+                self._add(jti, expires)
+
+    def purge_expired(self):
+        """删除数据库中已过期的吊销记录
+
+        Returns:
+            int: 删除的记录数
+        """
+        result = db.session.execute(db.delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+        db.session.commit()
+        return result.rowcount
+
+
+def _timestamp(value):
+    # 数据库中的时间为不带时区的UTC时间
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+# 全局令牌吊销列表实例
+token_blocklist = TokenBlocklist()
+
+
+@jwt.token_in_blocklist_loader
+def check_if_token_revoked(jwt_header, jwt_payload):
+    """每个需要认证的请求调用，判断令牌是否已被吊销"""
+    return token_blocklist.is_revoked(jwt_payload['jti'])
+
+
+def revoke_tokens(*payloads):
+    """吊销令牌，写入数据库（需由调用方提交），提交后加入本进程的吊销列表
+
+    已吊销的令牌不重复写入，由返回值告知调用方（本进程的吊销列表最多滞后 TOKEN_BLOCKLIST_SYNC 秒，
+    其他进程刚吊销的令牌仍可能通过认证，单次使用的刷新令牌需据此拒绝）。
+    并发吊销同一令牌时提交会违反 revoked_token.jti 唯一约束（IntegrityError），调用方同样按已吊销处理
+
+    Args:
+        payloads: 解码后的JWT声明
+
+    Returns:
+        set: 数据库中已吊销的令牌 jti
+    """
+    payloads = {payload['jti']: payload for payload in payloads}
+    existing = set(db.session.execute(
+        db.select(RevokedToken.jti).where(RevokedToken.jti.in_(list(payloads)))
+    ).scalars())
+    identity_claim = current_app.config.get('JWT_IDENTITY_CLAIM', 'sub')
+    for jti, payload in payloads.items():
+        if jti in existing:
+            continue
+        expires = payload.get('exp')
+        if expires is None:
+            # 没有过期时间的令牌按一年保留吊销记录
+            expires = time.time() + 365 * 24 * 3600
+        db.session.add(RevokedToken(
+            jti=jti,
+            token_type=payload.get('type', 'access'),
+            user_id=int(payload[identity_claim]),
+            expires_at=datetime.utcfromtimestamp(expires)
+        ))
+        on_commit(db.session, 'token_blocklist', token_blocklist.add, list).append((jti, expires))
+    return existing
+
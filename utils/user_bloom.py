@@ -0,0 +1,201 @@
+"""用户邮箱、手机号、用户名的布隆过滤器
+
+注册和“是否已被占用”检查时先查询进程内的布隆过滤器：过滤器判断不存在时一定不存在，不需要查询数据库；
+判断可能存在时（包括约 USER_BLOOM_ERROR_RATE 的误判）再用一次查询确认。
+
+- 过滤器在本进程第一次使用时按全部用户构建，之后每 USER_BLOOM_REFRESH 秒增量加入新注册的用户（按用户ID），
+  每 USER_BLOOM_TTL 秒全量重建（布隆过滤器不能删除元素，重建后已修改的旧值不再误判为已占用）；
+- 本进程内新增或修改的用户在事务提交后立即加入过滤器。
+"""
+
+import hashlib
+import math
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy.orm import object_session
+
+from extensions import db
+from models.user import User
+from utils.session_hooks import on_commit
+
+# 使用布隆过滤器的字段
+FIELDS = ('email', 'phone', 'username')
+
+
+class BloomFilter:
+    """布隆过滤器
+
+    Args:
+        capacity: 预计元素数量
+        error_rate: 元素数量不超过capacity时的误判率
+    """
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # 双重哈希：由一个128位摘要的两半生成 k 个位置
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        """加入一个元素，元素已存在（或误判为已存在）时不增加计数"""
+        added = False
+        for position in self._positions(value):
+            mask = 1 << (position & 7)
+            if not self._bits[position >> 3] & mask:
+                self._bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, value):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class UserBloomFilters:
+    """进程内的用户邮箱、手机号、用户名布隆过滤器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 字段名 -> BloomFilter
+        self._filters = None
+        # 已加入过滤器的最大用户ID
+        self._max_id = 0
+        self._loaded_at = 0
+        self._refreshed_at = 0
+
+    def _add_rows(self, filters, rows):
+        max_id = 0
+        for row in rows:
+            max_id = max(max_id, row.id)
+            for field in FIELDS:
+                value = getattr(row, field)
+                if value:
+                    filters[field].add(value)
+        return max_id
+
+    def _load(self):
+        config = current_app.config
+        count = db.session.execute(db.select(db.func.count(User.id))).scalar()
+        # 预留新注册用户的空间，超出容量后提前全量重建
+        capacity = max(count * 2, config.get('USER_BLOOM_MIN_CAPACITY', 100000))
+        filters = {field: BloomFilter(capacity, config.get('USER_BLOOM_ERROR_RATE', 0.001)) for field in FIELDS}
+        rows = db.session.execute(
+            db.select(User.id, User.email, User.phone, User.username).execution_options(yield_per=10000)
+        )
+        max_id = self._add_rows(filters, rows)
+        return filters, max_id
+
+    def _get_filters(self):
+        config = current_app.config
+        now = time.monotonic()
+        filters = self._filters
+        if (filters is None or now - self._loaded_at >= config.get('USER_BLOOM_TTL', 3600)
+                or filters['email'].count >= filters['email'].capacity):
+            filters, max_id = self._load()
+            with self._lock:
+                self._filters, self._max_id = filters, max_id
+                self._loaded_at = self._refreshed_at = time.monotonic()
+            return filters
+
+        if now - self._refreshed_at >= config.get('USER_BLOOM_REFRESH', 5):
+            # 增量加入其他进程新注册的用户
+            rows = db.session.execute(
+                db.select(User.id, User.email, User.phone, User.username).where(User.id > self._max_id)
+            ).all()
+            with self._lock:
+                if self._filters is filters:
+                    self._max_id = max(self._max_id, self._add_rows(filters, rows))
+                    self._refreshed_at = now
+        return filters
+
+    def might_contain(self, **values):
+        """检查各字段的值是否可能已存在
+
+        Args:
+            values: 字段名 -> 值，字段为 email、phone、username 之一
+
+        Returns:
+            dict: 字段名 -> 是否可能已存在（False表示一定不存在）
+        """
+        filters = self._get_filters()
+        with self._lock:
+            return {field: value in filters[field] for field, value in values.items()}
+
+    def add(self, users):
+        """把已提交的用户加入过滤器
+
+        Args:
+            users: [(用户ID, 邮箱, 手机号, 用户名)]
+        """
+        with self._lock:
+            filters = self._filters
+            if filters is None:
+                return
+            for user_id, email, phone, username in users:
+                for field, value in zip(FIELDS, (email, phone, username)):
+                    if value:
+                        filters[field].add(value)
+
+    def invalidate(self):
+        """使过滤器失效，下次使用时重新构建"""
+        with self._lock:
+            self._filters = None
+
+
+# 全局用户布隆过滤器实例
+user_bloom_filters = UserBloomFilters()
+
+
+def find_taken(**values):
+    """检查邮箱、手机号、用户名是否已被占用
+
+    布隆过滤器判断可能存在的字段用一次查询确认
+
+    Args:
+        values: 字段名 -> 值，字段为 email、phone、username 之一，值为空的字段忽略
+
+    Returns:
+        set: 已被占用的字段名
+    """
+    values = {field: value for field, value in values.items() if value}
+    if not values:
+        return set()
+    candidates = [field for field, hit in user_bloom_filters.might_contain(**values).items() if hit]
+    if not candidates:
+        return set()
+    rows = db.session.execute(
+        db.select(User.email, User.phone, User.username)
+        .where(db.or_(*(getattr(User, field) == values[field] for field in candidates)))
+    ).all()
+    return {field for field in candidates for row in rows if getattr(row, field) == values[field]}
+
+
+def _bloom_changes(target):
+    # 本次事务中需要加入过滤器的用户，提交后加入
+    return on_commit(object_session(target), 'user_bloom', user_bloom_filters.add, list)
+
+
+@db.event.listens_for(User, 'after_insert')
+def _record_user(mapper, connection, target):
+    _bloom_changes(target).append((target.id, target.email, target.phone, target.username))
+
+
+@db.event.listens_for(User, 'after_update')
+def _record_user_update(mapper, connection, target):
+    # 只加入修改过的字段，修改其他字段（如密码、头像）时不重复加入
+    attrs = db.inspect(target).attrs
+    changed = [getattr(target, field) if attrs[field].history.has_changes() else None for field in FIELDS]
+    if any(changed):
+        _bloom_changes(target).append((target.id, *changed))
+
@@ -0,0 +1,118 @@
+"""当前登录用户的加载与缓存
+
+注册 Flask-JWT-Extended 的 user_lookup_loader，视图中通过 current_user 获取当前登录用户：
+1. 同一请求内只加载一次（Flask-JWT-Extended 把加载结果保存在请求上下文中）；
+2. 用户数据以列值快照的形式缓存在进程内（按最近使用淘汰，最多 USER_CACHE_SIZE 个，缓存 USER_CACHE_TTL 秒），
+   缓存命中时把快照合并到当前会话（merge(load=False)），不查询数据库，
+   得到的用户对象与查询得到的一样可以访问关联数据和修改；
+3. 本进程内修改或删除用户在事务提交后立即使对应缓存失效，其他进程（worker）最迟在 USER_CACHE_TTL 秒后失效。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g
+from sqlalchemy.orm import make_transient_to_detached, object_session
+
+from extensions import db, jwt
+from models.user import User
+from utils.session_hooks import on_commit
+
+# 快照中保存的列
+COLUMNS = tuple(column.key for column in User.__table__.columns)
+
+
+class UserCache:
+    """进程内的用户数据缓存，按用户ID保存列值快照"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 用户ID -> (缓存时间, 列值快照)，按最近使用排序
+        self._entries = OrderedDict()
+
+    def _get_entry(self, user_id):
+        ttl = current_app.config.get('USER_CACHE_TTL', 60)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= ttl:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def _put(self, user):
+        snapshot = {key: getattr(user, key) for key in COLUMNS}
+        max_size = current_app.config.get('USER_CACHE_SIZE', 10000)
+        with self._lock:
+            self._entries[user.id] = (time.monotonic(), snapshot)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, user_id):
+        """获取用户，缓存命中时不查询数据库
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            User: 属于当前会话的用户对象，用户不存在时返回None
+        """
+        snapshot = self._get_entry(user_id)
+        if snapshot is None:
+            user = db.session.get(User, user_id)
+            if user is not None:
+                self._put(user)
+            return user
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        # 会话中已有该用户时返回会话中的对象
+        return db.session.merge(user, load=False)
+
+    def invalidate(self, user_ids=None):
+        """使缓存失效
+
+        Args:
+            user_ids: 要失效的用户ID，为None时清空全部缓存
+        """
+        with self._lock:
+            if user_ids is None:
+                self._entries.clear()
+                return
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+
+# 全局用户缓存实例
+user_cache = UserCache()
+
+
+@jwt.user_lookup_loader
+def load_user(jwt_header, jwt_data):
+    """根据访问令牌加载当前登录用户，用户不存在时返回None（请求被拒绝）"""
+    try:
+        user_id = int(jwt_data[current_app.config.get('JWT_IDENTITY_CLAIM', 'sub')])
+    except (TypeError, ValueError):
+        return None
+    return user_cache.get(user_id)
+
+
+def get_admin_user():
+    """获取管理员用户，同一请求内只查询一次
+
+    Returns:
+        User: 管理员用户，不存在时返回None
+    """
+    if 'admin_user' not in g:
+        g.admin_user = User.query.filter_by(email='admin@example.com').first()
+    return g.admin_user
+
+
+@db.event.listens_for(User, 'after_update')
+@db.event.listens_for(User, 'after_delete')
+def _record_user_change(mapper, connection, target):
+    # 本次事务修改或删除的用户，提交后从缓存中移除
+    on_commit(object_session(target), 'user_cache', user_cache.invalidate, set).add(target.id)
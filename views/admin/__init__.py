@@ -8,6 +8,7 @@ from models.order import Order, OrderReview
 from models.marketing import Coupon, UserCoupon
 from models.support import FAQ
 from flask_jwt_extended import  get_jwt_identity  # 移除 jwt_required
+from utils.user_cache import get_admin_user
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -21,7 +22,7 @@ class MyAdminIndexView(AdminIndexView):
         #user = User.query.get(current_user_id)  # 移除
 
         # 修改权限控制逻辑，直接查询 admin@example.com 用户
-        user = User.query.filter_by(email="admin@example.com").first()
+        user = get_admin_user()
 
         if not user : #假设管理员邮箱是这个
              return redirect(url_for('users.login'))
@@ -41,7 +42,7 @@ class MyModelView(ModelView):
     # column_list = [...]  # 显示的列
     # form_excluded_columns = [...]  # 表单中排除的列
     def is_accessible(self):  # 4 个空格缩进
-        user = User.query.filter_by(email="admin@example.com").first()  # 8 个空格缩进
+        user = get_admin_user()  # 同一请求内只查询一次
         # 超级管理员
         return user is not None  # 8 个空格缩进
 
@@ -50,17 +51,24 @@ class MyModelView(ModelView):
         return redirect(url_for('users.login', next=request.url))  # 8 个空格缩进
 
 
+# 订单视图：订单状态只能通过 utils.order_state 的状态转换修改，后台表单中不提供状态字段
+class OrderModelView(MyModelView):
+    can_create = False  # 订单由用户下单创建
+    form_excluded_columns = ['status']
+
 
 # 添加模型视图
 admin.add_view(MyModelView(User, db.session))
 admin.add_view(MyModelView(ServiceCategory, db.session))
 admin.add_view(MyModelView(ServiceItem, db.session))
 admin.add_view(MyModelView(ServiceProvider, db.session))
-admin.add_view(MyModelView(Order, db.session))
+admin.add_view(OrderModelView(Order, db.session))
 admin.add_view(MyModelView(OrderReview, db.session))
 admin.add_view(MyModelView(Coupon, db.session))
 admin.add_view(MyModelView(UserCoupon, db.session))
 admin.add_view(MyModelView(FAQ, db.session))
 
+from . import routes  # 导入自定义路由
+
 #第一次修改推送到github
 #第二次修改
\ No newline at end of file
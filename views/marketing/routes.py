@@ -2,16 +2,24 @@
 
 主要功能：
 1. 创建优惠券：管理员创建各类优惠券
-2. 领取优惠券：用户领取可用的优惠券
+2. 领取优惠券：用户领取可用的优惠券，限量优惠券在高并发领取时不会超发
+3. 一次性券码：管理员为优惠券批量生成一次性券码并流式下载，用户使用券码领取优惠券
 """
 
-from flask import jsonify, request
+import csv
+import io
+from flask import jsonify, request, current_app, Response, stream_with_context
 from . import marketing_bp
-from models.marketing import Coupon, UserCoupon
+from models.marketing import Coupon, CouponCode, UserCoupon
 from serializers.marketing_schema import CouponSchema, UserCouponSchema
 from extensions import db
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, current_user
 from datetime import datetime
+from utils import coupon_claims
+from utils.coupon_codes import generate_codes
+
+# 下载券码时每批从数据库读取的行数
+CODE_EXPORT_BATCH_SIZE = 10000
 
 @marketing_bp.route('/coupons', methods=['POST'])
 @jwt_required()
@@ -30,16 +38,14 @@ def create_coupon():
         min_spend: 最低消费金额（可选）
         max_discount: 最大折扣金额（可选）
         usage_limit: 使用次数限制（可选）
+        total_quantity: 发放总量（可选，默认不限量）
         
     返回值：
         成功：返回新创建的优惠券信息，状态码201
         失败：返回错误信息和对应状态码
     """
-    # 获取当前登录用户ID
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
     # 权限验证（仅管理员可创建优惠券）
-    if not user or user.email != "admin@example.com":
+    if current_user.email != "admin@example.com":
         return jsonify({'message':'Unauthorized'}), 403
     
     # 获取请求数据
@@ -60,7 +66,8 @@ def create_coupon():
         is_active=data.get('is_active', True),  # 是否激活，默认为True
         min_spend=data.get('min_spend'),  # 最低消费金额
         max_discount=data.get('max_discount'),  # 最大折扣金额
-        usage_limit=data.get('usage_limit')  # 使用次数限制
+        usage_limit=data.get('usage_limit'),  # 使用次数限制
+        total_quantity=data.get('total_quantity')  # 发放总量
     )
     # 保存到数据库
     db.session.add(new_coupon)
@@ -75,41 +82,106 @@ def create_coupon():
 def claim_coupon():
     """领取优惠券
     
-    用户领取系统中可用的优惠券
+    用户领取系统中可用的优惠券。优惠券定义从进程内缓存读取，重复领取由唯一约束拒绝，
+    限量优惠券的库存用条件UPDATE原子扣减（见utils.coupon_claims）
     
     请求参数：
-        code: 优惠券码
+        code: 优惠券码或一次性券码
         
     返回值：
         成功：返回用户领取的优惠券信息，状态码201
-        失败：返回错误信息和对应状态码
+        失败：返回错误信息和对应状态码，优惠券已领完时返回409
     """
     # 获取当前登录用户ID
-    current_user_id = get_jwt_identity()
+    current_user_id = int(get_jwt_identity())
     # 获取请求数据
     data = request.get_json()
-    coupon_code = data.get('code')
+    coupon_code = data.get('code') if data else None
+    if not coupon_code:
+        return jsonify({'message': 'Missing required field: code'}), 400
 
-    # 查找优惠券并验证是否存在且激活
-    coupon = Coupon.query.filter_by(code=coupon_code, is_active=True).first()
-    if not coupon:
-        return jsonify({'message': 'Invalid or expired coupon code'}), 404
+    try:
+        user_coupon_id, coupon = coupon_claims.claim_coupon(current_user_id, coupon_code)
+    except coupon_claims.CouponClaimError as e:
+        return jsonify({'message': str(e)}), e.status
 
-    # 检查优惠券是否在有效期内
-    if not coupon.is_valid():
-        return jsonify({'message': 'Coupon is expired or not active'}), 400
+    # 序列化用户优惠券数据并返回（优惠券信息使用缓存的序列化结果）
+    user_coupon_schema = UserCouponSchema(exclude=('coupon',))
+    result = user_coupon_schema.dump({'id': user_coupon_id, 'user_id': current_user_id,
+                                      'coupon_id': coupon.id, 'used_at': None})
+    result['coupon'] = coupon.data
+    return jsonify(result), 201
 
-    # 检查用户是否已经领取过该优惠券
-    existing_user_coupon = UserCoupon.query.filter_by(user_id=current_user_id, coupon_id=coupon.id).first()
-    if existing_user_coupon:
-        return jsonify({'message': 'User has already claimed this coupon'}), 400
+@marketing_bp.route('/coupons/<int:coupon_id>/codes', methods=['POST'])
+@jwt_required()
+def create_coupon_codes(coupon_id):
+    """批量生成一次性券码
 
-    # 创建用户优惠券关联记录
-    user_coupon = UserCoupon(user_id=current_user_id, coupon_id=coupon.id)
-    db.session.add(user_coupon)
-    db.session.commit()
+    券码由序号经过带密钥的置换生成，保证不重复，生成时不查询已有券码（见utils.coupon_codes），
+    按批用 executemany 写入数据库
+
+    请求参数：
+        count: 生成数量，单次最多 COUPON_CODE_MAX_PER_REQUEST 个
+
+    返回值：
+        成功：返回本批券码的起始序号和数量，状态码201
+        失败：返回错误信息和对应状态码
+    """
+    # 权限验证（仅管理员可生成券码）
+    if current_user.email != "admin@example.com":
+        return jsonify({'message': 'Unauthorized'}), 403
 
-    # 序列化用户优惠券数据并返回
-    user_coupon_schema = UserCouponSchema()
-    return jsonify(user_coupon_schema.dump(user_coupon)), 201
+    data = request.get_json(silent=True) or {}
+    count = data.get('count')
+    max_count = current_app.config['COUPON_CODE_MAX_PER_REQUEST']
+    if not isinstance(count, int) or isinstance(count, bool) or not 0 < count <= max_count:
+        return jsonify({'message': f'count must be an integer between 1 and {max_count}'}), 400
+    if not db.session.get(Coupon, coupon_id):
+        return jsonify({'message': 'Coupon not found'}), 404
+    try:
+        start = generate_codes(coupon_id, count)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    return jsonify({'coupon_id': coupon_id, 'start': start, 'count': count}), 201
 
+@marketing_bp.route('/coupons/<int:coupon_id>/codes', methods=['GET'])
+@jwt_required()
+def export_coupon_codes(coupon_id):
+    """流式下载优惠券的一次性券码（CSV）
+
+    分批读取券码，边读边输出，下载上千万个券码时内存占用保持平稳
+
+    查询参数：
+        unredeemed: 为1时只下载未使用的券码（可选）
+
+    返回值：
+        成功：返回CSV数据流（列为 code、redeemed_at），状态码200
+        失败：返回错误信息和对应状态码
+    """
+    # 权限验证（仅管理员可下载券码）
+    if current_user.email != "admin@example.com":
+        return jsonify({'message': 'Unauthorized'}), 403
+    if not db.session.get(Coupon, coupon_id):
+        return jsonify({'message': 'Coupon not found'}), 404
+
+    query = db.select(CouponCode.code, CouponCode.redeemed_at).where(CouponCode.coupon_id == coupon_id)
+    if request.args.get('unredeemed') == '1':
+        query = query.where(CouponCode.redeemed_at.is_(None))
+    query = query.order_by(CouponCode.id).execution_options(stream_results=True, yield_per=CODE_EXPORT_BATCH_SIZE)
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('code', 'redeemed_at'))
+        for rows in db.session.execute(query).partitions():
+            writer.writerows((code, redeemed_at.isoformat() if redeemed_at else '') for code, redeemed_at in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename=coupon-{coupon_id}-codes.csv'}
+    )
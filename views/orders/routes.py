@@ -1,21 +1,28 @@
 """订单管理模块，提供订单的创建、查询、取消和评价等功能
 
 主要功能：
-1. 创建订单：用户选择服务项目并提交订单
+1. 创建订单：用户选择服务项目并提交订单，可使用优惠券（指定或自动选择最优的一张），下单前可预览价格
 2. 查询订单：获取订单详细信息
 3. 取消订单：允许用户在特定条件下取消订单
 4. 订单评价：用户对已完成的订单进行评价
 """
 
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from . import orders_bp
-from models.order import Order, OrderReview
-from models.service import ServiceItem
-from serializers.order_schema import OrderSchema, OrderReviewSchema
+from models.order import Order, OrderArchive, OrderReview
+from models.service import ServiceItem, ServiceProvider
+from models.user import Address
+from serializers.order_schema import ORDER_PROFILES, ORDER_ARCHIVE_PROFILES, REVIEW_PROFILES
 from extensions import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import datetime
-from utils.helpers import format_datetime
+from decimal import Decimal
+from utils.helpers import format_datetime, parse_datetime, parse_coordinates, encode_cursor, decode_cursor
+from utils.schedule import schedule_index, ProviderSchedule
+from utils import order_state
+from utils.provider_rating import record_review, RATINGS
+from utils.divisions import get_division_index
+from utils.coupon_pricing import CouponUnavailable, apply_coupon, quote_coupons, release_coupon
 
 @orders_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -26,14 +33,22 @@ def create_order():
     
     请求参数：
         service_item_id: 服务项目ID
-        appointment_time: 预约时间
-        address: 服务地址
+        appointment_time: 预约时间（ISO 8601格式）
+        address: 服务地址（以省、市、区县开头时从中解析出行政区划代码）
+        address_id: 当前用户的地址ID，用于获取服务地址的经纬度和行政区划代码（可选）
+        latitude: 服务地址的纬度（可选，未提供address_id时与longitude同时提供）
+        longitude: 服务地址的经度（可选）
+        auto_dispatch: 是否自动派单（可选，默认False）。为True或服务项目没有指定服务人员时，
+            订单创建时不指定服务人员，由派单任务（flask orders dispatch）按距离、评分、负载分配，
+            此时必须提供服务地址的经纬度
+        user_coupon_id: 使用的用户优惠券ID（可选）
+        use_best_coupon: 是否自动使用优惠金额最高的优惠券（可选，默认False，指定user_coupon_id时忽略）
         
     返回值：
         成功：返回新创建的订单信息，状态码201
-        失败：返回错误信息和对应的状态码
+        失败：返回错误信息和对应的状态码，服务人员该时段已有预约时返回409，指定的优惠券不可用时返回400
     """
-    current_user_id = get_jwt_identity()
+    current_user_id = int(get_jwt_identity())
     data = request.get_json()
 
     # 1. 数据验证
@@ -52,24 +67,280 @@ def create_order():
     if not service_item.is_on_sale:
         return jsonify({'message':'Service item is currently not on sale'}),400
 
-    # 4. 创建订单
+    # 4. 服务地址的经纬度和行政区划（使用已保存的地址时直接取规范化结果，否则从地址文本解析）
+    coordinates = (None, None)
+    if data.get('address_id'):
+        address = Address.query.filter_by(id=data['address_id'], user_id=current_user_id).first()
+        if not address:
+            return jsonify({'message': 'Address not found'}), 404
+        coordinates = (address.latitude, address.longitude)
+        division_code = address.division_code
+    else:
+        division_code = get_division_index().parse(data['address'])
+        if data.get('latitude') is not None or data.get('longitude') is not None:
+            coordinates = parse_coordinates(data.get('latitude'), data.get('longitude'))
+            if not coordinates:
+                return jsonify({'message': 'Invalid latitude/longitude'}), 400
+    auto_dispatch = bool(data.get('auto_dispatch')) or not service_item.service_provider_id
+    if auto_dispatch and coordinates[0] is None:
+        return jsonify({'message': 'Coordinates are required for auto dispatch'}), 400
+
+    # 5. 检查服务人员在预约时段是否空闲（自动派单的订单由派单任务检查）。
+    #    锁定服务人员行直到订单提交，同一服务人员的并发预约串行检查，不会重复预约同一时段
+    appointment_time = parse_datetime(data['appointment_time'])
+    if not appointment_time:
+        return jsonify({'message': 'Invalid appointment_time format'}), 400
+    provider_id = None if auto_dispatch else service_item.service_provider_id
+    if provider_id and not schedule_index.is_free(provider_id, appointment_time, lock=True):
+        db.session.rollback()
+        return jsonify({'message': 'Service provider is not available at this time'}), 409
+
+    # 6. 使用优惠券：标记为已使用与订单在同一事务中提交
+    quote = None
+    if data.get('user_coupon_id') is not None or data.get('use_best_coupon'):
+        try:
+            quote = apply_coupon(current_user_id, service_item.price, data.get('user_coupon_id'))
+        except CouponUnavailable as e:
+            db.session.rollback()
+            return jsonify({'message': str(e)}), 400
+    discount_amount = quote.discount if quote else None
+
+    # 7. 创建订单
     new_order = Order(
         user_id=current_user_id,
         service_item_id=data['service_item_id'],
-        service_provider_id = service_item.service_provider_id, # 从服务中获取服务提供者ID
-        total_amount=service_item.price,  # 简化处理，假设总价等于服务单价
-        appointment_time=data['appointment_time'],
+        service_provider_id = provider_id, # 从服务中获取服务提供者ID，自动派单时为空
+        total_amount=service_item.price - (discount_amount or 0),  # 简化处理，假设总价等于服务单价减去优惠
+        discount_amount=discount_amount,
+        user_coupon_id=quote.user_coupon_id if quote else None,
+        appointment_time=appointment_time,
         address = data['address'],
-        status='pending' # 新订单状态为待支付
+        latitude=coordinates[0],
+        longitude=coordinates[1],
+        division_code=division_code,
+        status=order_state.PENDING # 新订单状态为待支付
     )
     # 生成订单号
     new_order.generate_order_no()
 
     db.session.add(new_order)
     db.session.commit()
+    # 登记到档期索引
+    if provider_id:
+        schedule_index.add(provider_id, new_order.appointment_time)
+
+    return jsonify(ORDER_PROFILES['detail'].dump(new_order)), 201
+
+@orders_bp.route('/preview', methods=['POST'])
+@jwt_required()
+def preview_order_price():
+    """预览订单价格
+
+    计算当前用户每张可用优惠券对该服务项目的优惠金额，返回最优（或指定）优惠券使用后的价格，不修改任何数据
+
+    请求参数：
+        service_item_id: 服务项目ID
+        user_coupon_id: 使用的用户优惠券ID（可选，默认使用优惠金额最高的优惠券）
+
+    返回值：
+        成功：返回原价、优惠金额、应付金额、使用的优惠券及全部可用优惠券（按优惠金额从高到低），状态码200
+        失败：返回错误信息和对应的状态码，指定的优惠券不可用时返回400
+    """
+    current_user_id = int(get_jwt_identity())
+    data = request.get_json()
+    if not data or 'service_item_id' not in data:
+        return jsonify({'message': 'Missing required field:service_item_id'}), 400
+    service_item = db.session.get(ServiceItem, data['service_item_id'])
+    if not service_item:
+        return jsonify({'message': 'Service item not found'}), 404
+
+    quotes = quote_coupons(current_user_id, service_item.price)
+    quote = quotes[0] if quotes else None
+    if data.get('user_coupon_id') is not None:
+        quote = next((q for q in quotes if q.user_coupon_id == data['user_coupon_id']), None)
+        if quote is None:
+            return jsonify({'message': f"Coupon {data['user_coupon_id']} is not applicable"}), 400
+
+    def dump_quote(q):
+        return {'user_coupon_id': q.user_coupon_id, 'coupon_id': q.coupon_id, 'code': q.code,
+                'discount_type': q.discount_type, 'discount': q.discount, 'end_date': format_datetime(q.end_date)}
+
+    discount = quote.discount if quote else Decimal('0.00')
+    return jsonify({
+        'price': service_item.price,
+        'discount_amount': discount,
+        'total_amount': service_item.price - discount,
+        'coupon': dump_quote(quote) if quote else None,
+        'coupons': [dump_quote(q) for q in quotes]
+    }), 200
+
+def _is_id(value):
+    """是否为合法的ID（整数，不含布尔值）"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+@orders_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def create_orders_batch():
+    """批量创建订单
+    
+    企业客户一次提交多个预约。所有服务项目用一次查询校验，所有服务人员的档期用一次查询加载，
+    校验通过的订单在同一个事务中批量插入；校验失败的订单不影响其他订单
+    
+    请求参数：
+        orders: 订单列表，每项包含 service_item_id、appointment_time、address、remark（可选）
+        
+    返回值：
+        成功：返回每个订单的处理结果，状态码201
+        失败：返回错误信息和对应状态码，所有订单都未通过校验时返回400
+    """
+    current_user_id = int(get_jwt_identity())
+    data = request.get_json()
+
+    # 1. 数据验证
+    if not data or not isinstance(data.get('orders'), list) or not data['orders']:
+        return jsonify({'message': 'No orders provided'}), 400
+    lines = data['orders']
+    if len(lines) > current_app.config['ORDER_BATCH_MAX']:
+        return jsonify({'message': f"At most {current_app.config['ORDER_BATCH_MAX']} orders per batch"}), 400
+
+    # 2. 一次查询获取所有服务项目
+    item_ids = {line['service_item_id'] for line in lines
+                if isinstance(line, dict) and _is_id(line.get('service_item_id'))}
+    items = {item.id: item for item in ServiceItem.query.filter(ServiceItem.id.in_(item_ids)).all()}
+
+    # 3. 一次查询加载所有相关服务人员的档期（锁定服务人员行直到订单提交），复制一份用于检测批次内部的时段冲突
+    provider_ids = {item.service_provider_id for item in items.values() if item.service_provider_id}
+    schedules = {
+        provider_id: ProviderSchedule(schedule.slot, schedule.starts)
+        for provider_id, schedule in schedule_index.get_many(provider_ids, lock=True).items()
+    }
+    division_index = get_division_index()
+
+    # 4. 逐行校验
+    results = []
+    rows = []
+    for index, line in enumerate(lines):
+        if not isinstance(line, dict):
+            results.append({'index': index, 'status': 'error', 'message': 'Invalid order data'})
+            continue
+        missing = [field for field in ('service_item_id', 'appointment_time', 'address') if field not in line]
+        if missing:
+            results.append({'index': index, 'status': 'error', 'message': f'Missing required field:{missing[0]}'})
+            continue
+        if not _is_id(line['service_item_id']):
+            results.append({'index': index, 'status': 'error', 'message': 'Invalid service_item_id'})
+            continue
+        service_item = items.get(line['service_item_id'])
+        if not service_item:
+            results.append({'index': index, 'status': 'error', 'message': 'Service item not found'})
+            continue
+        if not service_item.is_on_sale:
+            results.append({'index': index, 'status': 'error', 'message': 'Service item is currently not on sale'})
+            continue
+        if not service_item.service_provider_id:
+            results.append({'index': index, 'status': 'error', 'message': 'Service item has no service provider'})
+            continue
+        appointment_time = parse_datetime(line['appointment_time'])
+        if not appointment_time:
+            results.append({'index': index, 'status': 'error', 'message': 'Invalid appointment_time format'})
+            continue
+        schedule = schedules[service_item.service_provider_id]
+        if not schedule.is_free(appointment_time):
+            results.append({'index': index, 'status': 'error', 'message': 'Service provider is not available at this time'})
+            continue
+        schedule.add(appointment_time)
+
+        results.append({'index': index, 'status': 'created'})
+        rows.append({
+            'user_id': current_user_id,
+            'service_item_id': service_item.id,
+            'service_provider_id': service_item.service_provider_id,
+            'total_amount': service_item.price,  # 简化处理，假设总价等于服务单价
+            'appointment_time': appointment_time,
+            'address': line['address'],
+            'division_code': division_index.parse(line['address']),
+            'remark': line.get('remark'),
+            'status': order_state.PENDING  # 新订单状态为待支付
+        })
+
+    if not rows:
+        db.session.rollback()
+        return jsonify({'message': 'No valid orders', 'results': results}), 400
+
+    # 5. 批量生成订单号，在一个事务中批量插入
+    for row, order_no in zip(rows, Order.generate_order_nos(len(rows))):
+        row['order_no'] = order_no
+    order_ids = db.session.scalars(
+        db.insert(Order).returning(Order.id, sort_by_parameter_order=True), rows
+    ).all()
+    db.session.commit()
+
+    # 6. 登记到档期索引，并回填每行的订单信息
+    created = iter(zip(rows, order_ids))
+    for result in results:
+        if result['status'] == 'created':
+            row, order_id = next(created)
+            schedule_index.add(row['service_provider_id'], row['appointment_time'])
+            result.update({'order_id': order_id, 'order_no': row['order_no']})
+
+    return jsonify({'created': len(rows), 'results': results}), 201
+
+@orders_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_orders():
+    """获取当前用户的订单列表
+    
+    按创建时间倒序返回，使用游标分页（基于 created_at 和 id），翻页开销与页码无关，
+    不使用 OFFSET，也不统计总数。已归档的订单（order_archive表，订单ID不变）一起返回：
+    同一游标分别在 order 和 order_archive 表上按 (user_id, created_at, id) 索引各取一页，合并后截取
+    
+    查询参数：
+        status: 订单状态筛选（可选，多个状态用逗号分隔）
+        cursor: 上一页返回的 next_cursor（可选，为空时获取第一页）
+        per_page: 每页数量（可选，默认10，最多100）
+        
+    返回值：
+        成功：返回订单列表和下一页游标，状态码200
+        失败：返回错误信息和对应状态码
+    """
+    current_user_id = int(get_jwt_identity())
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), 100)
+
+    # 1. 状态筛选
+    status = request.args.get('status')
+    statuses = [s.strip() for s in status.split(',') if s.strip()] if status else None
 
-    order_schema = OrderSchema()
-    return jsonify(order_schema.dump(new_order)), 201
+    # 2. 游标定位：只取比游标更早的订单
+    cursor = request.args.get('cursor')
+    key = None
+    if cursor:
+        key = decode_cursor(cursor)
+        created_at = parse_datetime(key[0]) if key and len(key) == 2 else None
+        if not created_at or not isinstance(key[1], int):
+            return jsonify({'message': 'Invalid cursor'}), 400
+        key = (created_at, key[1])
+
+    # 3. 两个表各多取一条用于判断是否还有下一页，按 (created_at, id) 倒序合并
+    orders = []
+    for model, profile in ((Order, ORDER_PROFILES['list']), (OrderArchive, ORDER_ARCHIVE_PROFILES['list'])):
+        query = profile.apply(model.query).filter(model.user_id == current_user_id)
+        if statuses:
+            query = query.filter(model.status.in_(statuses))
+        if key:
+            query = query.filter(db.tuple_(model.created_at, model.id) < key)
+        rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(per_page + 1).all()
+        orders.extend((order, profile) for order in rows)
+    orders.sort(key=lambda entry: (entry[0].created_at, entry[0].id), reverse=True)
+    has_more = len(orders) > per_page
+    orders = orders[:per_page]
+    next_cursor = encode_cursor(orders[-1][0].created_at, orders[-1][0].id) if has_more else None
+
+    return jsonify({
+        'items': [profile.dump(order) for order, profile in orders],
+        'per_page': per_page,
+        'has_more': has_more,
+        'next_cursor': next_cursor
+    }), 200
 
 @orders_bp.route('/<int:order_id>', methods=['GET'])
 @jwt_required()
@@ -77,6 +348,7 @@ def get_order(order_id):
     """获取订单详情
     
     根据订单ID获取订单的详细信息，只能获取属于当前用户的订单
+    订单不在order表中时，继续到归档表order_archive中查找
     
     参数：
         order_id: 订单ID
@@ -85,13 +357,17 @@ def get_order(order_id):
         成功：返回订单详细信息
         失败：返回错误信息和404状态码
     """
-    current_user_id = get_jwt_identity()
-    order = Order.query.filter_by(id=order_id, user_id=current_user_id).first()
+    current_user_id = int(get_jwt_identity())
+    profile = ORDER_PROFILES['detail']
+    order = profile.apply(Order.query).filter_by(id=order_id, user_id=current_user_id).first()
+    if not order:
+        # 已归档的订单
+        profile = ORDER_ARCHIVE_PROFILES['detail']
+        order = profile.apply(OrderArchive.query).filter_by(id=order_id, user_id=current_user_id).first()
     if not order:
         return jsonify({'message': 'Order not found'}), 404
 
-    order_schema = OrderSchema()
-    return jsonify(order_schema.dump(order)), 200
+    return jsonify(profile.dump(order)), 200
 
 @orders_bp.route('/<int:order_id>/cancel', methods=['POST'])
 @jwt_required()
@@ -107,23 +383,67 @@ def cancel_order(order_id):
         成功：返回成功消息
         失败：返回错误信息和对应状态码
     """
-    current_user_id = get_jwt_identity()
+    current_user_id = int(get_jwt_identity())
     order = Order.query.filter_by(id=order_id, user_id = current_user_id).first()
 
     # 1. 订单是否存在
     if not order:
         return jsonify({'message':'Order not found'}), 404
 
-    # 2. 订单是否可以取消 (例如，已完成或已支付的订单可能不能取消)
-    if order.status in ('completed', 'paid'):
+    # 2. 取消订单：状态检查与修改在一条条件UPDATE中完成，避免与支付回调并发时覆盖已支付状态
+    #    (例如，已完成或已支付的订单不能取消)
+    if not order_state.transition('cancel', Order.id == order.id):
         return jsonify({'message':'Order cannot be cancelled'}), 400
-    
-    # 3. 取消订单
-    order.status = 'cancelled'
+    # UPDATE 之后再读取派单结果：派单进程可能在此前刚为订单分配服务人员，
+    # UPDATE 之后订单已不是待派单状态，派单进程不会再修改
+    provider_id, appointment_time, user_coupon_id = db.session.execute(
+        db.select(Order.service_provider_id, Order.appointment_time, Order.user_coupon_id)
+        .where(Order.id == order.id)
+    ).one()
+    # 退回订单使用的优惠券
+    if user_coupon_id:
+        release_coupon(user_coupon_id)
     db.session.commit()
+    # 释放服务人员的预约时段（尚未派单的订单没有占用时段）
+    if provider_id:
+        schedule_index.remove(provider_id, appointment_time)
 
     return jsonify({'message':'Order cancelled successfully'}),200
 
+@orders_bp.route('/<int:order_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_order(order_id):
+    """完成订单
+
+    服务人员完成上门服务后，将派给自己的已支付订单标记为已完成，完成后用户才能评价
+
+    参数：
+        order_id: 要完成的订单ID
+
+    返回值：
+        成功：返回成功消息
+        失败：返回错误信息和对应状态码，订单不是已支付状态时返回409
+    """
+    current_user_id = int(get_jwt_identity())
+
+    # 1. 检查当前用户是否是服务人员
+    service_provider = ServiceProvider.query.filter_by(user_id=current_user_id).first()
+    if not service_provider:
+        return jsonify({'message': 'Only service providers can complete orders'}), 403
+
+    # 2. 订单是否存在且派给了当前服务人员
+    order = Order.query.filter_by(id=order_id, service_provider_id=service_provider.id).first()
+    if not order:
+        return jsonify({'message': 'Order not found'}), 404
+
+    # 3. 完成订单：只有已支付的订单可以完成，状态检查与修改在一条条件UPDATE中完成
+    if not order_state.transition('complete', Order.id == order.id,
+                                  Order.service_provider_id == service_provider.id):
+        return jsonify({'message': 'Order cannot be completed'}), 409
+    db.session.commit()
+
+    return jsonify({'message': 'Order completed successfully'}), 200
+
 @orders_bp.route('/<int:order_id>/review', methods=['POST'])
 @jwt_required()
 def create_review(order_id):
@@ -142,7 +462,7 @@ def create_review(order_id):
         成功：返回创建的评价信息，状态码201
         失败：返回错误信息和对应状态码
     """
-    current_user_id = get_jwt_identity()
+    current_user_id = int(get_jwt_identity())
     data = request.get_json()
 
     # 1. 检查订单是否存在且属于当前用户
@@ -151,7 +471,7 @@ def create_review(order_id):
         return jsonify({'message': 'Order not found'}), 404
 
     # 2. 检查订单是否已完成 (只有已完成的订单才能评价)
-    if order.status != 'completed':
+    if order.status != order_state.COMPLETED:
         return jsonify({'message': 'Only completed orders can be reviewed'}), 400
     
     # 3. 检查是否已经评价过
@@ -164,6 +484,8 @@ def create_review(order_id):
     for field in required_fields:
         if not data.get(field):
             return jsonify({'message': f'Missing required field: {field}'}), 400
+    if data['rating'] not in RATINGS:
+        return jsonify({'message': 'Rating must be an integer between 1 and 5'}), 400
 
     # 5. 创建评价
     new_review = OrderReview(
@@ -175,10 +497,11 @@ def create_review(order_id):
         images=data.get('images')  # 假设前端上传图片URL，多个用逗号分隔
     )
     db.session.add(new_review)
+    # 6. 在同一事务中更新服务人员的评分统计
+    record_review(order.service_provider_id, data['rating'])
     db.session.commit()
 
-    review_schema = OrderReviewSchema()
-    return jsonify(review_schema.dump(new_review)), 201
+    return jsonify(REVIEW_PROFILES['detail'].dump(new_review)), 201
 
-# 其他订单相关视图函数... (获取订单列表、取消订单、订单支付回调等)
+# 其他订单相关视图函数... (订单支付回调等)
 
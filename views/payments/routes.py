@@ -12,6 +12,8 @@ from extensions import db
 # 假设的支付工具函数
 from utils.pay_utils import create_payment, handle_payment_callback
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from utils import order_state
+import datetime
 
 @payments_bp.route('/create', methods=['POST'])
 @jwt_required()
@@ -31,7 +33,7 @@ def create_payment_request():
     data = request.get_json()
     order_id = data['order_id']
     # 获取当前登录用户ID
-    current_user_id = get_jwt_identity()
+    current_user_id = int(get_jwt_identity())
     # 查询订单，确保订单属于当前用户
     order = Order.query.filter_by(id=order_id, user_id = current_user_id).first()
 
@@ -40,7 +42,7 @@ def create_payment_request():
         return jsonify({'message': 'Order not found'}), 404
     
     # 检查订单状态是否为待支付
-    if order.status != 'pending':
+    if not order_state.can_transition(order.status, 'pay'):
         return jsonify({'message':'Order is not in pending state'}),400
 
     # 创建支付请求（这里只是模拟，实际应调用第三方支付SDK）
@@ -69,18 +71,16 @@ def payment_callback():
     order_no = data['order_no']
     status = data['status']  # 'success' 或 'failed'
 
-    # 查找对应的订单
-    order = Order.query.filter_by(order_no=order_no).first()
-    if order:
-        if status == 'success':
-            # 支付成功，更新订单状态
-            order.status = 'paid'
-            # 假设全额支付
-            order.paid_amount = order.total_amount
-            # 记录支付方式
-            order.pay_method = data.get('pay_method','unknown')
-            # 记录支付时间
-            order.paid_at = datetime.datetime.now()
+    if status == 'success':
+        # 支付成功，将待支付订单原子地更新为已支付
+        # 订单已被取消或重复回调时影响行数为0，不会覆盖订单当前状态
+        order_state.transition(
+            'pay',
+            Order.order_no == order_no,
+            paid_amount=Order.total_amount,  # 假设全额支付
+            pay_method=data.get('pay_method', 'unknown'),  # 记录支付方式
+            paid_at=datetime.datetime.utcnow()  # 记录支付时间
+        )
         # 提交数据库更改
         db.session.commit()
 
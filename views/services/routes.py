@@ -2,58 +2,176 @@
 
 主要功能：
 1. 服务类别：获取所有服务类别
-2. 服务项目：查询和添加服务项目
+2. 服务项目：查询、添加和批量导入服务项目
 3. 服务人员：服务人员注册
 """
 
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from . import services_bp
 from models.service import ServiceCategory, ServiceItem, ServiceProvider
 from serializers.service_schema import ServiceCategorySchema, ServiceItemSchema, ServiceProviderSchema
 from extensions import db
 from flask_jwt_extended import jwt_required,get_jwt_identity
+from models.user import Address
+from utils.helpers import parse_datetime, parse_coordinates
+from utils.schedule import schedule_index
+from utils.category_tree import category_tree_cache
+from utils.item_counts import item_stats
+from utils.search import search_item_ids, make_snippet
+from utils.item_import import import_items
+from utils.geo_index import provider_geo_index
+from utils.http_cache import cached_response, json_body, not_modified, validator_etag
+from sqlalchemy.orm import joinedload
+import datetime
 
 @services_bp.route('/categories', methods=['GET'])
 def get_categories():
     """获取所有服务类别
     
+    类别树及其JSON响应体缓存在进程内，缓存命中时不查询数据库；
+    ETag为响应体的哈希，客户端缓存有效时返回304
+    
     返回值：
         成功：返回所有服务类别列表，状态码200
+        客户端缓存有效：状态码304
     """
-    categories = ServiceCategory.query.all()
-    category_schema = ServiceCategorySchema(many=True)
-    return jsonify(category_schema.dump(categories)), 200
+    tree = category_tree_cache.get()
+    response = not_modified(tree.etag, policy='categories')
+    if response:
+        return response
+    return cached_response(tree.body, tree.etag, policy='categories')
 
 @services_bp.route('/items', methods=['GET'])
 def get_items():
     """获取服务项目列表
     
-    支持按类别筛选和分页查询
+    支持按类别筛选和分页查询，按类别筛选时包含该类别下所有子类别的服务项目
+    
+    分页方式：
+        传入 after 时使用游标分页：按ID升序返回 id > after 的服务项目，翻页开销与页数无关，
+        首页传 after=0，下一页传上一页返回的 next_after；不传 after 时按页码分页。
+        两种方式都不使用 OFFSET 统计总数，total 与缓存校验值来自同一条聚合查询（游标分页需传 with_total=1）
+    
+    条件请求：
+        ETag 由查询参数、筛选范围内服务项目的数量和最后修改时间（每次请求从数据库聚合，见utils.item_counts）、
+        类别树ETag计算，客户端缓存有效时返回304，不加载服务项目也不执行序列化。
+        删除服务项目可能使最后修改时间变小，因此不返回 Last-Modified
     
     查询参数：
         category_id: 服务类别ID（可选）
+        on_sale: 是否只返回在售的服务项目（可选，默认0）
+        after: 游标，上一页最后一个服务项目的ID（可选）
+        with_total: 游标分页时是否返回近似总数（可选，默认0）
         page: 页码（可选，默认1）
-        per_page: 每页数量（可选，默认10）
+        per_page: 每页数量（可选，默认10，最多100）
         
     返回值：
         成功：返回分页的服务项目列表，状态码200
+        客户端缓存有效：状态码304
     """
     # 获取查询参数 (例如: category_id, page, per_page)
     category_id = request.args.get('category_id', type=int)
+    on_sale = bool(request.args.get('on_sale', 0, type=int))
+    after = request.args.get('after', type=int)
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), 100)
 
-    query = ServiceItem.query
-    if category_id:
-        query = query.filter_by(category_id=category_id)
+    tree = category_tree_cache.get()
+    category_ids = tree.descendant_ids(category_id) if category_id else None
 
-    items = query.paginate(page=page, per_page=per_page, error_out=False)
-    item_schema = ServiceItemSchema(many=True)
-    return jsonify({
+    # 校验值由一条聚合查询得到，客户端缓存有效时直接返回304
+    stats = item_stats(category_ids, on_sale=on_sale)
+    etag = validator_etag(sorted(request.args.items(multi=True)), stats.total, stats.last_modified, tree.etag)
+    response = not_modified(etag, policy='items')
+    if response:
+        return response
+
+    query = ServiceItem.query.options(joinedload(ServiceItem.category))
+    if category_ids is not None:
+        query = query.filter(ServiceItem.category_id.in_(category_ids))
+    if on_sale:
+        query = query.filter(ServiceItem.is_on_sale.is_(True))
+
+    # 列表中的类别信息不展开子类别
+    item_schema = ServiceItemSchema(many=True, exclude=('category.children',))
+
+    if after is not None:
+        # 游标分页：多取一条用于判断是否还有下一页
+        items = query.filter(ServiceItem.id > after).order_by(ServiceItem.id).limit(per_page + 1).all()
+        has_more = len(items) > per_page
+        items = items[:per_page]
+        result = {
+            'items': item_schema.dump(items),
+            'per_page': per_page,
+            'has_more': has_more,
+            'next_after': items[-1].id if has_more else None
+        }
+        if request.args.get('with_total', 0, type=int):
+            result['total'] = stats.total
+        return cached_response(json_body(result), etag, policy='items')
+
+    items = query.order_by(ServiceItem.id).paginate(page=page, per_page=per_page, error_out=False, count=False)
+    return cached_response(json_body({
         'items': item_schema.dump(items.items),
         'page': items.page,
         'per_page': items.per_page,
-        'total': items.total
+        'total': stats.total
+    }), etag, policy='items')
+
+@services_bp.route('/items/search', methods=['GET'])
+def search_items():
+    """全文检索服务项目
+
+    在服务标题和描述中检索关键词，结果按相关度排序（标题命中的权重高于描述）。
+    多个关键词用空格分隔，需全部命中；单个汉字按前缀匹配
+
+    查询参数：
+        q: 关键词
+        category_id: 服务类别ID，包含子类别（可选）
+        on_sale: 是否只返回在售的服务项目（可选，默认0）
+        page: 页码（可选，默认1）
+        per_page: 每页数量（可选，默认10，最多50）
+
+    返回值：
+        成功：返回服务项目列表，每项附带相关度 score 和高亮片段 snippet，状态码200
+        失败：返回错误信息和对应状态码
+    """
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'message': 'Missing required parameter: q'}), 400
+    category_id = request.args.get('category_id', type=int)
+    on_sale = bool(request.args.get('on_sale', 0, type=int))
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), 50)
+
+    category_ids = category_tree_cache.get().descendant_ids(category_id) if category_id else None
+    # 1. 在检索索引中查出一页服务项目ID及相关度
+    hits = search_item_ids(q, category_ids=category_ids, on_sale=on_sale,
+                           limit=per_page, offset=(page - 1) * per_page)
+
+    # 2. 一次查询加载这些服务项目，并保持相关度顺序
+    items = {}
+    if hits:
+        items = {
+            item.id: item for item in ServiceItem.query.options(joinedload(ServiceItem.category))
+            .filter(ServiceItem.id.in_([item_id for item_id, _ in hits]))
+        }
+    item_schema = ServiceItemSchema(exclude=('category.children',))
+    results = []
+    for item_id, score in hits:
+        item = items.get(item_id)
+        if item is None:
+            continue
+        data = item_schema.dump(item)
+        data['score'] = round(score, 4)
+        data['snippet'] = make_snippet(item.description or item.title, q)
+        results.append(data)
+
+    return jsonify({
+        'items': results,
+        'page': page,
+        'per_page': per_page,
+        'has_more': len(hits) == per_page
     }), 200
 
 #添加服务（服务人员专属）
@@ -77,7 +195,7 @@ def add_service_item():
         成功：返回新创建的服务项目信息，状态码201
         失败：返回错误信息和对应状态码
     """
-    current_user_id = get_jwt_identity()
+    current_user_id = int(get_jwt_identity())
 
     # 1. 检查当前用户是否是服务人员
     service_provider = ServiceProvider.query.filter_by(user_id=current_user_id).first()
@@ -111,6 +229,40 @@ def add_service_item():
     item_schema = ServiceItemSchema()
     return jsonify(item_schema.dump(new_item)),201
 
+#批量导入服务项目（服务人员专属）
+@services_bp.route('/items/import', methods=['POST'])
+@jwt_required()
+def import_service_items():
+    """从CSV或XLSX文件批量导入服务项目
+
+    文件首行为表头，列与添加服务项目的参数相同，类别可以用 category（类别名称）或 category_id 指定；
+    校验通过的行全部导入，校验失败的行在结果中逐行列出
+
+    请求参数（multipart/form-data）：
+        file: CSV（UTF-8编码）或XLSX文件
+
+    返回值：
+        成功：返回导入数量 imported、失败行数 failed 和错误明细 errors（[{row: 行号, errors: 错误信息}]），状态码200
+        失败：返回错误信息和对应状态码
+    """
+    current_user_id = int(get_jwt_identity())
+
+    service_provider = ServiceProvider.query.filter_by(user_id=current_user_id).first()
+    if not service_provider:
+        return jsonify({'message': 'Only service providers can import service items'}), 403
+
+    file = request.files.get('file')
+    if not file:
+        return jsonify({'message': 'Missing required field: file'}), 400
+
+    try:
+        result = import_items(file.stream, file.filename, service_provider.id)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except UnicodeDecodeError:
+        return jsonify({'message': 'CSV file must be UTF-8 encoded'}), 400
+    return jsonify(result), 200
+
 #服务人员注册
 @services_bp.route('/providers/register', methods=['POST'])
 @jwt_required()
@@ -126,12 +278,14 @@ def register_service_provider():
         address: 联系地址
         experience: 工作经验（可选）
         certificates: 资质证书URL列表（可选）
+        latitude: 居住地址的纬度（可选，需与longitude同时提供）
+        longitude: 居住地址的经度（可选，需与latitude同时提供）
         
     返回值：
         成功：返回新创建的服务人员信息，状态码201
         失败：返回错误信息和对应状态码
     """
-    current_user_id = get_jwt_identity()
+    current_user_id = int(get_jwt_identity())
     data = request.get_json()
 
     # 1. 检查用户是否已经注册过服务人员
@@ -144,6 +298,11 @@ def register_service_provider():
     for field in required_fields:
         if not data.get(field):
             return jsonify({'message': f'Missing required field: {field}'}), 400
+    coordinates = (None, None)
+    if data.get('latitude') is not None or data.get('longitude') is not None:
+        coordinates = parse_coordinates(data.get('latitude'), data.get('longitude'))
+        if not coordinates:
+            return jsonify({'message': 'Invalid latitude/longitude'}), 400
 
     # 3. 创建服务人员记录
     new_provider = ServiceProvider(
@@ -154,6 +313,8 @@ def register_service_provider():
         address=data['address'],
         experience=data.get('experience'),
         certificates=data.get('certificates'),  # 假设前端上传证书URL，多个用逗号分隔
+        latitude=coordinates[0],
+        longitude=coordinates[1],
         # is_verified 和 status 默认值已在模型中定义
     )
     db.session.add(new_provider)
@@ -161,5 +322,134 @@ def register_service_provider():
     provider_schema = ServiceProviderSchema()
     return jsonify(provider_schema.dump(new_provider)), 201
 
+@services_bp.route('/providers', methods=['GET'])
+def get_providers():
+    """按评分获取服务人员排行
+    
+    评分统计保存在服务人员表中，排行直接读取 (rating_avg, review_count) 索引
+    
+    查询参数：
+        verified: 是否只返回已通过验证的服务人员（可选，默认1）
+        min_reviews: 最少评价数量（可选，默认0）
+        limit: 返回数量（可选，默认10，最多100）
+        
+    返回值：
+        成功：返回服务人员列表，状态码200
+    """
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    min_reviews = request.args.get('min_reviews', 0, type=int)
+
+    query = ServiceProvider.query
+    if request.args.get('verified', 1, type=int):
+        query = query.filter(ServiceProvider.is_verified.is_(True))
+    if min_reviews:
+        query = query.filter(ServiceProvider.review_count >= min_reviews)
+    providers = query.order_by(
+        ServiceProvider.rating_avg.desc(), ServiceProvider.review_count.desc(), ServiceProvider.id
+    ).limit(limit).all()
+
+    provider_schema = ServiceProviderSchema(many=True, only=(
+        'id', 'real_name', 'is_verified', 'review_count', 'rating_avg', 'rating_histogram'
+    ))
+    return jsonify(provider_schema.dump(providers)), 200
+
+@services_bp.route('/providers/nearby', methods=['GET'])
+@jwt_required(optional=True)
+def get_nearby_providers():
+    """获取附近的服务人员
+
+    在进程内的地理位置网格索引中查询距离最近的已验证服务人员，不扫描服务人员表。
+    位置可以直接传经纬度，也可以传当前登录用户的地址ID
+
+    查询参数：
+        lat: 纬度（与lng同时提供）
+        lng: 经度（与lat同时提供）
+        address_id: 当前用户的地址ID，地址需已设置经纬度（需登录，未提供lat/lng时使用）
+        radius_km: 搜索半径（可选，默认5公里，最大为配置GEO_MAX_RADIUS_KM）
+        k: 返回数量（可选，默认10，最多50）
+
+    返回值：
+        成功：返回按距离从近到远排序的服务人员列表，每项附带距离 distance_km，状态码200
+        失败：返回错误信息和对应状态码
+    """
+    if request.args.get('lat') is not None or request.args.get('lng') is not None:
+        coordinates = parse_coordinates(request.args.get('lat'), request.args.get('lng'))
+        if not coordinates:
+            return jsonify({'message': 'Invalid lat/lng'}), 400
+    elif request.args.get('address_id'):
+        current_user_id = get_jwt_identity()
+        if current_user_id is None:
+            return jsonify({'message': 'Login required to search by address'}), 401
+        address = Address.query.filter_by(
+            id=request.args.get('address_id', type=int), user_id=int(current_user_id)
+        ).first()
+        if not address:
+            return jsonify({'message': 'Address not found'}), 404
+        coordinates = parse_coordinates(address.latitude, address.longitude)
+        if not coordinates:
+            return jsonify({'message': 'Address has no coordinates'}), 400
+    else:
+        return jsonify({'message': 'Missing required parameters: lat and lng, or address_id'}), 400
+
+    radius_km = request.args.get('radius_km', 5, type=float)
+    max_radius_km = current_app.config['GEO_MAX_RADIUS_KM']
+    if not 0 < radius_km <= max_radius_km:
+        return jsonify({'message': f'radius_km must be between 0 and {max_radius_km}'}), 400
+    k = min(max(request.args.get('k', 10, type=int), 1), 50)
+
+    hits = provider_geo_index.nearest(coordinates[0], coordinates[1], k=k, radius_km=radius_km)
+    providers = {}
+    if hits:
+        providers = {
+            provider.id: provider
+            for provider in ServiceProvider.query.filter(ServiceProvider.id.in_([pid for pid, _ in hits]))
+        }
+
+    provider_schema = ServiceProviderSchema(only=(
+        'id', 'real_name', 'is_verified', 'review_count', 'rating_avg', 'latitude', 'longitude'
+    ))
+    results = []
+    for provider_id, distance in hits:
+        provider = providers.get(provider_id)
+        if provider is None:
+            continue
+        data = provider_schema.dump(provider)
+        data['distance_km'] = round(distance, 3)
+        results.append(data)
+    return jsonify(results), 200
+
+@services_bp.route('/providers/<int:provider_id>/free_slots', methods=['GET'])
+def get_free_slots(provider_id):
+    """获取服务人员的空闲时段
+    
+    从指定时间开始，返回服务人员接下来的若干个空闲预约时段
+    
+    参数：
+        provider_id: 服务人员ID
+    查询参数：
+        start: 查询起始时间（可选，ISO 8601格式，默认当前时间）
+        count: 返回的空闲时段数量（可选，默认5，最多50）
+        
+    返回值：
+        成功：返回空闲时段列表，状态码200
+        失败：返回错误信息和对应状态码
+    """
+    provider = ServiceProvider.query.get(provider_id)
+    if not provider:
+        return jsonify({'message': 'Service provider not found'}), 404
+
+    start = request.args.get('start')
+    start = parse_datetime(start) if start else datetime.datetime.utcnow().replace(second=0, microsecond=0)
+    if not start:
+        return jsonify({'message': 'Invalid start format'}), 400
+    count = min(max(request.args.get('count', 5, type=int), 1), 50)
+
+    slots = schedule_index.next_free_slots(provider_id, start, count)
+    return jsonify({
+        'provider_id': provider_id,
+        'slot_minutes': int(schedule_index.slot_length().total_seconds() // 60),
+        'free_slots': [slot.isoformat() for slot in slots]
+    }), 200
+
 # 其他服务相关视图函数... (创建、编辑、删除服务等)
 
@@ -1,19 +1,22 @@
-from flask import jsonify
 from . import support_bp
-from models.support import FAQ
-from serializers.support_schema import FAQSchema
-from extensions import db
+from utils.faq_cache import faq_cache
+from utils.http_cache import cached_response, not_modified
 
 @support_bp.route('/faq', methods = ['GET'])
 def get_faq():
     """获取所有常见问题列表的API端点
     
+    序列化后的FAQ列表缓存在进程内（见utils.faq_cache），ETag为响应体的哈希，
+    请求的If-None-Match与之匹配时返回304
+    
     Returns:
-        tuple: 包含FAQ列表的JSON响应和HTTP状态码
+        Response: 包含FAQ列表的JSON响应，客户端缓存有效时为304响应
     """
-    # 查询数据库中的所有FAQ记录
-    faqs = FAQ.query.all()
-    # 创建FAQ序列化器实例，设置many=True表示序列化多个对象
-    faq_schema = FAQSchema(many = True)
-    # 将FAQ对象列表序列化为JSON格式并返回，状态码200表示成功
-    return jsonify(faq_schema.dump(faqs)), 200
+    # 从缓存获取FAQ列表的JSON响应体，缓存失效时才查询数据库并序列化
+    body, etag = faq_cache.get()
+    # 客户端缓存仍然有效，状态码304表示未修改
+    response = not_modified(etag, policy='faq')
+    if response:
+        return response
+    # 返回FAQ列表，状态码200表示成功
+    return cached_response(body, etag, policy='faq')
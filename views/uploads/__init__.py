@@ -0,0 +1,3 @@
+from flask import Blueprint
+uploads_bp = Blueprint('uploads', __name__, url_prefix='/uploads')
+from . import routes
@@ -0,0 +1,45 @@
+"""文件上传模块
+
+主要功能：
+1. 图片上传：服务项目图片、评价图片、资质证书等，按内容哈希去重保存，后台生成缩略图等衍生图
+"""
+
+from flask import request, jsonify
+from . import uploads_bp
+from flask_jwt_extended import jwt_required
+from utils.images import save_upload, schedule_derivatives, image_url, image_urls
+
+@uploads_bp.route('/images', methods=['POST'])
+@jwt_required()
+def upload_image():
+    """上传图片
+    
+    支持JPEG、PNG、GIF、WebP格式，大小不超过配置IMAGE_MAX_BYTES。
+    返回的url可填入服务项目images、评价images、资质证书certificates等字段（多个URL用逗号分隔），
+    衍生图在后台生成，通常在上传后1秒内可用
+    
+    请求参数（multipart/form-data）：
+        file: 图片文件
+        
+    返回值：
+        成功：返回图片哈希、原图URL和各尺寸衍生图URL，新图片状态码201，已上传过的图片状态码200
+        失败：返回错误信息和对应状态码
+    """
+    file = request.files.get('file')
+    if not file:
+        return jsonify({'message': 'Missing required field: file'}), 400
+
+    try:
+        digest, extension, created = save_upload(file.stream)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    # 已上传过的图片也检查一次，补齐之前未生成成功的衍生图
+    schedule_derivatives(digest, extension)
+
+    url = image_url(digest, extension)
+    return jsonify({
+        'hash': digest,
+        'url': url,
+        'urls': image_urls(url)[0],
+        'deduplicated': not created
+    }), 201 if created else 200
@@ -1,20 +1,28 @@
 """用户管理模块，提供用户注册、登录和地址管理等功能
 
 主要功能：
-1. 用户注册：新用户注册账号
-2. 用户登录：账号登录并获取访问令牌
+1. 用户注册：新用户注册账号，注册前可实时检查邮箱、手机号、用户名是否已被占用
+2. 用户登录：账号登录并获取访问令牌和刷新令牌，刷新令牌用于换取新的访问令牌，登出后令牌立即失效
 3. 个人信息：获取用户个人信息
-4. 地址管理：添加和查询用户地址
+4. 地址管理：添加和查询用户地址，地址的省市区规范化为行政区划代码，提供行政区划自动补全
 """
 
-from flask import request, jsonify
+import time
+
+from flask import request, jsonify, current_app
 from . import users_bp
 from models.user import User, Address
 from serializers.user_schema import UserSchema, AddressSchema
 from extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from utils.helpers import is_valid_email, is_valid_phone
+from flask_jwt_extended import (create_access_token, create_refresh_token, decode_token, jwt_required,
+                                get_jwt, get_jwt_identity, current_user)
+from jwt.exceptions import PyJWTError
+from utils.helpers import is_valid_email, is_valid_phone, parse_coordinates
+from utils.passwords import PasswordHasherBusy, hash_password, verify_password
+from utils.user_bloom import find_taken
+from utils.divisions import get_division_index
+from utils.token_blocklist import revoke_tokens
+from sqlalchemy.exc import IntegrityError
 
 @users_bp.route('/register', methods=['POST'])
 def register():
@@ -30,7 +38,7 @@ def register():
         
     返回值：
         成功：返回新创建的用户信息，状态码201
-        失败：返回错误信息和对应状态码
+        失败：返回错误信息和对应状态码；服务器繁忙时状态码503
     """
     data = request.get_json()
 
@@ -50,45 +58,154 @@ def register():
     if not data.get('password') or len(data.get('password')) < 6:
         return jsonify({'message': 'Password must be at least 6 characters'}), 400
 
-    # 2. 检查邮箱是否已注册
-    existing_user = User.query.filter_by(email=data['email']).first()
-    if existing_user:
+    # 2. 检查邮箱、电话、用户名是否已注册（布隆过滤器判断可能已存在时才查询数据库，且只查询一次）
+    taken = find_taken(email=data['email'], phone=data['phone'], username=data['username'])
+    if 'email' in taken:
         return jsonify({'message': 'Email already registered'}), 400
-
-    # 3. 检查电话是否已注册
-    existing_phone = User.query.filter_by(phone=data['phone']).first()
-    if existing_phone:
+    if 'phone' in taken:
         return jsonify({'message':'Phone number already registered'}), 400
+    if 'username' in taken:
+        return jsonify({'message': 'Username already taken'}), 400
 
-    # 4. 创建用户
-    hashed_password = generate_password_hash(data['password'])
+    # 3. 创建用户（密码哈希在哈希进程中计算，繁忙时立即返回503）
+    try:
+        hashed_password = hash_password(data['password'])
+    except PasswordHasherBusy:
+        return jsonify({'message': 'Server busy, please retry later'}), 503, {'Retry-After': '1'}
     new_user = User(username=data['username'], email=data['email'], password=hashed_password, phone=data['phone'])
     db.session.add(new_user)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # 并发注册时由唯一约束兜底
+        db.session.rollback()
+        return jsonify({'message': 'Email, phone number or username already registered'}), 400
 
     user_schema = UserSchema()
     return jsonify(user_schema.dump(new_user)), 201
 
+@users_bp.route('/availability', methods=['GET'])
+def check_availability():
+    """检查邮箱、手机号、用户名是否可以注册
+
+    用于注册时的实时检查，只需传入要检查的字段；结果仅供参考，以注册接口的结果为准
+
+    查询参数：
+        email: 邮箱地址（可选）
+        phone: 手机号（可选）
+        username: 用户名（可选）
+
+    返回值：
+        成功：返回各字段是否可用，如 {"email": true, "username": false}，状态码200
+        失败：返回错误信息和对应状态码
+    """
+    values = {field: request.args.get(field, '').strip() for field in ('email', 'phone', 'username')}
+    values = {field: value for field, value in values.items() if value}
+    if not values:
+        return jsonify({'message': 'Provide at least one of email, phone, username'}), 400
+    if 'email' in values and not is_valid_email(values['email']):
+        return jsonify({'message': 'Invalid email format'}), 400
+    if 'phone' in values and not is_valid_phone(values['phone']):
+        return jsonify({'message': 'Invalid phone number format'}), 400
+
+    taken = find_taken(**values)
+    return jsonify({field: field not in taken for field in values}), 200
+
 @users_bp.route('/login', methods=['POST'])
 def login():
     """用户登录
     
-    用户使用邮箱和密码登录，成功后返回访问令牌
+    用户使用邮箱和密码登录，成功后返回访问令牌和刷新令牌；
+    密码哈希使用的算法参数与当前配置不同时，登录成功后按当前配置重新保存密码哈希
     
     请求参数：
         email: 邮箱地址
         password: 密码
         
     返回值：
-        成功：返回访问令牌，状态码200
-        失败：返回错误信息，状态码401
+        成功：返回访问令牌和刷新令牌，状态码200
+        失败：返回错误信息，状态码401；服务器繁忙时状态码503
     """
     data = request.get_json()
     user = User.query.filter_by(email=data['email']).first()
-    if user and check_password_hash(user.password, data['password']):
-        access_token = create_access_token(identity=user.id)
-        return jsonify({'access_token': access_token}), 200
-    return jsonify({'message': 'Invalid credentials'}), 401
+    if not user:
+        return jsonify({'message': 'Invalid credentials'}), 401
+    try:
+        valid = verify_password(user, data['password'])
+    except PasswordHasherBusy:
+        return jsonify({'message': 'Server busy, please retry later'}), 503, {'Retry-After': '1'}
+    if not valid:
+        return jsonify({'message': 'Invalid credentials'}), 401
+    # 哈希参数已过时的密码在校验时重新计算了哈希
+    if db.session.is_modified(user):
+        db.session.commit()
+    access_token = create_access_token(identity=str(user.id))
+    refresh_token = create_refresh_token(identity=str(user.id))
+    return jsonify({'access_token': access_token, 'refresh_token': refresh_token}), 200
+
+@users_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """刷新访问令牌
+
+    使用刷新令牌（放在 Authorization 请求头中）换取新的访问令牌和刷新令牌，
+    原刷新令牌随即吊销，只能使用一次
+
+    返回值：
+        成功：返回新的访问令牌和刷新令牌，状态码200
+        失败：刷新令牌无效、已过期或已吊销（包括重复使用）时状态码401
+    """
+    identity = get_jwt_identity()
+    payload = get_jwt()
+    # 其他进程刚吊销的令牌可能尚未同步到本进程的吊销列表，以数据库为准：已吊销或并发吊销时不签发新令牌
+    try:
+        revoked = payload['jti'] in revoke_tokens(payload)
+        if not revoked:
+            db.session.commit()
+    except IntegrityError:
+        revoked = True
+    if revoked:
+        db.session.rollback()
+        return jsonify({'message': 'Token has been revoked'}), 401
+    access_token = create_access_token(identity=identity)
+    refresh_token = create_refresh_token(identity=identity)
+    return jsonify({'access_token': access_token, 'refresh_token': refresh_token}), 200
+
+@users_bp.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    """用户登出
+
+    吊销当前访问令牌，同时提交刷新令牌时一并吊销，吊销的令牌不能再用于访问接口
+
+    请求参数：
+        refresh_token: 刷新令牌（可选）
+
+    返回值：
+        成功：返回成功信息，状态码200
+        失败：刷新令牌无效或不属于当前用户时状态码400
+    """
+    payloads = [get_jwt()]
+    refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+    if refresh_token:
+        try:
+            payload = decode_token(refresh_token, allow_expired=True)
+        except PyJWTError:
+            return jsonify({'message': 'Invalid refresh token'}), 400
+        if payload.get('type') != 'refresh' or str(payload.get('sub')) != str(get_jwt_identity()):
+            return jsonify({'message': 'Invalid refresh token'}), 400
+        # 已过期的刷新令牌本身已不能使用，无需吊销
+        if payload.get('exp') is None or payload['exp'] > time.time():
+            payloads.append(payload)
+    revoke_tokens(*payloads)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # 并发请求刚吊销了其中的令牌，重新写入其余令牌
+        db.session.rollback()
+        revoke_tokens(*payloads)
+        db.session.commit()
+    return jsonify({'message': 'Logged out successfully'}), 200
 
 @users_bp.route('/profile', methods=['GET'])
 @jwt_required()
@@ -100,17 +217,17 @@ def profile():
     返回值：
         成功：返回用户个人信息，状态码200
     """
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
     user_schema = UserSchema()
-    return jsonify(user_schema.dump(user)), 200
+    return jsonify(user_schema.dump(current_user)), 200
 
 @users_bp.route('/address', methods=['POST'])
 @jwt_required()
 def add_address():
     """添加收货地址
     
-    为当前登录用户添加新的收货地址
+    为当前登录用户添加新的收货地址。省、市、区县按行政区划数据规范化：
+    匹配到的区划保存为 division_code，名称统一为标准全称（如“广州”保存为“广州市”）；
+    配置 DIVISIONS_STRICT 为True时，省、市、区县未能全部匹配的地址将被拒绝
     
     请求参数：
         province: 省份
@@ -119,25 +236,46 @@ def add_address():
         detail_address: 详细地址
         phone: 联系电话
         name: 收货人姓名（可选）
+        latitude: 纬度（可选，需与longitude同时提供）
+        longitude: 经度（可选，需与latitude同时提供）
         
     返回值：
         成功：返回新创建的地址信息，状态码201
         失败：返回错误信息和对应状态码
     """
-    current_user_id = get_jwt_identity()
+    current_user_id = int(get_jwt_identity())
     data = request.get_json()
     #数据验证
     if not is_valid_phone(data.get('phone')):
         return jsonify({'message': 'Invalid phone format'}),400
+    coordinates = (None, None)
+    if data.get('latitude') is not None or data.get('longitude') is not None:
+        coordinates = parse_coordinates(data.get('latitude'), data.get('longitude'))
+        if not coordinates:
+            return jsonify({'message': 'Invalid latitude/longitude'}), 400
+    # 规范化省市区
+    names = {field: data[field] for field in ('province', 'city', 'district')}
+    division_index = get_division_index()
+    division_code, complete = division_index.resolve(names['province'], names['city'], names['district'])
+    if not complete and current_app.config['DIVISIONS_STRICT']:
+        return jsonify({'message': 'Unknown province/city/district'}), 400
+    code = division_code
+    while code is not None:
+        division = division_index.divisions[code]
+        names[('province', 'city', 'district')[division.level - 1]] = division.name
+        code = division.parent_code
     # 创建地址
     new_address = Address(
         user_id=current_user_id,
-        province=data['province'],
-        city=data['city'],
-        district=data['district'],
+        province=names['province'],
+        city=names['city'],
+        district=names['district'],
         detail_address=data['detail_address'],
         phone=data['phone'],
-        name = data.get('name')
+        name = data.get('name'),
+        latitude=coordinates[0],
+        longitude=coordinates[1],
+        division_code=division_code
     )
     db.session.add(new_address)
     db.session.commit()
@@ -145,6 +283,44 @@ def add_address():
     address_schema = AddressSchema()
     return jsonify(address_schema.dump(new_address)), 201
 
+@users_bp.route('/divisions', methods=['GET'])
+def get_divisions():
+    """行政区划自动补全
+
+    按汉字、全拼或拼音首字母前缀查询省、市、区县，用于填写地址时的输入提示；
+    不传 q 时返回 parent_code 的全部下级区划（用于逐级选择）
+
+    查询参数：
+        q: 汉字或拼音前缀（可选）
+        parent_code: 上级区划代码，只返回其下级区划（可选，不传 q 时必填，0表示省级区划）
+        limit: 最多返回的数量（可选，默认10，最多50）
+
+    返回值：
+        成功：返回区划列表，每项包含 code、name、full_name、level（1省级、2地级、3县级），状态码200
+        失败：返回错误信息和对应状态码
+    """
+    q = request.args.get('q', '').strip()
+    parent_code = request.args.get('parent_code', type=int)
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    division_index = get_division_index()
+    if parent_code and parent_code not in division_index.divisions:
+        return jsonify({'message': 'Division not found'}), 404
+
+    if q:
+        divisions = division_index.autocomplete(q, parent=parent_code or None, limit=limit)
+    elif parent_code is not None:
+        codes = division_index.children.get(parent_code or None, [])
+        divisions = [division_index.divisions[code] for code in codes]
+    else:
+        return jsonify({'message': 'Missing required parameter: q or parent_code'}), 400
+
+    return jsonify([{
+        'code': division.code,
+        'name': division.name,
+        'full_name': division_index.full_name(division.code),
+        'level': division.level
+    } for division in divisions]), 200
+
 @users_bp.route('/addresses', methods=['GET'])
 @jwt_required()
 def get_addresses():
@@ -155,10 +331,8 @@ def get_addresses():
     返回值：
         成功：返回用户的地址列表，状态码200
     """
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
     address_schema = AddressSchema(many=True)
-    return jsonify(address_schema.dump(user.addresses)),200
+    return jsonify(address_schema.dump(current_user.addresses)),200
 
 # 其他用户相关视图函数... (修改密码、获取用户信息等)
 